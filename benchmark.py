@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+
+__author__ = "bitsofinfo"
+
+import argparse
+import collections
+import concurrent.futures
+import copy
+import datetime
+import json
+import logging
+import os
+import random
+import resource
+import threading
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import yaml
+
+import testssl_result_handler
+
+DEFAULT_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "sample/20181113_194917-www.google.com-testssl_cmds/www.google.com/20181108120000/public/search/20181108120000_testssl_www.google.com.json")
+
+
+# Returns a copy of the sample testssl.sh result w/ `hosts` scanResult
+# entries (distinct ips) each w/ `ciphers` synthetic entries in its
+# 'ciphers' and 'cipherTests' sections (the large arrays of real scans)
+# and, if given, its cert_notAfter set to the `cert_not_after` datetime
+def make_synthetic_result(sample_result, hosts, ciphers, cert_not_after=None):
+    result = copy.deepcopy(sample_result)
+    template = result['scanResult'][0]
+
+    scan_results = []
+    for h in range(hosts):
+        scan_result = copy.deepcopy(template)
+        scan_result['ip'] = "10.0.%d.%d" % (int(h / 250), (h % 250) + 1)
+        if cert_not_after is not None:
+            for finding in scan_result.get('serverDefaults',[]):
+                if finding.get('id','').startswith('cert_notAfter'):
+                    finding['finding'] = cert_not_after.strftime("%Y-%m-%d %H:%M")
+        scan_result['ciphers'] = [{'id':'cipherorder_%d' % c,'severity':'OK' if c % 10 else 'MEDIUM','finding':'TLS_RSA_WITH_CIPHER_%d' % c} for c in range(ciphers)]
+        scan_result['cipherTests'] = [{'id':'cipher_x%x' % c,'severity':'INFO','finding':'x%x   ECDHE-RSA-CIPHER-%d   ECDH 256   AESGCM   256   TLS_ECDHE_RSA_CIPHER_%d' % (c,c,c)} for c in range(ciphers)]
+        scan_results.append(scan_result)
+
+    result['scanResult'] = scan_results
+    return result
+
+
+# Writes `files` synthetic result files to output_dir, returns their paths
+def write_synthetic_results(sample_path, output_dir, files, hosts, ciphers):
+    with open(sample_path,'r') as f:
+        sample_result = json.load(f)
+
+    synthetic_result = make_synthetic_result(sample_result,hosts,ciphers)
+
+    paths = []
+    for i in range(files):
+        path = os.path.join(output_dir,"%d_testssl_synthetic%d.json" % (i,i))
+        with open(path,'w') as f:
+            json.dump(synthetic_result,f,indent=2)
+        paths.append(path)
+    return paths
+
+
+# Compiles the result handler config YAML files in config_dir into
+# the current testssl_result_handler config snapshot (w/out creating their reactors)
+def load_configs(config_dir):
+    for f in sorted(os.listdir(config_dir)):
+        if '.yaml' not in f:
+            continue
+        with open(os.path.join(config_dir,f),'r') as stream:
+            config = yaml.safe_load(stream)
+        testssl_result_handler.update_config_snapshot(f,testssl_result_handler.HandlerConfigPlan(f,config))
+
+
+# Measures the python heap allocated loading each result file
+# w/ each of the JSON_LOADERS: peak (while parsing) and retained (the
+# loaded document that is then held for the duration of its processing)
+# Timing is measured in a separate pass as tracemalloc slows allocation
+def benchmark_loading(paths, json_loaders):
+    results = {}
+    for json_loader in json_loaders:
+        start = time.time()
+        for path in paths:
+            testssl_result_handler.load_testssl_result_file(path,json_loader)
+        elapsed = time.time() - start
+
+        peaks = []
+        retained = []
+        for path in paths:
+            tracemalloc.start()
+            testssl_result_file = testssl_result_handler.load_testssl_result_file(path,json_loader)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks.append(peak)
+            retained.append(current)
+            del testssl_result_file
+
+        results[json_loader] = {'files':len(paths),
+                                'seconds':elapsed,
+                                'peak_bytes_avg':sum(peaks) / len(peaks),
+                                'peak_bytes_max':max(peaks),
+                                'retained_bytes_avg':sum(retained) / len(retained),
+                                'retained_bytes_max':max(retained)}
+    return results
+
+
+# Writes `files` synthetic result files under input_dir laid out like
+# testssl.sh-processor output (so the example path_properties_grok matches)
+# w/ host counts, cipher counts and cert expiration dates chosen at random
+# from host_counts, cipher_counts and -30..400 days from now. Returns their paths
+def write_varied_synthetic_results(sample_path, input_dir, files, host_counts, cipher_counts, seed=1):
+    with open(sample_path,'r') as f:
+        sample_result = json.load(f)
+
+    rnd = random.Random(seed)
+    now = datetime.datetime.utcnow()
+
+    paths = []
+    for i in range(files):
+        fqdn = "www.h%d.com" % i
+        result_dir = os.path.join(input_dir,"20181113_194917-" + fqdn + "-testssl_cmds",fqdn,"20181108120000","public","search")
+        os.makedirs(result_dir,exist_ok=True)
+
+        synthetic_result = make_synthetic_result(sample_result,rnd.choice(host_counts),rnd.choice(cipher_counts),
+                                                 now + datetime.timedelta(days=rnd.randint(-30,400)))
+        path = os.path.join(result_dir,"20181108120000_testssl_" + fqdn + ".json")
+        with open(path,'w') as f:
+            json.dump(synthetic_result,f,indent=2)
+        paths.append(path)
+    return paths
+
+
+# Stands in for every configured reactor: renders the reactor config's
+# templates (as the real reactors would) but sends/copies nothing
+class StubReactor():
+
+    def __init__(self, reactor_config):
+        self.templates = [v for v in reactor_config.values() if testssl_result_handler.reactor_templates.is_template(v)]
+
+    def handleTriggers(self, triggers_fired, objectpath_ctx):
+        for t in triggers_fired:
+            for template in self.templates:
+                testssl_result_handler.reactor_templates.render(template,t,objectpath_ctx)
+
+
+# A TestsslResultProcessor that times each phase of processing a result file
+class TimedTestsslResultProcessor(testssl_result_handler.TestsslResultProcessor):
+
+    PHASES = ['json_load','grok','tree_build','cert_expires','trigger_eval','reactors']
+
+    def __init__(self):
+        self.phase_seconds = collections.defaultdict(float)
+        self.phase_seconds_lock = threading.Lock()
+
+    def timed(self, phase, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.phase_seconds_lock:
+                self.phase_seconds[phase] += elapsed
+
+    def loadResultFile(self, testssl_result_file, config_snapshot=None):
+        return self.timed('json_load',super().loadResultFile,testssl_result_file,config_snapshot)
+
+    # (the grok match dominates building the evaluation_doc)
+    def buildEvaluationDoc(self, plan, testssl_result_file, input_dir, finding_index):
+        return self.timed('grok',super().buildEvaluationDoc,plan,testssl_result_file,input_dir,finding_index)
+
+    def createObjectPathContext(self, evaluation_doc, finding_index, scan_result_index=0):
+        return self.timed('tree_build',super().createObjectPathContext,evaluation_doc,finding_index,scan_result_index)
+
+    # (less the tree_build it includes)
+    def evaluateCertExpiration(self, plan, evaluation_doc, finding_index, scan_result_index=0, scope_memo=None, shared_results=None):
+        with self.phase_seconds_lock:
+            tree_build_before = self.phase_seconds['tree_build']
+        start = time.perf_counter()
+        try:
+            return super().evaluateCertExpiration(plan,evaluation_doc,finding_index,scan_result_index,scope_memo,shared_results)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.phase_seconds_lock:
+                self.phase_seconds['cert_expires'] += elapsed - (self.phase_seconds['tree_build'] - tree_build_before)
+
+    def evaluateTriggers(self, plan, objectpath_ctx, testssl_result_file, scope_memo=None, shared_results=None):
+        return self.timed('trigger_eval',super().evaluateTriggers,plan,objectpath_ctx,testssl_result_file,scope_memo,shared_results)
+
+    def invokeReactors(self, plan, triggers_fired, objectpath_ctx, pending_reactions=None):
+        return self.timed('reactors',super().invokeReactors,plan,triggers_fired,objectpath_ctx,pending_reactions)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1,int(round((pct / 100.0) * (len(ordered) - 1))))]
+
+
+def mb(num_bytes):
+    return "%.2fMB" % (num_bytes / (1024 * 1024))
+
+
+def run_processing(args):
+    logging.getLogger().setLevel(logging.getLevelName(args.processing_log_level))
+    load_configs(args.config_dir)
+
+    # stub out every configured reactor
+    for config_filename, plan in testssl_result_handler.current_config_snapshot().plans.items():
+        testssl_result_handler.reactor_registry.register(plan,
+            {reactor_name:StubReactor(reactor_config) for reactor_name, reactor_config in plan.config.get('reactor_engines',{}).items()})
+
+    processor = TimedTestsslResultProcessor()
+    processor.objectpath_engine = args.objectpath_engine
+    processor.json_loader = args.json_loader
+    if args.evaluation_cache_size > 0:
+        processor.evaluation_cache = testssl_result_handler.EvaluationCache(args.evaluation_cache_size)
+
+    work_dir = tempfile.mkdtemp(prefix="testssl_benchmark_")
+    try:
+        input_dir = os.path.join(work_dir,"input")
+        host_counts = [int(h) for h in args.hosts.split(',')]
+        cipher_counts = [int(c) for c in args.ciphers.split(',')]
+        paths = write_varied_synthetic_results(args.sample,input_dir,args.files,host_counts,cipher_counts)
+        logging.warning("Wrote %d synthetic result files (hosts %s, ciphers %s) to %s" % (len(paths),host_counts,cipher_counts,input_dir))
+
+        # warm up (compiles templates/fastpaths on first use)
+        for path in paths[:min(len(paths),args.warmup)]:
+            processor.processResultFile(path,input_dir)
+        processor.phase_seconds.clear()
+
+        latencies = []
+        triggers_fired = collections.Counter()
+        def process(path):
+            start = time.perf_counter()
+            summary = processor.processResultFile(path,input_dir)
+            latencies.append(time.perf_counter() - start)
+            for config_filename, tags in (summary or {}).items():
+                triggers_fired.update(tags)
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+            for r in executor.map(process,paths):
+                pass
+        elapsed = time.perf_counter() - start
+
+        print("files=%d threads=%d objectpath_engine=%s json_loader=%s evaluation_cache_size=%d" % (len(paths),args.threads,args.objectpath_engine,args.json_loader,args.evaluation_cache_size))
+        print("files/sec=%.1f latency/file p50=%.2fms p99=%.2fms max=%.2fms" %
+              (len(paths) / elapsed,percentile(latencies,50) * 1000,percentile(latencies,99) * 1000,max(latencies) * 1000))
+        phases_total = sum(processor.phase_seconds.values())
+        for phase in TimedTestsslResultProcessor.PHASES:
+            seconds = processor.phase_seconds[phase]
+            print("  %-13s %8.2fms/file %5.1f%%" % (phase,(seconds / len(paths)) * 1000,(seconds / phases_total * 100) if phases_total else 0))
+        print("triggers fired: %s" % dict(triggers_fired))
+        trigger_evaluations = testssl_result_handler.trigger_evaluations_total.values
+        print("trigger evaluations: evaluated=%d shared=%d (%d triggers, %d distinct, per file)" %
+              ((trigger_evaluations.get(('evaluated',),0),trigger_evaluations.get(('shared',),0)) +
+               testssl_result_handler.trigger_evaluation_plan(testssl_result_handler.current_config_snapshot())))
+        # ru_maxrss is in KB on linux
+        print("peak RSS=%s" % mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def run_loading(args):
+    load_configs(args.config_dir)
+    logging.info("scanResult sections referenced by the configs in %s: %s" % (args.config_dir,testssl_result_handler.referenced_scan_result_sections()))
+
+    work_dir = tempfile.mkdtemp(prefix="testssl_benchmark_")
+    try:
+        paths = write_synthetic_results(args.sample,work_dir,args.files,args.hosts,args.ciphers)
+        logging.info("Wrote %d synthetic result files of %s each (%d hosts, %d ciphers)" % (len(paths),mb(os.path.getsize(paths[0])),args.hosts,args.ciphers))
+
+        for json_loader, r in benchmark_loading(paths,testssl_result_handler.JSON_LOADERS).items():
+            print("%-10s files=%d files/sec=%.1f peak/file avg=%s max=%s retained/file avg=%s max=%s" %
+                  (json_loader,r['files'],r['files'] / r['seconds'],
+                   mb(r['peak_bytes_avg']),mb(r['peak_bytes_max']),mb(r['retained_bytes_avg']),mb(r['retained_bytes_max'])))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+###########################
+# Main program
+##########################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-x', '--log-level', dest='log_level', default="INFO", help="log level, default INFO")
+    subparsers = parser.add_subparsers(dest='benchmark')
+
+    loading = subparsers.add_parser('loading', help="per file memory and speed of each --json-loader")
+    loading.add_argument('-s', '--sample', dest='sample', default=DEFAULT_SAMPLE, help="testssl.sh JSON result to base the synthetic results on, default the sample/ result")
+    loading.add_argument('-I', '--config-dir', dest='config_dir', default="./configs", help="result handler config YAML files to load (they determine the scanResult sections the streaming loader keeps), default './configs'")
+    loading.add_argument('-n', '--files', dest='files', type=int, default=20, help="number of synthetic result files, default 20")
+    loading.add_argument('-H', '--hosts', dest='hosts', type=int, default=16, help="scanResult entries per result, default 16")
+    loading.add_argument('-c', '--ciphers', dest='ciphers', type=int, default=370, help="ciphers per scanResult entry, default 370")
+    loading.set_defaults(run=run_loading)
+
+    processing = subparsers.add_parser('processing', help="files/sec, per file latency and per phase breakdown of processing result files w/ stub reactors")
+    processing.add_argument('-s', '--sample', dest='sample', default=DEFAULT_SAMPLE, help="testssl.sh JSON result to base the synthetic results on, default the sample/ result")
+    processing.add_argument('-I', '--config-dir', dest='config_dir', default="./configs", help="result handler config YAML files to evaluate against (their reactors are stubbed out), default './configs'")
+    processing.add_argument('-n', '--files', dest='files', type=int, default=200, help="number of synthetic result files, default 200")
+    processing.add_argument('-H', '--hosts', dest='hosts', default="1,2,4", help="comma separated scanResult entry counts to choose from per result, default '1,2,4'")
+    processing.add_argument('-c', '--ciphers', dest='ciphers', default="0,50,370", help="comma separated cipher counts to choose from per result, default '0,50,370'")
+    processing.add_argument('-t', '--threads', dest='threads', type=int, default=1, help="threads processing result files concurrently, default 1")
+    processing.add_argument('-w', '--warmup', dest='warmup', type=int, default=5, help="result files to process before measuring, default 5")
+    processing.add_argument('-e', '--objectpath-engine', dest='objectpath_engine', default="objectpath", choices=testssl_result_handler.OBJECTPATH_ENGINES, help="default 'objectpath'")
+    processing.add_argument('-J', '--json-loader', dest='json_loader', default="full", choices=testssl_result_handler.JSON_LOADERS, help="default 'full'")
+    processing.add_argument('-C', '--evaluation-cache-size', dest='evaluation_cache_size', type=int, default=0, help="size of the processor's EvaluationCache (synthetic results only repeat a scanResult when they draw the same counts and cert expiration), default 0 (disabled)")
+    processing.add_argument('-L', '--processing-log-level', dest='processing_log_level', default="WARNING", help="log level while processing (the processor logs per file at INFO), default WARNING")
+    processing.set_defaults(run=run_processing)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.getLevelName(args.log_level),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.benchmark is None:
+        parser.print_help()
+        sys.exit(1)
+
+    args.run(args)
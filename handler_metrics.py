@@ -0,0 +1,156 @@
+__author__ = "bitsofinfo"
+
+import threading
+import time
+
+# Minimal, dependency free, thread safe counters, gauges and histograms
+# rendered in the Prometheus text exposition format (see the /metrics
+# resource served by testssl_result_handler.py). Each metric is keyed by
+# a tuple of label values in the order of its label_names
+
+# default histogram buckets (seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if len(pairs) == 0:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs) + '}'
+
+
+class Counter():
+
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name + _labels(self.label_names, k), v) for k, v in sorted(self.values.items())]
+
+
+# Gauges are either set() or computed at render time by a function
+# returning {label_values: value}
+class Gauge(Counter):
+
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, label_names=(), function=None):
+        super().__init__(name, help_text, label_names)
+        self.function = function
+
+    def set(self, value, label_values=()):
+        with self.lock:
+            self.values[label_values] = value
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name + _labels(self.label_names, k), v) for k, v in sorted(self.function().items())]
+        return super().samples()
+
+
+class Histogram():
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label_values -> [bucket counts..., count, sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_values=()):
+        with self.lock:
+            counts = self.values.get(label_values)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 2)
+                self.values[label_values] = counts
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    # times the enclosed block, i.e. `with histogram.time(('json_load',)):`
+    def time(self, label_values=()):
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in sorted(self.values.items())]
+        samples = []
+        for label_values, counts in items:
+            for i, bound in enumerate(self.buckets):
+                samples.append((self.name + '_bucket' + _labels(self.label_names, label_values, [('le', bound)]), counts[i]))
+            samples.append((self.name + '_bucket' + _labels(self.label_names, label_values, [('le', '+Inf')]), counts[-2]))
+            samples.append((self.name + '_count' + _labels(self.label_names, label_values), counts[-2]))
+            samples.append((self.name + '_sum' + _labels(self.label_names, label_values), counts[-1]))
+        return samples
+
+
+class _Timer():
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, self.label_values)
+        return False
+
+
+class MetricsRegistry():
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=(), function=None):
+        return self.register(Gauge(name, help_text, label_names, function))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    # the Prometheus text exposition format of all metrics
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.append('# HELP %s %s' % (metric.name, metric.help_text))
+            lines.append('# TYPE %s %s' % (metric.name, metric.type_name))
+            for sample, value in metric.samples():
+                lines.append('%s %s' % (sample, repr(float(value))))
+        return '\n'.join(lines) + '\n'
+
+
+# the one MetricsRegistry
+registry = MetricsRegistry()
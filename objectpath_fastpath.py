@@ -0,0 +1,266 @@
+__author__ = "bitsofinfo"
+
+import threading
+
+# Native "fast path" evaluation of the common shapes of ObjectPath
+# expressions used in result handler configs, run directly against
+# the evaluation_doc python dicts w/out going through ObjectPath's
+# generic interpreter. Supported shapes (anything else is left to ObjectPath):
+#
+#   - paths:                 $.a.b.c, $.a.list[N].b
+#   - comparisons:           $.path is|is not|>|<|>=|<= LITERAL
+#   - selector filters:      $.path[@.field OP LITERAL]
+#                            $.path[split(@.field,'SEP')[N] OP LITERAL]
+#                            where OP is is|is not|>|<|>=|<=|in|not in
+#   - filter projections:    $.path[FILTER][@.field]
+#
+# Results are returned in the same raw form ObjectPath's Tree.execute()
+# would return them (i.e. selector results are iterators) so that the
+# ObjectPathContext post-processing behaves identically for both engines
+
+# ObjectPath's float comparison tolerance
+EPSILON = 0.0000000000000001
+
+COMPARISON_OPS = ('is', 'is not', '>', '<', '>=', '<=')
+SELECTOR_OPS = COMPARISON_OPS + ('in', 'not in')
+
+# the only value types we will hand to an operator, anything else
+# (dicts, lists) ObjectPath would re-interpret, so we bail on them
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# objectpath expression -> compiled fast path function (or None)
+compiled_fastpaths = {}
+compiled_fastpaths_lock = threading.RLock()
+
+
+# Raised when an expression, or the document it is being
+# run against, can not be handled natively and must be
+# evaluated by ObjectPath instead
+class FastPathUnsupported(Exception):
+    pass
+
+
+# ObjectPath's 'is' semantics (loose, type coercing equality)
+def _objectpath_is(fst, snd):
+    if fst == snd:
+        return True
+    if isinstance(fst, str):
+        return fst == str(snd)
+    if type(fst) is float or type(snd) is float:
+        return abs(float(fst) - float(snd)) < EPSILON
+    if type(fst) is int or type(snd) is int:
+        return int(fst) == int(snd)
+    return None
+
+def _objectpath_is_not(fst, snd):
+    ret = _objectpath_is(fst, snd)
+    if ret is None:
+        return False
+    return not ret
+
+OPERATORS = {
+    'is': _objectpath_is,
+    'is not': _objectpath_is_not,
+    '>': lambda fst, snd: fst > snd,
+    '<': lambda fst, snd: fst < snd,
+    '>=': lambda fst, snd: fst >= snd,
+    '<=': lambda fst, snd: fst <= snd,
+    'in': lambda fst, snd: fst in snd,
+    'not in': lambda fst, snd: fst not in snd
+}
+
+
+# literal operands: numbers, quoted strings and bare names
+def _literal(node):
+    if type(node) in (int, float, str):
+        return node
+    if type(node) is tuple and len(node) == 2 and node[0] == 'name':
+        return node[1]
+    raise FastPathUnsupported()
+
+
+# $ and .name / [N] traversals of dicts and lists
+def _compile_path(node):
+    if type(node) is not tuple:
+        raise FastPathUnsupported()
+
+    if node[0] == '(root)':
+        return lambda doc: doc
+
+    if node[0] == '.' and len(node) == 3 and type(node[2]) is tuple and node[2][0] == 'name':
+        parent = _compile_path(node[1])
+        key = node[2][1]
+
+        def get_key(doc):
+            fst = parent(doc)
+            if fst is None:
+                return None
+            if type(fst) is not dict:
+                raise FastPathUnsupported()
+            return fst.get(key)
+        return get_key
+
+    if node[0] == '[' and len(node) == 3 and type(node[2]) is int:
+        parent = _compile_path(node[1])
+        index = node[2]
+
+        def get_index(doc):
+            fst = parent(doc)
+            if not fst:
+                return fst
+            if type(fst) is not list:
+                raise FastPathUnsupported()
+            try:
+                return fst[index]
+            except IndexError:
+                return None
+        return get_index
+
+    raise FastPathUnsupported()
+
+
+# the left hand side of a selector, relative to the current (@) element
+def _compile_current_operand(node):
+    if type(node) is not tuple:
+        raise FastPathUnsupported()
+
+    # @.field
+    if node[0] == '.' and len(node) == 3 and node[1] == ('(current)',) \
+            and type(node[2]) is tuple and node[2][0] == 'name':
+        field = node[2][1]
+        return lambda current: current.get(field)
+
+    # split(@.field,'SEP')[N]
+    if node[0] == '[' and len(node) == 3 and type(node[2]) is int \
+            and type(node[1]) is tuple and len(node[1]) == 4 and node[1][:2] == ('fn', 'split') \
+            and type(node[1][3]) is str:
+        field_operand = _compile_current_operand(node[1][2])
+        separator = node[1][3]
+        index = node[2]
+
+        def split_field(current):
+            parts = field_operand(current).split(separator)
+            try:
+                return parts[index]
+            except IndexError:
+                return None
+        return split_field
+
+    raise FastPathUnsupported()
+
+
+# $.path[LHS OP LITERAL]
+#
+# Returns a function yielding (matches, empty) where `matches` is
+# the list of matching elements or None if the path yielded nothing,
+# in which case `empty` is that (None/empty) value as ObjectPath returns it as is
+def _compile_filter(node):
+    if type(node) is not tuple or node[0] != '[' or len(node) != 3:
+        raise FastPathUnsupported()
+
+    selector = node[2]
+    if type(selector) is not tuple or len(selector) != 3 or selector[0] not in SELECTOR_OPS:
+        raise FastPathUnsupported()
+
+    parent = _compile_path(node[1])
+    operand = _compile_current_operand(selector[1])
+    literal = _literal(selector[2])
+    operator = OPERATORS[selector[0]]
+
+    def select(doc):
+        fst = parent(doc)
+        if not fst:
+            return (None, fst)
+        if type(fst) is dict:
+            fst = [fst]
+        if type(fst) is not list:
+            raise FastPathUnsupported()
+
+        matches = []
+        for current in fst:
+            if type(current) is not dict:
+                raise FastPathUnsupported()
+
+            # like ObjectPath, elements that error are just not matched
+            try:
+                value = operand(current)
+            except Exception:
+                continue
+            if not isinstance(value, SCALAR_TYPES):
+                raise FastPathUnsupported()
+            try:
+                if operator(value, literal):
+                    matches.append(current)
+            except Exception:
+                pass
+        return (matches, None)
+    return select
+
+
+# $.path[FILTER][@.field]
+def _compile_projection(node):
+    if type(node) is not tuple or node[0] != '[' or len(node) != 3:
+        raise FastPathUnsupported()
+
+    projection = node[2]
+    if type(projection) is not tuple or len(projection) != 3 or projection[0] != '.' \
+            or projection[1] != ('(current)',) or type(projection[2]) is not tuple \
+            or projection[2][0] != 'name':
+        raise FastPathUnsupported()
+
+    select = _compile_filter(node[1])
+    field = projection[2][1]
+
+    def project(doc):
+        matches, empty = select(doc)
+        if matches is None:
+            return empty
+        return iter([e[field] for e in matches if field in e])
+    return project
+
+
+def _compile(ast):
+    # $.path OP LITERAL
+    if type(ast) is tuple and len(ast) == 3 and ast[0] in COMPARISON_OPS:
+        path = _compile_path(ast[1])
+        literal = _literal(ast[2])
+        operator = OPERATORS[ast[0]]
+        return lambda doc: operator(path(doc), literal)
+
+    try:
+        return _compile_projection(ast)
+    except FastPathUnsupported:
+        pass
+
+    try:
+        select = _compile_filter(ast)
+
+        # the matches are returned as an iterator like ObjectPath's generators
+        def filter_matches(doc):
+            matches, empty = select(doc)
+            if matches is None:
+                return empty
+            return iter(matches)
+        return filter_matches
+
+    except FastPathUnsupported:
+        pass
+
+    return _compile_path(ast)
+
+
+# Returns the fast path function for the given objectpath expression
+# (taking its parsed ObjectPath AST) or None if the expression
+# is not one of the supported shapes. Compiled functions are cached
+def compile_fastpath(objectpath_query, ast):
+    if objectpath_query in compiled_fastpaths:
+        return compiled_fastpaths[objectpath_query]
+
+    with compiled_fastpaths_lock:
+        if objectpath_query not in compiled_fastpaths:
+            try:
+                compiled_fastpaths[objectpath_query] = _compile(ast)
+            except FastPathUnsupported:
+                compiled_fastpaths[objectpath_query] = None
+
+    return compiled_fastpaths[objectpath_query]
@@ -0,0 +1,93 @@
+__author__ = "bitsofinfo"
+
+from jinja2 import Environment, meta
+import functools
+import threading
+
+try:
+    from jinja2 import pass_context
+except ImportError:
+    from jinja2 import contextfilter as pass_context
+
+# The key under which the ObjectPathContext for the document
+# currently being rendered is passed into a template's context
+OBJECTPATH_CTX_KEY = '_objectpath_ctx'
+
+
+# The exec_objectpath* filters resolve the ObjectPathContext from
+# the render context rather than being bound to a specific context,
+# this is what permits a compiled template to be shared across documents
+@pass_context
+def _exec_objectpath(context, objectpath_query):
+    return context[OBJECTPATH_CTX_KEY].exec_objectpath(objectpath_query)
+
+@pass_context
+def _exec_objectpath_specific_match(context, objectpath_query, force_return_index_on_multiple_results=None):
+    return context[OBJECTPATH_CTX_KEY].exec_objectpath_specific_match(objectpath_query, force_return_index_on_multiple_results)
+
+@pass_context
+def _exec_objectpath_first_match(context, objectpath_query):
+    return context[OBJECTPATH_CTX_KEY].exec_objectpath_first_match(objectpath_query)
+
+
+# O(1) finding lookups via the ObjectPathContext's finding_index
+# usable as functions, finding('cert_notAfter'), or filters, 'cert_notAfter'|finding
+# scan_result_index defaults to the ObjectPathContext's (the scope's) scanResult entry
+@pass_context
+def _finding(context, finding_id, section='serverDefaults', scan_result_index=None):
+    return context[OBJECTPATH_CTX_KEY].finding(finding_id, section, scan_result_index)
+
+@pass_context
+def _findings(context, finding_id, section='serverDefaults', scan_result_index=None):
+    return context[OBJECTPATH_CTX_KEY].findings(finding_id, section, scan_result_index)
+
+@pass_context
+def _findings_by_severity(context, severity, section, scan_result_index=None):
+    return context[OBJECTPATH_CTX_KEY].findings_by_severity(severity, section, scan_result_index)
+
+
+# The one jinja2 Environment shared by all reactors
+environment = Environment()
+environment.filters['exec_objectpath'] = _exec_objectpath
+environment.filters['exec_objectpath_specific_match'] = _exec_objectpath_specific_match
+environment.filters['exec_objectpath_first_match'] = _exec_objectpath_first_match
+
+for name, fn in (('finding', _finding), ('findings', _findings), ('findings_by_severity', _findings_by_severity)):
+    environment.filters[name] = fn
+    environment.globals[name] = fn
+
+# template source -> compiled jinja2 Template
+compiled_templates = {}
+compiled_templates_lock = threading.RLock()
+
+
+# Returns the compiled jinja2 Template for the given template
+# source, compiling it only on first use
+def get_template(template_source):
+    template = compiled_templates.get(template_source)
+    if template is None:
+        with compiled_templates_lock:
+            template = compiled_templates.get(template_source)
+            if template is None:
+                template = environment.from_string(template_source)
+                compiled_templates[template_source] = template
+    return template
+
+
+# The top level context variables the template source references
+@functools.lru_cache(maxsize=1024)
+def referenced_variables(template_source):
+    return frozenset(meta.find_undeclared_variables(environment.parse(template_source)))
+
+
+# Returns True if the given reactor config value
+# looks like a jinja2 template worth precompiling
+def is_template(value):
+    return isinstance(value, str) and ('{{' in value or '{%' in value)
+
+
+# Renders the (cached) compiled template for template_source
+# with `context` as its root and the exec_objectpath* filters
+# evaluating against the given objectpath_ctx
+def render(template_source, context, objectpath_ctx):
+    return get_template(template_source).render(context, **{OBJECTPATH_CTX_KEY: objectpath_ctx})
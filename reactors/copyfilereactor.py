@@ -1,14 +1,189 @@
 __author__ = "bitsofinfo"
 
-from jinja2 import Template, Environment
+import reactor_templates
 import time
-import json
 import logging
 import pathlib
 import shutil
 import os
+import heapq
+import threading
+import fcntl
+
+COPY_MODES = ['copy','hardlink','symlink','reflink']
+
+# linux FICLONE ioctl, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+# clones src to dst sharing its data blocks (btrfs, xfs...)
+# raises OSError where the filesystem does not support it
+def reflink(src, dst):
+    with open(src,'rb') as s, open(dst,'wb') as d:
+        fcntl.ioctl(d.fileno(),FICLONE,s.fileno())
+    shutil.copystat(src,dst)
+
+
+# Places copy_from (a file) at copy_to (a file or existing directory)
+# using the given copy_mode, falling back to a plain copy when a link
+# or clone is not possible (i.e. across devices). Returns the mode used
+def place_file(copy_from, copy_to, copy_mode):
+    if copy_mode == 'copy':
+        shutil.copy(copy_from,copy_to)
+        return 'copy'
+
+    target = copy_to
+    if os.path.isdir(target):
+        target = os.path.join(target,os.path.basename(copy_from))
+
+    # link/clone next to the target then swap it in, so an
+    # existing target is replaced as shutil.copy would do
+    tmp_target = target + ".tmp" + str(threading.get_ident())
+    try:
+        if copy_mode == 'hardlink':
+            os.link(copy_from,tmp_target)
+        elif copy_mode == 'symlink':
+            os.symlink(os.path.abspath(copy_from),tmp_target)
+        elif copy_mode == 'reflink':
+            reflink(copy_from,tmp_target)
+        os.replace(tmp_target,target)
+        return copy_mode
+    except OSError as e:
+        if os.path.lexists(tmp_target):
+            os.unlink(tmp_target)
+        logging.debug("CopyFileReactor: " + copy_mode + " of " + copy_from + " failed (" + str(e) + "), copying")
+        shutil.copy(copy_from,copy_to)
+        return 'copy'
+
+
+# Deletes the directories under a cleanup 'path' whose mtime is older than
+# 'delete_older_than_days', every 'interval_seconds', on a background thread.
+# Rather than walking the whole tree each sweep, it keeps a heap of the
+# directories ordered by mtime (seeded by a walk at startup and kept up to
+# date as CopyFileReactors copy into it) so a sweep only visits expired entries.
+# Directories created by anything else (i.e. a --batch run, other writers) are
+# picked up by re-walking the tree every 'rescan_interval_seconds' (default
+# every 24 sweeps). One janitor is shared by all the CopyFileReactors w/ the same cleanup path
+class CleanupJanitor():
+
+    # abs path -> CleanupJanitor
+    janitors = {}
+    janitors_lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, cleanup):
+        path = os.path.abspath(cleanup['path'])
+        with cls.janitors_lock:
+            janitor = cls.janitors.get(path)
+            if janitor is None:
+                interval_seconds = float(cleanup.get('interval_seconds',3600))
+                janitor = CleanupJanitor(path,
+                                         float(cleanup['delete_older_than_days']),
+                                         interval_seconds,
+                                         float(cleanup.get('rescan_interval_seconds',interval_seconds * 24)))
+                cls.janitors[path] = janitor
+            janitor.users += 1
+            return janitor
+
+    @classmethod
+    def release(cls, janitor):
+        with cls.janitors_lock:
+            janitor.users -= 1
+            if janitor.users <= 0:
+                cls.janitors.pop(janitor.path,None)
+                janitor.stop()
+
+    def __init__(self, path, delete_older_than_days, interval_seconds, rescan_interval_seconds):
+        self.path = path
+        self.delete_older_than_days = delete_older_than_days
+        self.interval_seconds = interval_seconds
+        self.rescan_interval_seconds = rescan_interval_seconds
+        self.users = 0
+
+        # heap of (mtime, dir) and dir -> mtime last pushed for it
+        # (heap entries that disagree w/ the latter are stale)
+        self.heap = []
+        self.mtimes = {}
+        self.lock = threading.Lock()
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run,name="cleanup-janitor",daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    # (re)indexes the dir at its current mtime
+    def index(self, _dir):
+        try:
+            mtime = os.path.getmtime(_dir)
+        except OSError:
+            return
+        with self.lock:
+            if self.mtimes.get(_dir) != mtime:
+                self.mtimes[_dir] = mtime
+                heapq.heappush(self.heap,(mtime,_dir))
+
+    # indexes the dir a file was just copied to and
+    # its parents up to (but not including) our path
+    def copied_to(self, target_dir):
+        _dir = os.path.abspath(target_dir)
+        while _dir.startswith(self.path + os.sep):
+            self.index(_dir)
+            _dir = os.path.dirname(_dir)
+
+    # (re)indexes every dir under our path
+    def walk(self):
+        logging.debug("CopyFileReactor: cleanup janitor indexing " + self.path + "...")
+        for root, dirs, files in os.walk(self.path):
+            for _dir in dirs:
+                self.index(os.path.join(root,_dir))
+
+    def run(self):
+        walked_at = None
+        while not self.stopped.is_set():
+            try:
+                if walked_at is None or (time.monotonic() - walked_at) >= self.rescan_interval_seconds:
+                    walked_at = time.monotonic()
+                    self.walk()
+                self.sweep()
+            except Exception as e:
+                logging.exception("CopyFileReactor: cleanup janitor error sweeping " + self.path)
+            self.stopped.wait(self.interval_seconds)
+
+    def sweep(self):
+        purge_older_than = time.time() - (self.delete_older_than_days * 86400) # 86400 = 24 hours = 1 day
+        removed = 0
+        while True:
+            with self.lock:
+                if len(self.heap) == 0 or self.heap[0][0] >= purge_older_than:
+                    break
+                mtime, toeval = heapq.heappop(self.heap)
+                if self.mtimes.get(toeval) != mtime:
+                    continue
+                del self.mtimes[toeval]
+
+            # may have been touched since indexed, or removed w/ a parent
+            try:
+                dir_timestamp = os.path.getmtime(toeval)
+            except OSError:
+                continue
+            if dir_timestamp >= purge_older_than:
+                self.index(toeval)
+                continue
+
+            logging.debug("CopyFileReactor: cleanup: removing old directory: " +toeval)
+            shutil.rmtree(toeval,ignore_errors=True)
+            removed += 1
+
+            # its parent's mtime just changed
+            parent = os.path.dirname(toeval)
+            if parent.startswith(self.path + os.sep):
+                self.index(parent)
+
+        if removed > 0:
+            logging.info("CopyFileReactor: cleanup of " + self.path + " removed " + str(removed) + " directories")
 
-import requests
 
 class CopyFileReactor():
 
@@ -21,6 +196,20 @@ class CopyFileReactor():
     # cleanup config
     cleanup = None
 
+    # our CleanupJanitor, when cleanup is configured
+    janitor = None
+
+    # once closed we never (re)acquire a CleanupJanitor, triggers still
+    # queued for us after a config reload/delete are handled w/out one
+    closed = False
+
+    # set by the ReactorRegistry in --batch worker processes, which do
+    # not run a CleanupJanitor (cleanup is left to the watching daemon)
+    batch = False
+
+    # one of COPY_MODES
+    copy_mode = 'copy'
+
     # Constructor
     # passed the raw reactor_config object
     def __init__(self, reactor_config):
@@ -30,6 +219,31 @@ class CopyFileReactor():
         if 'cleanup' in reactor_config:
             self.cleanup = reactor_config['cleanup']
 
+        self.copy_mode = reactor_config.get('copy_mode',self.copy_mode)
+        if self.copy_mode not in COPY_MODES:
+            raise ValueError("CopyFileReactor: invalid copy_mode '%s' must be one of %s" % (self.copy_mode,COPY_MODES))
+
+        # target directories we have already created
+        self.created_dirs = set()
+        self.created_dirs_lock = threading.Lock()
+
+        # guards janitor/closed
+        self.janitor_lock = threading.Lock()
+
+    # cleanup is handled in the background by a CleanupJanitor
+    # (called once by the ReactorRegistry when we are created)
+    def start(self):
+        with self.janitor_lock:
+            if self.cleanup is not None and self.janitor is None and not self.closed and not self.batch:
+                self.janitor = CleanupJanitor.acquire(self.cleanup)
+
+    def close(self):
+        with self.janitor_lock:
+            self.closed = True
+            if self.janitor is not None:
+                CleanupJanitor.release(self.janitor)
+                self.janitor = None
+
 
     # When invoked this is passed
     #
@@ -63,49 +277,61 @@ class CopyFileReactor():
     #
     def handleTriggers(self, triggers_fired, objectpath_ctx):
 
-        # Create an Jinja2 Environment
-        # and register a new filter for the exec_objectpath methods
-        env = Environment()
-        env.filters['exec_objectpath'] = objectpath_ctx.exec_objectpath
-        env.filters['exec_objectpath_specific_match'] = objectpath_ctx.exec_objectpath_specific_match
-        env.filters['exec_objectpath_first_match'] = objectpath_ctx.exec_objectpath_first_match
-
-        # optionally handle cleanup if configured
-        if self.cleanup is not None:
-            logging.debug("CopyFileReactor: attempting cleanup of " + self.cleanup['path'] + " older than " + str(self.cleanup['delete_older_than_days']) + " days...")
-            now = time.time() # in seconds!
-            purge_older_than = now - (float(self.cleanup['delete_older_than_days']) * 86400) # 86400 = 24 hours = 1 day
-            for root, dirs, files in os.walk(self.cleanup['path'], topdown=False):
-                for _dir in dirs:
-                    toeval = root+"/"+_dir
-                    dir_timestamp = os.path.getmtime(toeval)
-                    if dir_timestamp < purge_older_than:
-                        logging.debug("CopyFileReactor: cleanup: removing old directory: " +toeval)
-                        shutil.rmtree(toeval)
+        # (from,to) pairs already handled in this call
+        copied = set()
 
         for t in triggers_fired:
 
+            rendered_copy_from = None
+            rendered_copy_to = None
             try:
-                # FROM
-                copy_from_template = env.from_string(self.copy_from)
-                rendered_copy_from = copy_from_template.render(t)
+                # FROM (templates are compiled once and cached)
+                rendered_copy_from = reactor_templates.render(self.copy_from,t,objectpath_ctx)
 
                 # TO
-                copy_to_template = env.from_string(self.copy_to)
-                rendered_copy_to = copy_to_template.render(t)
+                rendered_copy_to = reactor_templates.render(self.copy_to,t,objectpath_ctx)
 
                 if not os.path.isfile(rendered_copy_from):
                     logging.error("skipping: trigger['"+t['title']+"'] copy_from: yielded a non-existant path: " + rendered_copy_from)
                     continue
 
 
+                # i.e. the same file to the same dir by several triggers
+                if (rendered_copy_from,rendered_copy_to) in copied:
+                    logging.debug("CopyFileReactor: already copied " + rendered_copy_from + " TO " + rendered_copy_to)
+                    continue
+                copied.add((rendered_copy_from,rendered_copy_to))
+
                 # make all target directories
-                pathlib.Path(rendered_copy_to).mkdir(parents=True, exist_ok=True)
+                self.makedirs(rendered_copy_to)
 
-                # execute the copy
-                shutil.copy(rendered_copy_from,rendered_copy_to)
+                # execute the copy, the target dir may have
+                # been cleaned up since we (cached that we) created it
+                try:
+                    mode_used = place_file(rendered_copy_from,rendered_copy_to,self.copy_mode)
+                except FileNotFoundError:
+                    self.makedirs(rendered_copy_to,force=True)
+                    mode_used = place_file(rendered_copy_from,rendered_copy_to,self.copy_mode)
 
-                logging.info("CopyFileReactor: Copied OK " + rendered_copy_from + " TO " + rendered_copy_to)
+                logging.info("CopyFileReactor: Copied OK (" + mode_used + ") " + rendered_copy_from + " TO " + rendered_copy_to)
+
+                janitor = self.janitor
+                if janitor is not None:
+                    janitor.copied_to(rendered_copy_to)
 
             except Exception as e:
-                logging.exception("CopyFileReactor: Error copying " + rendered_copy_from + " TO " + rendered_copy_to)
+                logging.exception("CopyFileReactor: Error copying " + str(rendered_copy_from) + " TO " + str(rendered_copy_to))
+
+    # mkdir -p, skipped for dirs we already created that still
+    # exist (a CleanupJanitor may have removed them since, copying
+    # to a removed dir would create a file at its path)
+    def makedirs(self, target_dir, force=False):
+        with self.created_dirs_lock:
+            cached = target_dir in self.created_dirs
+        if not force and cached and os.path.isdir(target_dir):
+            return
+        pathlib.Path(target_dir).mkdir(parents=True, exist_ok=True)
+        with self.created_dirs_lock:
+            if len(self.created_dirs) >= 10000:
+                self.created_dirs.clear()
+            self.created_dirs.add(target_dir)
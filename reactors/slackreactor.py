@@ -1,12 +1,41 @@
 __author__ = "bitsofinfo"
 
-from jinja2 import Template, Environment
+import reactor_templates
 import time
-from slackclient import SlackClient
 import json
 import logging
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
+
+# Slack's limit on attachments per message
+SLACK_MAX_ATTACHMENTS = 100
+
+
+# Simple blocking token bucket rate limiter
+class TokenBucket():
+
+    def __init__(self, rate_per_second, burst):
+        self.rate_per_second = float(rate_per_second)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    # blocks until a token is available
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + ((now - self.last_refill) * self.rate_per_second))
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
 
 class SlackReactor():
 
@@ -16,12 +45,58 @@ class SlackReactor():
     # jinja2
     template = None
 
+    # max posts/second to the webhook and burst allowance
+    rate_limit_per_second = 1.0
+    rate_limit_burst = 5
+
+    # retries (w/ exponential backoff, or Retry-After when
+    # given) of 429s, 5xxs and connection errors
+    max_retries = 5
+    retry_backoff_seconds = 1.0
+    request_timeout_seconds = 10
+
+    # if > 0, alerts are held for this many seconds and merged
+    # into as few messages as max_attachments_per_message permits
+    coalesce_seconds = 0
+    max_attachments_per_message = SLACK_MAX_ATTACHMENTS
+
     # Constructor
     # passed the raw reactor_config object
     def __init__(self, reactor_config):
         self.webhook_url = reactor_config['webhook_url']
         self.template = reactor_config['template']
 
+        self.rate_limit_per_second = float(reactor_config.get('rate_limit_per_second',self.rate_limit_per_second))
+        self.rate_limit_burst = int(reactor_config.get('rate_limit_burst',self.rate_limit_burst))
+        self.max_retries = int(reactor_config.get('max_retries',self.max_retries))
+        self.retry_backoff_seconds = float(reactor_config.get('retry_backoff_seconds',self.retry_backoff_seconds))
+        self.request_timeout_seconds = float(reactor_config.get('request_timeout_seconds',self.request_timeout_seconds))
+        self.coalesce_seconds = float(reactor_config.get('coalesce_seconds',self.coalesce_seconds))
+        self.max_attachments_per_message = min(SLACK_MAX_ATTACHMENTS,int(reactor_config.get('max_attachments_per_message',self.max_attachments_per_message)))
+
+        self.rate_limiter = TokenBucket(self.rate_limit_per_second,self.rate_limit_burst)
+
+        # keep-alive connections to the webhook
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,pool_maxsize=int(reactor_config.get('pool_maxsize',4)))
+        self.session.mount('https://',adapter)
+        self.session.mount('http://',adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        # messages waiting out the coalesce_seconds window
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.flush_timer = None
+
+    # Flushes any coalesced messages and closes our connections
+    def close(self):
+        with self.pending_lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+        self.flush()
+        self.session.close()
+
 
     # When invoked this is passed
     #
@@ -55,25 +130,15 @@ class SlackReactor():
     #
     def handleTriggers(self, triggers_fired, objectpath_ctx):
 
-        # Create an Jinja2 Environment
-        # and register a new filter for the exec_objectpath methods
-        env = Environment()
-        env.filters['exec_objectpath'] = objectpath_ctx.exec_objectpath
-        env.filters['exec_objectpath_specific_match'] = objectpath_ctx.exec_objectpath_specific_match
-        env.filters['exec_objectpath_first_match'] = objectpath_ctx.exec_objectpath_first_match
-
         # Create out standard header text and attachment
-        slack_template = env.from_string(self.template)
-        rendered_template = slack_template.render(objectpath_ctx.evaluation_doc)
+        # (the template is compiled once and cached)
+        rendered_template = reactor_templates.render(self.template,objectpath_ctx.evaluation_doc,objectpath_ctx)
 
         # Convert to an object we can now append trigger results to
         slack_data = json.loads(rendered_template)
 
         for t in triggers_fired:
 
-            print(t['testssl_json_result_abs_file_path'])
-            print(t['config_filename'])
-
             attachment_title = t['title']
             attachment_text = "```\n"
             for r in t['results']:
@@ -82,13 +147,88 @@ class SlackReactor():
             slack_data['attachments'].append({'title':attachment_title,'text':attachment_text, 'color':'danger'})
 
 
-        logging.debug("SlackReactor: Sending to slack....")
-        response = requests.post(
-            self.webhook_url, data=json.dumps(slack_data),
-            headers={'Content-Type': 'application/json'}
-        )
-        if response.status_code != 200:
-            raise ValueError(
-                'SlackReactor: Request to slack returned an error %s, the response is:\n%s'
-                % (response.status_code, response.text)
-            )
+        if self.coalesce_seconds > 0:
+            with self.pending_lock:
+                self.pending.append(slack_data)
+                if self.flush_timer is None:
+                    self.flush_timer = threading.Timer(self.coalesce_seconds,self.flush)
+                    self.flush_timer.daemon = True
+                    self.flush_timer.start()
+            return
+
+        self.post(slack_data)
+
+    # Merges the given messages into as few messages as
+    # max_attachments_per_message permits, each message's
+    # text is kept as the header of its attachments
+    def coalesce(self, messages):
+        merged = []
+        current = None
+        for message in messages:
+            attachments = [dict(a) for a in message.get('attachments',[])]
+            if len(attachments) > 0:
+                attachments[0]['pretext'] = message.get('text','')
+            else:
+                attachments = [{'pretext':message.get('text','')}]
+
+            # a single message w/ too many attachments is split
+            for i in range(0,len(attachments),self.max_attachments_per_message):
+                chunk = attachments[i:i + self.max_attachments_per_message]
+                if current is None or (len(current['attachments']) + len(chunk)) > self.max_attachments_per_message:
+                    current = {'attachments':[]}
+                    merged.append(current)
+                current['attachments'].extend(chunk)
+
+        for m in merged:
+            m['text'] = "*testssl.sh -> %d alerts*" % len([a for a in m['attachments'] if 'pretext' in a])
+        return merged
+
+    # Sends all messages held for the coalesce_seconds window
+    def flush(self):
+        with self.pending_lock:
+            messages = self.pending
+            self.pending = []
+            self.flush_timer = None
+
+        if len(messages) == 0:
+            return
+
+        to_send = messages if len(messages) == 1 else self.coalesce(messages)
+        logging.debug("SlackReactor: coalesced %d alerts into %d messages" % (len(messages),len(to_send)))
+        for slack_data in to_send:
+            try:
+                self.post(slack_data)
+            except Exception as e:
+                logging.exception("SlackReactor: failed to send coalesced alert message")
+
+    # Rate limited post w/ retries to the webhook_url
+    def post(self, slack_data):
+        body = json.dumps(slack_data)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            attempt += 1
+
+            logging.debug("SlackReactor: Sending to slack....")
+            retry_after = None
+            try:
+                response = self.session.post(self.webhook_url, data=body, timeout=self.request_timeout_seconds)
+                if response.status_code == 200:
+                    return
+                error = 'SlackReactor: Request to slack returned an error %s, the response is:\n%s' % (response.status_code, response.text)
+                if response.status_code != 429 and response.status_code < 500:
+                    raise ValueError(error)
+                retry_after = response.headers.get('Retry-After')
+            except requests.exceptions.RequestException as e:
+                error = 'SlackReactor: Request to slack failed: %s' % str(e)
+
+            if attempt > self.max_retries:
+                raise ValueError(error + ' (gave up after %d attempts)' % attempt)
+
+            try:
+                wait_seconds = float(retry_after)
+            except (TypeError, ValueError):
+                wait_seconds = self.retry_backoff_seconds * (2 ** (attempt - 1))
+
+            logging.warning(error + ' retrying in %.1fs' % wait_seconds)
+            time.sleep(wait_seconds)
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pytest
+import yaml
+
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_FILENAME_FILTER = r'.*_testssl_.+\.json'
+
+
+@pytest.fixture
+def input_dir(tmpdir):
+    input_dir = str(tmpdir.join('input'))
+    shutil.copytree(os.path.join(REPO_DIR, 'sample'), input_dir)
+    return input_dir
+
+
+@pytest.fixture
+def config_dir(tmpdir):
+    config_dir = str(tmpdir.join('configs'))
+    os.makedirs(config_dir)
+    return config_dir
+
+
+def write_config(config_dir, reactor_engines):
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        config = yaml.safe_load(stream)
+    config['reactor_engines'] = reactor_engines
+    with open(os.path.join(config_dir, 'c.yaml'), 'w') as stream:
+        yaml.safe_dump(config, stream)
+
+
+def run_batch(input_dir, config_dir, processed_ledger=None):
+    return testssl_result_handler.run_batch(input_dir, config_dir, 1, False, INPUT_FILENAME_FILTER, False, False,
+                                            processed_ledger=processed_ledger)
+
+
+def test_fails_when_no_configs_load(input_dir, config_dir):
+    with open(os.path.join(config_dir, 'c.yaml'), 'w') as stream:
+        stream.write('not: [valid')
+    assert run_batch(input_dir, config_dir) == 1
+
+
+def test_succeeds_when_evaluated_and_reacted(input_dir, config_dir, tmpdir):
+    write_config(config_dir, {})
+    assert run_batch(input_dir, config_dir) == 0
+
+
+def test_failed_reactors_count_and_are_retried(input_dir, config_dir, tmpdir):
+    # nothing listens on port 9, the post fails w/out retries
+    write_config(config_dir, {'slack': {'class_name': 'SlackReactor',
+                                        'webhook_url': 'http://127.0.0.1:9/webhook',
+                                        'template': '{"text": "x", "attachments": []}',
+                                        'max_retries': 0,
+                                        'request_timeout_seconds': 1}})
+    ledger = str(tmpdir.join('ledger.db'))
+    assert run_batch(input_dir, config_dir, ledger) == 1
+    # not recorded as processed in the ledger
+    assert run_batch(input_dir, config_dir, ledger) == 1
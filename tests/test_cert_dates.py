@@ -0,0 +1,66 @@
+import datetime
+import glob
+import os
+
+import pytest
+import yaml
+
+import testssl_result_handler
+from testssl_result_handler import parse_cert_date
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture
+def dateutil_calls(monkeypatch):
+    parse_cert_date.cache_clear()
+    calls = []
+    parse = testssl_result_handler.dateparser.parse
+
+    def counting_parse(*args, **kwargs):
+        calls.append(args[0])
+        return parse(*args, **kwargs)
+    monkeypatch.setattr(testssl_result_handler.dateparser, 'parse', counting_parse)
+    yield calls
+    parse_cert_date.cache_clear()
+
+
+@pytest.mark.parametrize('cert_date_str, expected', [
+    ('2019-01-22 06:14', datetime.datetime(2019, 1, 22, 6, 14, tzinfo=UTC)),
+    ('2019-01-22 06:14:30', datetime.datetime(2019, 1, 22, 6, 14, 30, tzinfo=UTC)),
+    ('2019-01-22T06:14 UTC', datetime.datetime(2019, 1, 22, 6, 14, tzinfo=UTC)),
+    ('2019-01-22 06:14 +0200', datetime.datetime(2019, 1, 22, 4, 14, tzinfo=UTC)),
+    ('2019-01-22 06:14 -05:30', datetime.datetime(2019, 1, 22, 11, 44, tzinfo=UTC)),
+])
+def test_testssl_dates_are_parsed_wout_dateutil(dateutil_calls, cert_date_str, expected):
+    assert parse_cert_date(cert_date_str) == expected
+    assert parse_cert_date(cert_date_str).tzinfo is not None
+    assert dateutil_calls == []
+
+
+@pytest.mark.parametrize('cert_date_str, expected', [
+    ('Jan 22 06:14:00 2019 GMT', datetime.datetime(2019, 1, 22, 6, 14, tzinfo=UTC)),
+    ('22 January 2019 06:14', datetime.datetime(2019, 1, 22, 6, 14, tzinfo=UTC)),
+])
+def test_other_dates_fall_back_to_dateutil(dateutil_calls, cert_date_str, expected):
+    assert parse_cert_date(cert_date_str) == expected
+    assert dateutil_calls == [cert_date_str]
+
+
+def test_cert_expires_in_days_is_relative_to_the_injected_clock():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        plan = testssl_result_handler.HandlerConfigPlan('example-config.yaml', yaml.safe_load(stream))
+    processor = testssl_result_handler.TestsslResultProcessor()
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH)
+    finding_index = testssl_result_handler.build_finding_index(testssl_result_file.testssl_result)
+
+    # the sample's cert_notAfter is 2019-01-22 06:14
+    for now, expected_days in [(datetime.datetime(2019, 1, 12, 6, 14, tzinfo=UTC), 10),
+                               (datetime.datetime(2019, 1, 12, 6, 15, tzinfo=UTC), 9),
+                               (datetime.datetime(2019, 1, 23, 6, 14, tzinfo=UTC), -1)]:
+        processor.clock = lambda: now
+        evaluation_doc = processor.buildEvaluationDoc(plan, testssl_result_file, os.path.dirname(SAMPLE_PATH), finding_index)
+        objectpath_ctx = processor.evaluateCertExpiration(plan, evaluation_doc, finding_index)
+        assert objectpath_ctx.evaluation_doc['cert_expires_in_days'] == expected_days
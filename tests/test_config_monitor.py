@@ -0,0 +1,75 @@
+import os
+
+import pytest
+import yaml
+from watchdog.events import FileMovedEvent
+
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def config():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        config = yaml.safe_load(stream)
+    # no reactors, nothing to post or copy
+    config['reactor_engines'] = {}
+    return config
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(testssl_result_handler, 'result_handler_config_snapshot', testssl_result_handler.current_config_snapshot())
+    monkeypatch.setattr(testssl_result_handler, 'reactor_registry', testssl_result_handler.ReactorRegistry())
+    return testssl_result_handler.HandlerConfigFileMonitor()
+
+
+def write_config(path, config):
+    with open(path, 'w') as stream:
+        yaml.safe_dump(config, stream)
+
+
+def titles(config_filename):
+    plan = testssl_result_handler.current_config_snapshot().plans[config_filename]
+    return {t['tag']: t['title'] for t in plan.triggers}
+
+
+def test_existing_configs_are_loaded(tmpdir, config, monitor):
+    write_config(str(tmpdir.join('c.yaml')), config)
+    write_config(str(tmpdir.join('d.yml')), config)
+    tmpdir.join('c.yaml.tmp').write('not: [valid')
+    tmpdir.join('README').write('not a config')
+
+    testssl_result_handler.load_existing_configs(str(tmpdir), monitor)
+
+    plans = testssl_result_handler.current_config_snapshot().plans
+    assert sorted(plans) == ['c.yaml', 'd.yml']
+    assert titles('c.yaml')['cert_expired'] == config['trigger_on']['cert_expired']['title']
+
+
+def test_config_renamed_over_is_reloaded(tmpdir, config, monitor):
+    config_path = str(tmpdir.join('c.yaml'))
+    write_config(config_path, config)
+    testssl_result_handler.load_existing_configs(str(tmpdir), monitor)
+    version = testssl_result_handler.current_config_snapshot().version
+
+    # how editors/sed -i save: write a temp file, rename it over the config
+    config['trigger_on']['cert_expired']['title'] = 'Renamed over'
+    write_config(config_path + '.tmp', config)
+    os.rename(config_path + '.tmp', config_path)
+    monitor.on_moved(FileMovedEvent(config_path + '.tmp', config_path))
+
+    assert testssl_result_handler.current_config_snapshot().version == version + 1
+    assert titles('c.yaml')['cert_expired'] == 'Renamed over'
+
+
+def test_config_renamed_away_is_removed(tmpdir, config, monitor):
+    config_path = str(tmpdir.join('c.yaml'))
+    write_config(config_path, config)
+    testssl_result_handler.load_existing_configs(str(tmpdir), monitor)
+
+    os.rename(config_path, config_path + '.disabled')
+    monitor.on_moved(FileMovedEvent(config_path, config_path + '.disabled'))
+
+    assert 'c.yaml' not in testssl_result_handler.current_config_snapshot().plans
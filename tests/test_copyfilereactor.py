@@ -0,0 +1,65 @@
+import os
+import shutil
+import time
+
+import pytest
+
+import testssl_result_handler
+from reactors.copyfilereactor import CleanupJanitor, CopyFileReactor
+
+
+@pytest.fixture
+def result_file(tmpdir):
+    path = tmpdir.join('input', 'r_testssl_a.json')
+    path.write('{}', ensure=True)
+    return str(path)
+
+
+def copy(reactor, result_file, tag):
+    trigger = {'tag': tag, 'title': tag, 'testssl_json_result_abs_file_path': result_file}
+    reactor.handleTriggers([trigger], testssl_result_handler.ObjectPathContext({}, False, False))
+
+
+def test_copies_into_a_cached_target_dir_removed_since(tmpdir, result_file):
+    output_dir = str(tmpdir.join('output'))
+    reactor = CopyFileReactor({'copy_from': '{{testssl_json_result_abs_file_path}}',
+                               'copy_to': output_dir + '/{{tag}}'})
+    copy(reactor, result_file, 'x')
+    assert os.path.isfile(os.path.join(output_dir, 'x', 'r_testssl_a.json'))
+
+    # i.e. by a CleanupJanitor
+    shutil.rmtree(os.path.join(output_dir, 'x'))
+
+    copy(reactor, result_file, 'x')
+    assert os.path.isdir(os.path.join(output_dir, 'x'))
+    assert os.path.isfile(os.path.join(output_dir, 'x', 'r_testssl_a.json'))
+
+
+def wait_for(condition, timeout_seconds=5):
+    deadline = time.monotonic() + timeout_seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def make_dir(path, age_seconds):
+    os.makedirs(path)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_janitor_removes_expired_dirs_incl_those_created_since_it_started(tmpdir):
+    cleanup_dir = str(tmpdir.join('output'))
+    make_dir(os.path.join(cleanup_dir, 'expired'), 7200)
+    os.makedirs(os.path.join(cleanup_dir, 'fresh'))
+
+    janitor = CleanupJanitor(cleanup_dir, 1 / 24.0, 0.05, 0.2)
+    try:
+        assert wait_for(lambda: not os.path.exists(os.path.join(cleanup_dir, 'expired')))
+
+        # i.e. by a --batch run, never reported via copied_to()
+        make_dir(os.path.join(cleanup_dir, 'batch', 'expired'), 7200)
+        assert wait_for(lambda: not os.path.exists(os.path.join(cleanup_dir, 'batch', 'expired')))
+        assert os.path.isdir(os.path.join(cleanup_dir, 'fresh'))
+    finally:
+        janitor.stop()
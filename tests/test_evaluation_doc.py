@@ -0,0 +1,55 @@
+import glob
+import os
+
+import pytest
+import yaml
+
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+
+RECURSIVE_DESCENT_EXPRESSIONS = ["$..severity", "$..*[@.severity is 'LOW']", "$..id"]
+
+
+@pytest.fixture
+def config():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        config = yaml.safe_load(stream)
+    del config['evaluation_doc_config']['target_keys']['finding_index']
+    config['cert_expires_objectpath'] = "$.testssl_result.scanResult[0].serverDefaults[split(@.id,' ')[0] is 'cert_notAfter'][@.finding]"
+    return config
+
+
+def objectpath_ctx(config):
+    plan = testssl_result_handler.HandlerConfigPlan('c.yaml', config)
+    processor = testssl_result_handler.TestsslResultProcessor()
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH)
+    finding_index = testssl_result_handler.build_finding_index(testssl_result_file.testssl_result)
+    evaluation_doc = processor.buildEvaluationDoc(plan, testssl_result_file, os.path.dirname(SAMPLE_PATH), finding_index)
+    return processor.evaluateCertExpiration(plan, evaluation_doc, finding_index)
+
+
+def results_against_the_result_only(expression):
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH)
+    return testssl_result_handler.ObjectPathContext({'testssl_result': testssl_result_file.testssl_result}, False, False).exec_objectpath(expression)
+
+
+@pytest.mark.parametrize('expression', RECURSIVE_DESCENT_EXPRESSIONS)
+def test_recursive_descent_only_matches_the_result(config, expression):
+    results = objectpath_ctx(config).exec_objectpath(expression)
+    assert len(results) > 0
+    assert results == results_against_the_result_only(expression)
+
+
+def test_finding_lookups_wout_the_index_in_the_evaluation_doc(config):
+    ctx = objectpath_ctx(config)
+    assert 'finding_index' not in ctx.evaluation_doc
+    assert ctx.finding('cert_notAfter') == ctx.exec_objectpath_first_match(config['cert_expires_objectpath'])
+    assert len(ctx.findings_by_severity('LOW', 'serverDefaults')) > 0
+
+
+def test_finding_index_in_the_evaluation_doc_if_given_a_key(config):
+    config['evaluation_doc_config']['target_keys']['finding_index'] = 'findings'
+    ctx = objectpath_ctx(config)
+    assert ctx.exec_objectpath_first_match("$.findings[0].serverDefaults.by_id.cert_notAfter[0].finding") == ctx.finding('cert_notAfter')
@@ -0,0 +1,119 @@
+import copy
+import datetime
+import glob
+import os
+
+import pytest
+import yaml
+
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+
+# the sample's cert is valid from 2018-10-30 07:14 to 2019-01-22 06:14
+CLOCK = datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone.utc)
+FQDN_TRIGGER = {'objectpath': "$.result_metadata.fqdn is 'www.google.com'", 'title': 'fqdn', 'reactors': []}
+
+
+@pytest.fixture
+def config():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        config = yaml.safe_load(stream)
+    config['trigger_on']['fqdn'] = dict(FQDN_TRIGGER)
+    return config
+
+
+# Variants of the config whose triggers have the same objectpaths
+# but evaluate against a different evaluation_doc
+def variants(config):
+    cert_not_before = copy.deepcopy(config)
+    cert_not_before['cert_expires_objectpath'] = "$.finding_index[0].serverDefaults.by_id.cert_notBefore[0].finding"
+
+    days_key = copy.deepcopy(config)
+    days_key['evaluation_doc_config']['target_keys']['cert_expires_in_days'] = 'days'
+
+    grok = copy.deepcopy(config)
+    grok['path_properties_grok'] = '%{MANYPATHPARTS:ignored}/%{PATHPART:fqdn}/%{PATHPART:filename}'
+
+    return {'a.yaml': config, 'cert_not_before.yaml': cert_not_before, 'days_key.yaml': days_key, 'grok.yaml': grok}
+
+
+def snapshot(configs):
+    return testssl_result_handler.ConfigSnapshot(1, {name: testssl_result_handler.HandlerConfigPlan(name, config) for name, config in configs.items()})
+
+
+def processor(evaluation_cache=None, clock=CLOCK):
+    processor = testssl_result_handler.TestsslResultProcessor()
+    processor.clock = lambda: clock
+    processor.evaluation_cache = evaluation_cache
+    processor.evaluated = []
+    evaluate_trigger = processor.evaluateTrigger
+
+    def counting_evaluate_trigger(trigger, objectpath_ctx):
+        processor.evaluated.append(trigger['tag'])
+        return evaluate_trigger(trigger, objectpath_ctx)
+    processor.evaluateTrigger = counting_evaluate_trigger
+    return processor
+
+
+# config_filename -> (cert_expires_in_days, [(tag, results) of the triggers fired])
+def fired(processor, config_snapshot):
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH)
+    evaluations = processor.evaluateResultFile(testssl_result_file, os.path.dirname(SAMPLE_PATH), config_snapshot)
+    return {plan.config_filename: (objectpath_ctx.evaluation_doc.get(plan.target_keys['cert_expires_in_days']),
+                                   [(t['tag'], t['results']) for t in triggers_fired])
+            for plan, objectpath_ctx, triggers_fired in evaluations}
+
+
+def test_cache_hits_fire_the_same_triggers(config, tmpdir):
+    config_snapshot = snapshot({'a.yaml': config})
+    evaluation_cache = testssl_result_handler.EvaluationCache(persist_path=str(tmpdir.join('cache.db')))
+
+    miss = processor(evaluation_cache)
+    expected = fired(miss, config_snapshot)
+    assert len(evaluation_cache) == 1
+
+    for cache in (evaluation_cache, testssl_result_handler.EvaluationCache(persist_path=str(tmpdir.join('cache.db')))):
+        hit = processor(cache)
+        assert fired(hit, config_snapshot) == expected
+        # only the triggers that depend on more than the scanResult are evaluated again
+        assert 'protocol_issues' not in hit.evaluated
+        assert 'cert_expired' in hit.evaluated
+
+
+def test_cache_hits_recalculate_cert_expires_in_days(config):
+    config_snapshot = snapshot({'a.yaml': config})
+    evaluation_cache = testssl_result_handler.EvaluationCache()
+    fired(processor(evaluation_cache), config_snapshot)
+
+    later = CLOCK + datetime.timedelta(days=30)
+    assert fired(processor(evaluation_cache, later), config_snapshot) == fired(processor(None, later), config_snapshot)
+
+
+def test_configs_w_different_evaluation_docs_do_not_share_results(config):
+    configs = variants(config)
+    plans = snapshot(configs).plans
+    cert_expired = {name: [t for t in plan.triggers if t['tag'] == 'cert_expired'][0] for name, plan in plans.items()}
+    assert len(set(t['shared_key'] for t in cert_expired.values())) == len(configs)
+    # the cert expiration date only depends on the scanResult and cert_expires_objectpath
+    assert plans['a.yaml'].cert_expires_shared_key == plans['days_key.yaml'].cert_expires_shared_key == plans['grok.yaml'].cert_expires_shared_key
+    assert plans['a.yaml'].cert_expires_shared_key != plans['cert_not_before.yaml'].cert_expires_shared_key
+
+    together = fired(processor(), snapshot(configs))
+    for name, variant in configs.items():
+        assert together[name] == fired(processor(), snapshot({name: variant}))[name]
+
+    # i.e. each variant fired differently
+    assert [tag for tag, results in together['a.yaml'][1]].count('cert_expired') == 0
+    assert [tag for tag, results in together['cert_not_before.yaml'][1]].count('cert_expired') == 1
+    assert together['days_key.yaml'][0] == 21 and together['a.yaml'][0] == 21
+    assert [tag for tag, results in together['a.yaml'][1]].count('fqdn') == 1
+    assert [tag for tag, results in together['grok.yaml'][1]].count('fqdn') == 0
+
+
+def test_equivalent_configs_share_results(config):
+    shared = processor()
+    together = fired(shared, snapshot({'a.yaml': config, 'b.yaml': copy.deepcopy(config)}))
+    assert together['a.yaml'] == together['b.yaml']
+    assert len(shared.evaluated) == len(config['trigger_on'])
@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+
+import pytest
+import yaml
+
+import objectpath_fastpath
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(REPO_DIR, 'sample')
+
+# cert_expires_in_days values exercising each of the example config's cert triggers
+CERT_EXPIRES_IN_DAYS = [400, 90, 60, 30, 7, 1, 0, -3]
+
+
+def sample_result_paths():
+    paths = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, '**', '*.json'), recursive=True)):
+        with open(path, 'r') as f:
+            if 'scanResult' in json.load(f):
+                paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope='module')
+def plan():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        config = yaml.safe_load(stream)
+    return testssl_result_handler.HandlerConfigPlan('example-config.yaml', config)
+
+
+def example_config_expressions(plan):
+    return [plan.cert_expires_objectpath, plan.state_subject_objectpath] + [t['objectpath'] for t in plan.triggers]
+
+
+def objectpath_contexts(plan, path, objectpath_engine='objectpath'):
+    processor = testssl_result_handler.TestsslResultProcessor()
+    processor.objectpath_engine = objectpath_engine
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(path)
+    finding_index = testssl_result_handler.build_finding_index(testssl_result_file.testssl_result)
+    evaluation_doc = processor.buildEvaluationDoc(plan, testssl_result_file, SAMPLE_DIR, finding_index)
+    objectpath_ctx = processor.evaluateCertExpiration(plan, evaluation_doc, finding_index)
+    for cert_expires_in_days in CERT_EXPIRES_IN_DAYS:
+        objectpath_ctx.set_fields({plan.target_keys['cert_expires_in_days']: cert_expires_in_days})
+        yield objectpath_ctx
+
+
+def test_samples_found():
+    assert len(sample_result_paths()) > 0
+
+
+@pytest.mark.parametrize('path', sample_result_paths(), ids=os.path.basename)
+def test_fastpath_matches_objectpath(plan, path):
+    fired = set()
+    for objectpath_ctx in objectpath_contexts(plan, path):
+        for expression in example_config_expressions(plan):
+            fastpath = objectpath_fastpath.compile_fastpath(expression, testssl_result_handler.compile_objectpath(expression))
+            assert fastpath is not None, expression
+
+            expected = testssl_result_handler._materialize_objectpath_result(objectpath_ctx.evaluation_doc_objectpath_tree.execute(expression))
+            assert testssl_result_handler._materialize_objectpath_result(fastpath(objectpath_ctx.evaluation_doc)) == expected, expression
+            if expected[1]:
+                fired.add(expression)
+
+    # the comparison is not vacuous
+    assert len(fired) > 1
+
+
+@pytest.mark.parametrize('path', sample_result_paths(), ids=os.path.basename)
+def test_fastpath_engine_triggers_match_objectpath_engine(plan, path):
+    processor = testssl_result_handler.TestsslResultProcessor()
+    for objectpath_ctx, fastpath_ctx in zip(objectpath_contexts(plan, path, 'objectpath'), objectpath_contexts(plan, path, 'fastpath')):
+        for trigger in plan.triggers:
+            assert processor.evaluateTrigger(trigger, fastpath_ctx) == processor.evaluateTrigger(trigger, objectpath_ctx), trigger['tag']
+
+
+@pytest.mark.parametrize('expression', ['$..severity', 'count($.testssl_result.scanResult)', '$.testssl_result.scanResult[0].ciphers[@.severity is "LOW" and @.id is "x"]'])
+def test_unsupported_expressions_fall_back_to_objectpath(plan, expression):
+    assert objectpath_fastpath.compile_fastpath(expression, testssl_result_handler.compile_objectpath(expression)) is None
+
+    path = sample_result_paths()[0]
+    for objectpath_ctx, fastpath_ctx in zip(objectpath_contexts(plan, path, 'objectpath'), objectpath_contexts(plan, path, 'fastpath')):
+        assert fastpath_ctx.exec_objectpath(expression) == objectpath_ctx.exec_objectpath(expression)
+
+
+def test_unsupported_document_values_fall_back_to_objectpath():
+    # the fast path can't compare a dict, ObjectPath evaluates it
+    evaluation_doc = {'a': {'b': 1}, 'num': 1}
+    objectpath_ctx = testssl_result_handler.ObjectPathContext(evaluation_doc, False, False, 'objectpath')
+    fastpath_ctx = testssl_result_handler.ObjectPathContext(evaluation_doc, False, False, 'fastpath')
+    assert fastpath_ctx.exec_objectpath('$.a is 1') == objectpath_ctx.exec_objectpath('$.a is 1')
+    assert fastpath_ctx.exec_objectpath('$.num is 1') is True
@@ -0,0 +1,83 @@
+import os
+import re
+import time
+
+import pytest
+
+from testssl_result_handler import PollingResultFileScanner
+
+INPUT_FILENAME_RE_FILTER = re.compile(r'.*_testssl_.+\.json', re.I)
+
+
+class RecordingEventHandler():
+
+    def __init__(self):
+        self.events = []
+
+    def dispatch(self, event):
+        self.events.append((event.event_type, event.src_path))
+
+
+@pytest.fixture
+def input_dir(tmpdir):
+    return str(tmpdir.mkdir('input'))
+
+
+@pytest.fixture
+def event_handler():
+    return RecordingEventHandler()
+
+
+def write(path, content, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+# so its directory's mtime is not too recent to be trusted
+def settle_dir(dir_path):
+    mtime = time.time() - 60
+    os.utime(dir_path, (mtime, mtime))
+
+
+def test_existing_files_are_only_indexed(input_dir, event_handler):
+    write(os.path.join(input_dir, 'a', 'x_testssl_a.json'), '{}')
+    scanner = PollingResultFileScanner(event_handler, input_dir, INPUT_FILENAME_RE_FILTER)
+    assert scanner.poll(dispatch=False) == 0
+    assert scanner.poll() == 0
+    assert event_handler.events == []
+
+
+def test_new_files_in_new_and_existing_dirs(input_dir, event_handler):
+    scanner = PollingResultFileScanner(event_handler, input_dir, INPUT_FILENAME_RE_FILTER)
+    write(os.path.join(input_dir, 'a', 'x_testssl_a.json'), '{}')
+    scanner.poll(dispatch=False)
+
+    write(os.path.join(input_dir, 'a', 'x_testssl_b.json'), '{}')
+    write(os.path.join(input_dir, 'a', 'b', 'c', 'x_testssl_c.json'), '{}')
+    write(os.path.join(input_dir, 'a', 'not_a_result.json'), '{}')
+    assert scanner.poll() == 2
+    assert sorted(event_handler.events) == [('created', os.path.join(input_dir, 'a', 'b', 'c', 'x_testssl_c.json')),
+                                            ('created', os.path.join(input_dir, 'a', 'x_testssl_b.json'))]
+
+
+@pytest.mark.parametrize('dir_settled', [True, False], ids=['unchanged_dir', 'racy_dir'])
+def test_files_modified_in_place(input_dir, event_handler, dir_settled):
+    path = os.path.join(input_dir, 'a', 'x_testssl_a.json')
+    write(path, '{"a":1}', time.time() - 30)
+    if dir_settled:
+        settle_dir(os.path.dirname(path))
+        settle_dir(input_dir)
+
+    scanner = PollingResultFileScanner(event_handler, input_dir, INPUT_FILENAME_RE_FILTER)
+    scanner.poll(dispatch=False)
+    assert scanner.poll() == 0
+
+    # same size, only its mtime tells it changed (the dir's does not change)
+    write(path, '{"a":2}')
+    assert scanner.poll() == 1
+    assert event_handler.events == [('modified', path)]
+    # and only once
+    assert scanner.poll() == 0
@@ -0,0 +1,124 @@
+import glob
+import os
+
+import pytest
+import yaml
+
+import reactor_templates
+import testssl_result_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+CONFIG_FILENAME = 'example-config.yaml'
+
+
+# Renders its reactor config's templates like the built in reactors do,
+# the slack one against the evaluation_doc and the others against each trigger
+class RenderingReactor():
+
+    def __init__(self, reactor_config, extra_query=None):
+        self.reactor_config = reactor_config
+        self.extra_query = extra_query
+        self.rendered = []
+        self.extra_results = []
+
+    def handleTriggers(self, triggers, objectpath_ctx):
+        for name, value in sorted(self.reactor_config.items()):
+            if not reactor_templates.is_template(value):
+                continue
+            if name == 'template':
+                self.rendered.append(reactor_templates.render(value, objectpath_ctx.evaluation_doc, objectpath_ctx))
+            else:
+                self.rendered.extend(reactor_templates.render(value, t, objectpath_ctx) for t in triggers)
+        if self.extra_query is not None:
+            self.extra_results.append(objectpath_ctx.exec_objectpath(self.extra_query))
+
+
+@pytest.fixture
+def config():
+    with open(os.path.join(REPO_DIR, CONFIG_FILENAME), 'r') as stream:
+        return yaml.safe_load(stream)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    paths = []
+    load_testssl_result_file = testssl_result_handler.load_testssl_result_file
+
+    def counting_load(path, *args, **kwargs):
+        paths.append(path)
+        return load_testssl_result_file(path, *args, **kwargs)
+    monkeypatch.setattr(testssl_result_handler, 'load_testssl_result_file', counting_load)
+    return paths
+
+
+def register_reactors(plan, extra_query=None):
+    reactors = {name: RenderingReactor(reactor_config, extra_query) for name, reactor_config in plan.config['reactor_engines'].items()}
+    testssl_result_handler.reactor_registry.register(plan, reactors)
+    return reactors
+
+
+def react_inline(config, version):
+    testssl_result_handler.replace_config_snapshot(version, {CONFIG_FILENAME: testssl_result_handler.HandlerConfigPlan(CONFIG_FILENAME, config)})
+    reactors = register_reactors(testssl_result_handler.current_config_snapshot().plans[CONFIG_FILENAME])
+    testssl_result_handler.TestsslResultProcessor().processResultFile(SAMPLE_PATH, os.path.dirname(SAMPLE_PATH))
+    return reactors
+
+
+def evaluate_in_worker(config, version):
+    status, testssl_result_file, evaluation_summaries = testssl_result_handler.evaluate_result_file_in_worker(
+        SAMPLE_PATH, os.path.dirname(SAMPLE_PATH), version, {CONFIG_FILENAME: config}, {}, None)
+    assert status == 'processed'
+    return testssl_result_file, evaluation_summaries
+
+
+def test_configs_are_only_sent_to_workers_missing_them(config):
+    worker = testssl_result_handler.evaluate_result_file_in_worker
+    input_dir = os.path.dirname(SAMPLE_PATH)
+    assert worker(SAMPLE_PATH, input_dir, 1001, None, {}, None) == ('configs', None, [])
+    assert worker(SAMPLE_PATH, input_dir, 1001, {CONFIG_FILENAME: config}, {}, None)[0] == 'processed'
+    assert worker(SAMPLE_PATH, input_dir, 1001, None, {}, None)[0] == 'processed'
+
+
+def test_reactors_render_the_same_wout_reloading_the_result_file(config, loads):
+    inline = react_inline(config, 1002)
+
+    testssl_result_file, evaluation_summaries = evaluate_in_worker(config, 1003)
+    assert testssl_result_file.testssl_result is None
+    assert all(len(s['objectpath_results']) > 0 for s in evaluation_summaries if len(s['triggers_fired']) > 0)
+
+    reactors = register_reactors(testssl_result_handler.current_config_snapshot().plans[CONFIG_FILENAME])
+    del loads[:]
+    testssl_result_handler.TestsslResultProcessor().invokeReactorsForSummaries(testssl_result_file, evaluation_summaries)
+
+    assert loads == []
+    assert len(reactors['slack'].rendered) > 0
+    for name, reactor in reactors.items():
+        assert reactor.rendered == inline[name].rendered
+
+
+def test_reactors_needing_more_reload_the_result_file_once(config, loads):
+    testssl_result_file, evaluation_summaries = evaluate_in_worker(config, 1004)
+
+    reactors = register_reactors(testssl_result_handler.current_config_snapshot().plans[CONFIG_FILENAME],
+                                 extra_query='$.testssl_result.scanResult[0].targetHost')
+    del loads[:]
+    testssl_result_handler.TestsslResultProcessor().invokeReactorsForSummaries(testssl_result_file, evaluation_summaries)
+
+    assert loads == [SAMPLE_PATH]
+    assert reactors['slack'].extra_results == ['www.google.com']
+
+
+def test_workers_are_not_forked_from_the_threaded_main_process(config, monkeypatch):
+    monkeypatch.setattr(testssl_result_handler, 'result_handler_config_snapshot', testssl_result_handler.current_config_snapshot())
+    testssl_result_handler.replace_config_snapshot(1005, {CONFIG_FILENAME: testssl_result_handler.HandlerConfigPlan(CONFIG_FILENAME, config)})
+
+    engine = testssl_result_handler.ProcessEvaluationEngine(1, testssl_result_handler.TestsslResultProcessor())
+    try:
+        assert engine.executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+        status, testssl_result_file, evaluation_summaries, config_snapshot = engine.evaluate(SAMPLE_PATH, os.path.dirname(SAMPLE_PATH))
+        assert status == 'processed'
+        assert config_snapshot.version == 1005
+        assert [s['config_filename'] for s in evaluation_summaries] == [CONFIG_FILENAME]
+    finally:
+        engine.executor.shutdown()
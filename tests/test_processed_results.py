@@ -0,0 +1,72 @@
+import glob
+import os
+import shutil
+
+import pytest
+
+import testssl_result_handler
+from testssl_result_handler import ProcessedResultLedger, ProcessedResultPaths
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+
+
+@pytest.fixture
+def result_path(tmpdir):
+    result_path = str(tmpdir.join(os.path.basename(SAMPLE_PATH)))
+    shutil.copyfile(SAMPLE_PATH, result_path)
+    return result_path
+
+
+def test_least_recently_claimed_paths_are_evicted():
+    processed_paths = ProcessedResultPaths(max_paths=2)
+    assert processed_paths.claim_path('a.json')
+    assert processed_paths.claim_path('b.json')
+    # touches a.json, making b.json the least recently used
+    assert not processed_paths.claim_path('a.json')
+
+    assert processed_paths.claim_path('c.json')
+    assert 'b.json' not in processed_paths
+    assert 'a.json' in processed_paths and 'c.json' in processed_paths
+
+    # evicted paths can be claimed again
+    assert processed_paths.claim_path('b.json')
+    assert 'a.json' not in processed_paths
+
+
+def test_released_paths_can_be_claimed_again():
+    processed_paths = ProcessedResultPaths()
+    assert processed_paths.claim_path('a.json')
+    processed_paths.release('a.json')
+    assert 'a.json' not in processed_paths
+    assert processed_paths.claim_path('a.json')
+
+
+def test_ledger_remembers_processed_files_across_restarts(tmpdir, result_path):
+    ledger_path = str(tmpdir.join('ledger.db'))
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(result_path)
+
+    processed_paths = ProcessedResultPaths(ledger=ProcessedResultLedger(ledger_path))
+    assert processed_paths.claim(testssl_result_file)
+    processed_paths.processed(testssl_result_file)
+
+    # i.e. a restart, nothing in memory
+    restarted = ProcessedResultPaths(ledger=ProcessedResultLedger(ledger_path))
+    assert not restarted.claim(testssl_result_file)
+
+    # claimed but never processed, e.g. its reactors failed
+    unprocessed = testssl_result_file._replace(path=str(tmpdir.join('other_testssl_x.json')))
+    assert restarted.claim(unprocessed)
+    assert ProcessedResultPaths(ledger=ProcessedResultLedger(ledger_path)).claim(unprocessed)
+
+
+def test_ledger_does_not_match_a_rewritten_file(tmpdir, result_path):
+    ledger_path = str(tmpdir.join('ledger.db'))
+    ledger = ProcessedResultLedger(ledger_path)
+    ledger.record(testssl_result_handler.load_testssl_result_file(result_path))
+
+    with open(result_path, 'a') as f:
+        f.write('\n')
+    rewritten = testssl_result_handler.load_testssl_result_file(result_path)
+    assert not ProcessedResultLedger(ledger_path).contains(rewritten)
+    assert ProcessedResultPaths(ledger=ProcessedResultLedger(ledger_path)).claim(rewritten)
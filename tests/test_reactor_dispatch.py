@@ -0,0 +1,162 @@
+import threading
+
+import testssl_result_handler
+from testssl_result_handler import PendingReactions, ReactorDispatcher, ReactorRegistry
+
+
+class StubPlan():
+
+    def __init__(self, config_filename='stub.yaml'):
+        self.config_filename = config_filename
+        self.config = {'reactor_engines': {'stub': {}}}
+
+
+class GatedReactor():
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.gate = threading.Event()
+        self.handled = []
+
+    def handleTriggers(self, triggers, objectpath_ctx):
+        self.gate.wait(5)
+        self.handled.append([t['tag'] for t in triggers])
+        if self.fail:
+            raise ValueError("stub reactor failure")
+
+
+def dispatch(dispatcher, pending_reactions, plan, reactor, tags):
+    triggers = [{'tag': tag} for tag in tags]
+    dispatcher.dispatch(plan, 'stub', reactor, triggers, None, pending_reactions.dispatched(plan, triggers))
+
+
+def test_completes_once_sealed_when_nothing_dispatched():
+    completed = []
+    pending_reactions = PendingReactions(lambda: completed.append(True))
+    assert completed == []
+    pending_reactions.seal()
+    assert completed == [True]
+
+
+def test_completes_only_after_dispatched_reactors_handled():
+    dispatcher = ReactorDispatcher(10, 1)
+    plan = StubPlan()
+    reactor = GatedReactor()
+    completed = threading.Event()
+
+    pending_reactions = PendingReactions(completed.set)
+    dispatch(dispatcher, pending_reactions, plan, reactor, ['a'])
+    dispatch(dispatcher, pending_reactions, plan, reactor, ['b'])
+    pending_reactions.seal()
+
+    assert not completed.wait(0.2)
+    reactor.gate.set()
+    assert completed.wait(5)
+    assert reactor.handled == [['a'], ['b']]
+    assert pending_reactions.failed == set()
+
+
+def test_failed_reactors_tags_are_recorded():
+    dispatcher = ReactorDispatcher(10, 1, dump_evaldoc=None)
+    plan = StubPlan()
+    reactor = GatedReactor(fail=True)
+    reactor.gate.set()
+    completed = threading.Event()
+
+    pending_reactions = PendingReactions(completed.set)
+    dispatch(dispatcher, pending_reactions, plan, reactor, ['a', 'b'])
+    pending_reactions.seal()
+
+    assert completed.wait(5)
+    assert pending_reactions.failed == {('stub.yaml', 'a'), ('stub.yaml', 'b')}
+    dispatcher.join()
+    assert dispatcher.metrics()['stub.yaml:stub']['failed'] == 1
+
+
+def test_join_waits_for_dispatched_reactors():
+    dispatcher = ReactorDispatcher(10, 1)
+    plan = StubPlan()
+    reactor = GatedReactor()
+
+    pending_reactions = PendingReactions()
+    dispatch(dispatcher, pending_reactions, plan, reactor, ['a'])
+    threading.Timer(0.2, reactor.gate.set).start()
+    dispatcher.join()
+    assert reactor.handled == [['a']]
+
+
+class ClosingReactor():
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reloaded_configs_reactors_closed_once_released():
+    registry = ReactorRegistry()
+    old_plan, new_plan = StubPlan(), StubPlan()
+    old_reactor, new_reactor = ClosingReactor(), ClosingReactor()
+    registry.register(old_plan, {'stub': old_reactor})
+
+    # an evaluation against the old plan is still in flight while it is reloaded
+    registry.acquire(old_plan)
+    registry.register(new_plan, {'stub': new_reactor})
+    registry.acquire(new_plan)
+
+    assert registry.get(old_plan, 'stub') is old_reactor
+    assert registry.get(new_plan, 'stub') is new_reactor
+    assert not old_reactor.closed
+
+    registry.release(old_plan)
+    assert old_reactor.closed
+    registry.release(new_plan)
+    assert not new_reactor.closed
+
+    registry.close()
+    assert new_reactor.closed
+
+
+def test_acquiring_an_already_retired_plan_gets_its_own_reactors():
+    registry = ReactorRegistry()
+    old_plan, new_plan = StubPlan(), StubPlan()
+    old_reactor = ClosingReactor()
+    registry.register(old_plan, {'stub': old_reactor})
+    registry.register(new_plan, {'stub': ClosingReactor()})
+    assert old_reactor.closed
+
+    registry.create_reactor = lambda reactor_name, reactor_config: ClosingReactor()
+    registry.acquire(old_plan)
+    reactor = registry.get(old_plan, 'stub')
+    assert reactor is not old_reactor
+    registry.release(old_plan)
+    assert reactor.closed
+    assert old_plan not in registry.plans
+
+
+def test_one_dispatch_thread_per_reactor_unless_opted_into():
+    dispatcher = ReactorDispatcher(10)
+    assert len(dispatcher.get_queue('stub.yaml', 'serial', {}).workers) == 1
+    assert len(dispatcher.get_queue('stub.yaml', 'concurrent', {'dispatch_threads': 3}).workers) == 3
+
+
+def test_inline_reactor_failure_does_not_skip_the_others(monkeypatch):
+    registry = ReactorRegistry()
+    monkeypatch.setattr(testssl_result_handler, 'reactor_registry', registry)
+    plan = StubPlan()
+    plan.config['reactor_engines'] = {'failing': {}, 'stub': {}}
+    failing, reactor = GatedReactor(fail=True), GatedReactor()
+    failing.gate.set()
+    reactor.gate.set()
+    registry.register(plan, {'failing': failing, 'stub': reactor})
+
+    pending_reactions = PendingReactions()
+    triggers = [{'tag': 'a', 'reactors': ['failing', 'stub']}]
+    objectpath_ctx = testssl_result_handler.ObjectPathContext({}, False, False)
+    testssl_result_handler.TestsslResultProcessor().invokeReactors(plan, triggers, objectpath_ctx, pending_reactions)
+    pending_reactions.seal()
+
+    assert failing.handled == [['a']]
+    assert reactor.handled == [['a']]
+    assert pending_reactions.failed == {('stub.yaml', 'a')}
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from testssl_result_handler import SettleScheduler
+
+SETTLE_SECONDS = 0.2
+
+
+class RecordingOnSettled():
+
+    def __init__(self):
+        self.settled = []
+        self.condition = threading.Condition()
+
+    def __call__(self, path):
+        with self.condition:
+            self.settled.append((path, time.monotonic()))
+            self.condition.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.settled) >= count, timeout)
+            return [path for path, settled_at in self.settled]
+
+
+def test_events_within_the_window_collapse_into_one_call():
+    on_settled = RecordingOnSettled()
+    scheduler = SettleScheduler(SETTLE_SECONDS, on_settled)
+
+    # keeps pushing the deadline out for longer than the window itself
+    for i in range(6):
+        scheduler.schedule('a.json')
+        last_scheduled = time.monotonic()
+        time.sleep(SETTLE_SECONDS / 4)
+    assert on_settled.settled == []
+    assert scheduler.pending_count() == 1
+
+    assert on_settled.wait_for(1) == ['a.json']
+    assert on_settled.settled[0][1] - last_scheduled >= SETTLE_SECONDS
+    time.sleep(SETTLE_SECONDS * 2)
+    assert len(on_settled.settled) == 1
+    assert scheduler.pending_count() == 0
+
+
+def test_paths_settle_independently():
+    on_settled = RecordingOnSettled()
+    scheduler = SettleScheduler(SETTLE_SECONDS, on_settled)
+
+    scheduler.schedule('a.json')
+    time.sleep(SETTLE_SECONDS / 2)
+    scheduler.schedule('b.json')
+    scheduler.schedule('a.json')
+    scheduler.schedule('b.json')
+    assert scheduler.pending_count() == 2
+
+    assert sorted(on_settled.wait_for(2)) == ['a.json', 'b.json']
+    # a new event after settling is handed off again
+    scheduler.schedule('a.json')
+    assert on_settled.wait_for(3)[2] == 'a.json'
+    assert scheduler.pending_count() == 0
+
+
+def test_errors_in_on_settled_do_not_stop_the_scheduler():
+    on_settled = RecordingOnSettled()
+
+    def failing_on_settled(path):
+        on_settled(path)
+        if path == 'bad.json':
+            raise ValueError(path)
+    scheduler = SettleScheduler(SETTLE_SECONDS / 4, failing_on_settled)
+
+    scheduler.schedule('bad.json')
+    assert on_settled.wait_for(1) == ['bad.json']
+    scheduler.schedule('good.json')
+    assert on_settled.wait_for(2) == ['bad.json', 'good.json']
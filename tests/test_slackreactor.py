@@ -0,0 +1,173 @@
+import http.server
+import json
+import socketserver
+import threading
+import time
+
+import pytest
+
+import testssl_result_handler
+from reactors.slackreactor import SlackReactor, TokenBucket
+
+TEMPLATE = '{"text": "*testssl.sh -> {{ fqdn }}*", "attachments": []}'
+
+
+# A local stand in for the Slack webhook, answers each POST w/ the next
+# of `responses` (status, headers) and then 200s, recording every request
+class StubWebhookServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, responses=()):
+        super().__init__(('127.0.0.1', 0), StubWebhookHandler)
+        self.responses = list(responses)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/webhook' % self.server_address[1]
+
+
+class StubWebhookHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), json.loads(body.decode('utf-8'))))
+            status, headers = self.server.responses.pop(0) if len(self.server.responses) > 0 else (200, {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def webhook():
+    servers = []
+
+    def start(responses=()):
+        server = StubWebhookServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def slack_reactor(url, **reactor_config):
+    config = {'webhook_url': url, 'template': TEMPLATE}
+    config.update(reactor_config)
+    return SlackReactor(config)
+
+
+def fire(reactor, fqdn, tags):
+    evaluation_doc = {'fqdn': fqdn}
+    objectpath_ctx = testssl_result_handler.ObjectPathContext(evaluation_doc, False, False)
+    triggers_fired = [{'tag': tag,
+                       'title': 'title of ' + tag,
+                       'results': [{'id': tag, 'severity': 'HIGH'}],
+                       'config_filename': 'test.yaml',
+                       'testssl_json_result_abs_file_path': '/tmp/' + fqdn + '.json'} for tag in tags]
+    reactor.handleTriggers(triggers_fired, objectpath_ctx)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(20, 2)
+    start = time.monotonic()
+    for i in range(6):
+        bucket.acquire()
+    # the burst of 2 is free, the other 4 are 1/20s apart
+    assert time.monotonic() - start >= (4 / 20.0) - 0.01
+
+
+def test_posts_are_rate_limited(webhook):
+    server = webhook()
+    reactor = slack_reactor(server.url, rate_limit_per_second=10, rate_limit_burst=1)
+    for i in range(4):
+        fire(reactor, 'host%d.example.com' % i, ['cert_expired'])
+
+    assert len(server.requests) == 4
+    times = [t for t, body in server.requests]
+    assert times[-1] - times[0] >= (3 / 10.0) - 0.01
+    assert server.requests[0][1]['text'] == '*testssl.sh -> host0.example.com*'
+    assert server.requests[0][1]['attachments'][0]['title'] == 'title of cert_expired'
+
+
+def test_retry_waits_retry_after(webhook):
+    server = webhook([(429, {'Retry-After': '1'})])
+    reactor = slack_reactor(server.url, retry_backoff_seconds=0.01)
+    fire(reactor, 'www.example.com', ['cert_expired'])
+
+    assert len(server.requests) == 2
+    assert server.requests[1][0] - server.requests[0][0] >= 0.95
+    assert server.requests[1][1] == server.requests[0][1]
+
+
+def test_gives_up_after_max_retries(webhook):
+    server = webhook([(429, {'Retry-After': '0'})] * 3)
+    reactor = slack_reactor(server.url, max_retries=2)
+    with pytest.raises(ValueError):
+        fire(reactor, 'www.example.com', ['cert_expired'])
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(webhook):
+    server = webhook([(400, {})])
+    reactor = slack_reactor(server.url)
+    with pytest.raises(ValueError):
+        fire(reactor, 'www.example.com', ['cert_expired'])
+    assert len(server.requests) == 1
+
+
+def test_coalesce_merges_alerts_into_one_post(webhook):
+    server = webhook()
+    reactor = slack_reactor(server.url, coalesce_seconds=0.3)
+    fire(reactor, 'a.example.com', ['cert_expired'])
+    fire(reactor, 'b.example.com', ['cert_expired', 'cipher_issues'])
+    fire(reactor, 'c.example.com', ['protocol_issues'])
+    assert len(server.requests) == 0
+
+    time.sleep(1)
+    assert len(server.requests) == 1
+    message = server.requests[0][1]
+    assert message['text'] == '*testssl.sh -> 3 alerts*'
+    assert [a['title'] for a in message['attachments']] == ['title of cert_expired', 'title of cert_expired', 'title of cipher_issues', 'title of protocol_issues']
+    assert [a.get('pretext') for a in message['attachments']] == ['*testssl.sh -> a.example.com*', '*testssl.sh -> b.example.com*', None, '*testssl.sh -> c.example.com*']
+
+
+def test_coalesce_splits_at_max_attachments(webhook):
+    server = webhook()
+    reactor = slack_reactor(server.url, coalesce_seconds=60, max_attachments_per_message=2)
+    for fqdn in ['a.example.com', 'b.example.com', 'c.example.com']:
+        fire(reactor, fqdn, ['cert_expired'])
+
+    # close() flushes w/out waiting out the coalesce_seconds
+    reactor.close()
+    assert [len(body['attachments']) for t, body in server.requests] == [2, 1]
+
+
+def test_plain_http_webhooks_are_pooled_too():
+    reactor = slack_reactor('http://127.0.0.1:1/webhook', pool_maxsize=7)
+    assert reactor.session.get_adapter('http://127.0.0.1:1/webhook') is reactor.session.get_adapter('https://hooks.slack.com/x')
+    assert reactor.session.get_adapter('http://127.0.0.1:1/webhook')._pool_maxsize == 7
+
+
+def test_coalesce_rejected_for_fire_on_triggers():
+    config = {'evaluation_doc_config': {'target_keys': {'testssl_result_json': 'testssl_result', 'result_metadata': 'result_metadata'}},
+              'cert_expires_objectpath': '$.testssl_result.x',
+              'trigger_on': {'expired': {'objectpath': '$.testssl_result.x', 'title': 'x', 'reactors': ['slack']}},
+              'reactor_engines': {'slack': {'class_name': 'SlackReactor', 'webhook_url': 'http://x', 'template': TEMPLATE, 'coalesce_seconds': 30}}}
+    testssl_result_handler.HandlerConfigPlan('c.yaml', config)
+
+    config['trigger_on']['expired']['fire_on'] = 'change'
+    with pytest.raises(ValueError):
+        testssl_result_handler.HandlerConfigPlan('c.yaml', config)
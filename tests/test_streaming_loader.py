@@ -0,0 +1,95 @@
+import datetime
+import glob
+import os
+
+import pytest
+import yaml
+
+import testssl_result_handler
+from testssl_result_handler import scan_result_sections_referenced_by
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = glob.glob(os.path.join(REPO_DIR, 'sample', '**', '*_testssl_*.json'), recursive=True)[0]
+
+# clocks exercising each of the example config's cert triggers
+# against the sample's cert_notAfter of 2019-01-22 06:14
+CLOCKS = [datetime.datetime(2019, 1, 22, 6, 14, tzinfo=datetime.timezone.utc) - datetime.timedelta(days=days)
+          for days in [400, 90, 60, 30, 7, 1, 0, -3]]
+
+
+@pytest.fixture
+def config():
+    with open(os.path.join(REPO_DIR, 'example-config.yaml'), 'r') as stream:
+        return yaml.safe_load(stream)
+
+
+@pytest.fixture(params=['ijson', 'json'])
+def ijson(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(testssl_result_handler, 'ijson', None)
+    return request.param
+
+
+def config_snapshot(config):
+    return testssl_result_handler.ConfigSnapshot(1, {'c.yaml': testssl_result_handler.HandlerConfigPlan('c.yaml', config)})
+
+
+def fired(config_snapshot, json_loader, clock):
+    processor = testssl_result_handler.TestsslResultProcessor()
+    processor.clock = lambda: clock
+    testssl_result_file = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH, json_loader, config_snapshot)
+    evaluations = processor.evaluateResultFile(testssl_result_file, os.path.dirname(SAMPLE_PATH), config_snapshot)
+    return [(t['tag'], t['results']) for plan, objectpath_ctx, triggers_fired in evaluations for t in triggers_fired]
+
+
+def test_pruned_load_fires_the_same_triggers(config, ijson):
+    snapshot = config_snapshot(config)
+    sections = testssl_result_handler.referenced_scan_result_sections(snapshot)
+    assert sections == {'protocols', 'ciphers', 'vulnerabilities', 'serverDefaults'}
+
+    pruned = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH, 'streaming', snapshot)
+    full = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH, 'full', snapshot)
+    assert 'cipherTests' not in pruned.testssl_result['scanResult'][0]
+    assert pruned.testssl_result['scanResult'][0]['serverDefaults'] == full.testssl_result['scanResult'][0]['serverDefaults']
+    assert pruned.sha256 == full.sha256
+
+    all_fired = set()
+    for clock in CLOCKS:
+        expected = fired(snapshot, 'full', clock)
+        assert fired(snapshot, 'streaming', clock) == expected
+        all_fired.update(tag for tag, results in expected)
+    assert len(all_fired) > 2
+
+
+@pytest.mark.parametrize('objectpath', ["$..severity",
+                                        "$..x",
+                                        "$.testssl_result.scanResult",
+                                        "len($.testssl_result.scanResult[0]) > 0"])
+def test_unresolvable_references_load_everything(config, ijson, objectpath):
+    config['trigger_on']['unresolvable'] = {'objectpath': objectpath, 'title': 'x', 'reactors': []}
+    snapshot = config_snapshot(config)
+    assert testssl_result_handler.referenced_scan_result_sections(snapshot) is None
+
+    streamed = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH, 'streaming', snapshot)
+    full = testssl_result_handler.load_testssl_result_file(SAMPLE_PATH, 'full', snapshot)
+    assert streamed.testssl_result == full.testssl_result
+
+
+@pytest.mark.parametrize('sources, expected', [
+    (["$.testssl_result.scanResult[0].ciphers[@.severity is 'HIGH']"], {'ciphers'}),
+    (["$.finding_index[0].serverDefaults.by_id.cert_notAfter[0].finding"], {'serverDefaults'}),
+    (["{{finding('cert_notAfter')}}", "{{'HIGH'|findings_by_severity('ciphers')}}"], {'serverDefaults', 'ciphers'}),
+    (["{{findings_by_severity('HIGH', 'vulnerabilities')}}"], {'vulnerabilities'}),
+    (["$.testssl_result.scanResult[0].ciphers", "$..x"], None),
+    (["$.testssl_result.scanResult"], None),
+    (["{{'HIGH'|findings_by_severity}}"], None),
+    (["{{findings_by_severity(severity, section)}}"], None),
+])
+def test_referenced_sections(sources, expected):
+    assert scan_result_sections_referenced_by(sources) == expected
+
+
+def test_scope_keys_of_fanned_out_configs():
+    scope_keys = ('scan_result', 'scan_result_findings')
+    assert scan_result_sections_referenced_by(["$.scan_result.protocols", "$.scan_result_findings.serverDefaults"], scope_keys) == {'protocols', 'serverDefaults'}
+    assert scan_result_sections_referenced_by(["$.scan_result[@.severity is 'HIGH']"], scope_keys) is None
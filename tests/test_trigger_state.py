@@ -0,0 +1,46 @@
+from testssl_result_handler import TriggerStateStore
+
+CHANGE = [{'tag': 'expired', 'fire_on': 'change'}]
+HOURLY = [{'tag': 'expiring', 'fire_on': 'every_n_hours', 'every_n_hours': 1}]
+
+
+def test_change_only_reacts_again_once_results_change():
+    store = TriggerStateStore()
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=100) == {'expired'}
+    store.reacted('a.com', 'c.yaml', {'expired': [1]}, 100)
+
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=200) == set()
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [2]}, now=300) == {'expired'}
+
+
+def test_change_reacts_again_until_its_reactors_succeed():
+    store = TriggerStateStore()
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=100) == {'expired'}
+
+    # its reactors failed, nothing was recorded as reacted
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=200) == {'expired'}
+    store.reacted('a.com', 'c.yaml', {'expired': [1]}, 200)
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=300) == set()
+
+
+def test_reacted_is_ignored_if_the_subject_was_evaluated_since():
+    store = TriggerStateStore()
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=100) == {'expired'}
+
+    # stopped firing before the reactors of the first evaluation were done
+    assert store.transition('a.com', 'c.yaml', CHANGE, {}, now=200) == set()
+    store.reacted('a.com', 'c.yaml', {'expired': [1]}, 100)
+
+    assert store.transition('a.com', 'c.yaml', CHANGE, {'expired': [1]}, now=300) == {'expired'}
+
+
+def test_every_n_hours_is_due_relative_to_the_last_successful_reaction():
+    store = TriggerStateStore()
+    assert store.transition('a.com', 'c.yaml', HOURLY, {'expiring': [1]}, now=0) == {'expiring'}
+    store.reacted('a.com', 'c.yaml', {'expiring': [1]}, 0)
+
+    assert store.transition('a.com', 'c.yaml', HOURLY, {'expiring': [1]}, now=1800) == set()
+    assert store.transition('a.com', 'c.yaml', HOURLY, {'expiring': [1]}, now=3600) == {'expiring'}
+    assert store.transition('a.com', 'c.yaml', HOURLY, {'expiring': [1]}, now=3700) == {'expiring'}
+    store.reacted('a.com', 'c.yaml', {'expiring': [1]}, 3700)
+    assert store.transition('a.com', 'c.yaml', HOURLY, {'expiring': [1]}, now=3800) == set()
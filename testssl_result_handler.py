@@ -4,6 +4,7 @@ __author__ = "bitsofinfo"
 
 import importlib
 from multiprocessing import Pool, Process
+import multiprocessing.util
 import json
 import pprint
 import yaml
@@ -11,28 +12,672 @@ from dateutil import parser as dateparser
 import re
 import os
 from objectpath import *
+from objectpath.core.parser import parse as objectpath_parse
 import argparse
 import collections
+import functools
+import hashlib
+import heapq
+import queue
+import sqlite3
 import sys
+import types
 import datetime
 import logging
 import time
 from pygrok import Grok
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+import reactor_templates
+import handler_metrics
+import objectpath_fastpath
+
 import http.server
 
 import threading
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent
+from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent
 import concurrent.futures
 
 from twisted.web.server import Site
 from twisted.web.static import File
+from twisted.web.resource import Resource
 from twisted.internet import reactor
 from twisted.internet import endpoints
 
-# Dict of result handler yaml parsed configs (filename -> object)
-result_handler_configs = {}
+# Immutable, versioned, snapshot of the compiled result handler configs
+# (`plans` is a read only config_filename -> HandlerConfigPlan mapping).
+# Readers grab the current_config_snapshot() once (a single reference
+# read, no locking) and use it throughout, i.e. to evaluate a result file
+# against one consistent set of configs. Config (re)loads build a new
+# snapshot w/ the next version and swap it in, the version is how process
+# pool evaluation workers know to recompile their configs
+ConfigSnapshot = collections.namedtuple('ConfigSnapshot',['version','plans'])
+
+result_handler_config_snapshot = ConfigSnapshot(0,types.MappingProxyType({}))
+
+# only serializes the writers (readers never take it)
+result_handler_config_snapshot_lock = threading.Lock()
+
+def current_config_snapshot():
+    return result_handler_config_snapshot
+
+# Swaps in a new snapshot w/ the config_filename's plan set to `plan`
+# (or removed if None), returns the new snapshot or None if nothing changed
+def update_config_snapshot(config_filename, plan=None):
+    global result_handler_config_snapshot
+    with result_handler_config_snapshot_lock:
+        plans = dict(result_handler_config_snapshot.plans)
+        if plan is not None:
+            plans[config_filename] = plan
+        elif plans.pop(config_filename,None) is None:
+            return None
+        result_handler_config_snapshot = ConfigSnapshot(result_handler_config_snapshot.version + 1,types.MappingProxyType(plans))
+        return result_handler_config_snapshot
+
+# Swaps in the given {config_filename:plan} as the snapshot of the given version
+def replace_config_snapshot(version, plans):
+    global result_handler_config_snapshot
+    with result_handler_config_snapshot_lock:
+        result_handler_config_snapshot = ConfigSnapshot(version,types.MappingProxyType(dict(plans)))
+        return result_handler_config_snapshot
+
+# Immutable payload handed from the TestsslResultFileMonitor to the
+# TestsslResultProcessor so a testssl.sh JSON result file is only ever
+# decoded once. Carries the parsed document plus the size/mtime and
+# sha256 of the contents of the file as it was when it was parsed and,
+# if the loader could cheaply compute it, the sha256 of its scanResult
+# (see raw_scan_result_digest(), otherwise None)
+TestsslResultFile = collections.namedtuple('TestsslResultFile',
+                                           ['path','testssl_result','size','mtime','sha256','scan_result_sha256'])
+
+# Cheap check that a testssl.sh JSON result file has been completely
+# written w/out decoding it: the file must have data and its last
+# non-whitespace byte must close the top level JSON object/array
+def testssl_result_file_looks_complete(testssl_json_result_file_path, probe_bytes=64):
+    with open(testssl_json_result_file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return False
+        f.seek(max(0, size - probe_bytes))
+        tail = f.read().rstrip()
+        return len(tail) > 0 and tail[-1:] in (b'}', b']')
+
+# JSON loaders:
+#  - full:      json.loads() of the entire result file
+#  - streaming: parses the result file incrementally (w/ ijson if installed)
+#               keeping only the scanResult sections referenced by the
+#               loaded configs (see referenced_scan_result_sections())
+JSON_LOADERS = ['full','streaming']
+
+# Loads the testssl.sh JSON result file into a TestsslResultFile
+# Raises json.decoder.JSONDecodeError if the file is not yet parsable
+# and returns None if the file changed while it was being read. The
+# streaming loader keeps the sections referenced by the config_snapshot
+# (default the current one)
+def load_testssl_result_file(testssl_json_result_file_path, json_loader='full', config_snapshot=None):
+    stat_before = os.stat(testssl_json_result_file_path)
+
+    with phase_seconds.time(('json_load',)):
+        scan_result_sha256 = None
+        if json_loader == 'streaming':
+            scan_result_sections = referenced_scan_result_sections(config_snapshot)
+            with open(testssl_json_result_file_path, 'rb') as f:
+                testssl_result, sha256 = stream_load_testssl_result(f,scan_result_sections)
+        else:
+            with open(testssl_json_result_file_path, 'rb') as f:
+                raw = f.read()
+            testssl_result = json.loads(raw)
+            sha256 = hashlib.sha256(raw).hexdigest()
+            scan_result_sha256 = raw_scan_result_digest(raw)
+
+    stat_after = os.stat(testssl_json_result_file_path)
+
+    if stat_before.st_size != stat_after.st_size or stat_before.st_mtime != stat_after.st_mtime:
+        return None
+
+    return TestsslResultFile(testssl_json_result_file_path,
+                             testssl_result,
+                             stat_after.st_size,
+                             stat_after.st_mtime,
+                             sha256,
+                             scan_result_sha256)
+
+
+# file like wrapper computing the sha256 of everything read through it
+class HashingReader():
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, n=-1):
+        data = self.f.read(n)
+        self.sha256.update(data)
+        return data
+
+    def hexdigest(self):
+        # the parser may stop short of trailing whitespace
+        while len(self.read(65536)) > 0:
+            pass
+        return self.sha256.hexdigest()
+
+
+# Parses the testssl.sh JSON result from the binary file `f` dropping
+# all scanResult[N] sections (array/object values, i.e. 'ciphers') not
+# in scan_result_sections (None keeps all)
+# w/out ever materializing them when ijson is available. Returns
+# (testssl_result, sha256 of the file). Raises json.decoder.JSONDecodeError
+# if the JSON is not (yet) parsable
+def stream_load_testssl_result(f, scan_result_sections):
+    reader = HashingReader(f)
+
+    if ijson is None:
+        testssl_result = json.loads(reader.read())
+        if scan_result_sections is not None and isinstance(testssl_result,dict):
+            for scan_result in testssl_result.get('scanResult',[]):
+                if isinstance(scan_result,dict):
+                    for section in [k for k, v in scan_result.items() if k not in scan_result_sections and isinstance(v,(dict,list))]:
+                        del scan_result[section]
+        return (testssl_result,reader.hexdigest())
+
+    builder = ijson.ObjectBuilder()
+    skip_next = None
+    skip_depth = 0
+    try:
+        for prefix, event, value in ijson.parse(reader,use_float=True):
+            # inside a skipped section
+            if skip_depth > 0:
+                if event in ('start_map','start_array'):
+                    skip_depth += 1
+                elif event in ('end_map','end_array'):
+                    skip_depth -= 1
+                continue
+
+            # the value of a section that is not referenced, only
+            # large (array/object) values are skipped, scalars are kept
+            if skip_next is not None:
+                key = skip_next
+                skip_next = None
+                if event in ('start_map','start_array'):
+                    skip_depth = 1
+                    continue
+                builder.event('map_key',key)
+
+            if event == 'map_key' and prefix == 'scanResult.item' \
+                    and scan_result_sections is not None and value not in scan_result_sections:
+                skip_next = value
+                continue
+
+            builder.event(event,value)
+
+    except ijson.JSONError as e:
+        raise json.decoder.JSONDecodeError(str(e),'',0)
+
+    if not hasattr(builder,'value'):
+        raise json.decoder.JSONDecodeError("no JSON document",'',0)
+
+    return (builder.value,reader.hexdigest())
+
+
+# Returns the set of scanResult section names (i.e. 'serverDefaults') that
+# any config of the config_snapshot (default the current one) references
+# or None if all of them may be needed
+referenced_scan_result_sections_cache = (None,None)
+
+def referenced_scan_result_sections(config_snapshot=None):
+    global referenced_scan_result_sections_cache
+
+    if config_snapshot is None:
+        config_snapshot = current_config_snapshot()
+    cached_snapshot, cached_sections = referenced_scan_result_sections_cache
+    if cached_snapshot is config_snapshot:
+        return cached_sections
+
+    plans = list(config_snapshot.plans.values())
+
+    sections = set()
+    for plan in plans:
+        if plan.scan_result_sections is None:
+            sections = None
+            break
+        sections.update(plan.scan_result_sections)
+
+    # no configs, load everything
+    if len(plans) == 0:
+        sections = None
+
+    referenced_scan_result_sections_cache = (config_snapshot,sections)
+    return sections
+
+
+SCAN_RESULT_SECTION_RE = re.compile(r"scanResult\s*\[[^\]]*\]\s*\.\s*(\w+)")
+FINDING_INDEX_SECTION_RE = re.compile(r"finding_index\s*\[[^\]]*\]\s*\.\s*(\w+)")
+FINDING_FILTER_RE = re.compile(r"\|\s*(findings?|findings_by_severity)\b(\s*\((?:\s*(?:'(\w+)'|\"(\w+)\"))?[^)]*\))?")
+FINDING_FN_RE = re.compile(r"\bfindings?\s*\(\s*(?:'[^']*'|\"[^\"]*\")\s*(?:(\))|,\s*(?:'(\w+)'|\"(\w+)\"))")
+FINDINGS_BY_SEVERITY_FN_RE = re.compile(r"\bfindings_by_severity\s*\(\s*(?:'[^']*'|\"[^\"]*\")\s*,\s*(?:'(\w+)'|\"(\w+)\")")
+
+# The scanResult sections the given expressions/templates reference
+# or None if that can not be determined (i.e. '$..', 'scanResult[0]')
+# scope_keys are evaluation_doc keys holding a single scanResult entry
+# (or its finding index) i.e. for HandlerConfigPlan.scan_result_fanout
+def scan_result_sections_referenced_by(sources, scope_keys=()):
+    sections = set()
+    for source in sources:
+        if '..' in source.replace('...',''):
+            return None
+
+        for scope_key in scope_keys:
+            found = re.findall(r"\b" + re.escape(scope_key) + r"\b\s*\.\s*(\w+)",source)
+            if len(re.findall(r"\b" + re.escape(scope_key) + r"\b",source)) != len(found):
+                return None
+            sections.update(found)
+
+        for name, section_re in (('scanResult',SCAN_RESULT_SECTION_RE),('finding_index',FINDING_INDEX_SECTION_RE)):
+            found = section_re.findall(source)
+            if source.count(name) != len(found):
+                return None
+            sections.update(found)
+
+        # filter forms, i.e. 'cert_notAfter'|finding or "HIGH"|findings_by_severity('ciphers')
+        for match in FINDING_FILTER_RE.findall(source):
+            if match[0] == 'findings_by_severity' or match[1] != '':
+                section = [g for g in match[2:] if g]
+                if len(section) == 0:
+                    return None
+                sections.add(section[0])
+            else:
+                sections.add('serverDefaults')
+        source = FINDING_FILTER_RE.sub('',source)
+
+        for fn, section_re, default_section in (('finding',FINDING_FN_RE,'serverDefaults'),
+                                                ('findings_by_severity',FINDINGS_BY_SEVERITY_FN_RE,None)):
+            calls = len(re.findall(r"\b" + fn + (r"s?" if fn == 'finding' else "") + r"\s*\(",source))
+            found = section_re.findall(source)
+            if calls != len(found):
+                return None
+            for match in found:
+                section = [g for g in match if g and g != ')']
+                sections.add(section[0] if len(section) > 0 else default_section)
+
+    return sections
+
+
+# every string value w/in a (nested) config value
+def config_strings(value):
+    if isinstance(value,str):
+        yield value
+    elif isinstance(value,dict):
+        for v in value.values():
+            yield from config_strings(v)
+    elif isinstance(value,list):
+        for v in value:
+            yield from config_strings(v)
+
+
+# The evaluation_doc roots an objectpath expression references, i.e.
+# $.testssl_result.scanResult -> ('testssl_result','scanResult'), '$..' and
+# a bare '$' have no root. And ObjectPath's builtins that read the clock
+OBJECTPATH_ROOT_RE = re.compile(r"\$(\.\.|\s*\.\s*(\w+)(\s*\.\s*(\w+))?)?")
+OBJECTPATH_CLOCK_FN_RE = re.compile(r"\b(now|date|time|dateTime|toMillis)\s*\(")
+
+# True if the objectpath expression only references the scanResult of the
+# testssl.sh result (`result_key`.scanResult or any of the scan_result_keys
+# i.e. the finding_index) so it evaluates the same for any result file w/ the
+# same scanResult content. Anything else (cert_expires_in_days, the path
+# derived fields, '$..', the clock) may differ from file to file, or day to day
+def objectpath_depends_only_on_scan_result(expression, result_key, scan_result_keys):
+    if OBJECTPATH_CLOCK_FN_RE.search(expression):
+        return False
+    for match in OBJECTPATH_ROOT_RE.finditer(expression):
+        root, child = match.group(2), match.group(4)
+        if root is None:
+            return False
+        if root == result_key:
+            if child != 'scanResult':
+                return False
+        elif root not in scan_result_keys:
+            return False
+    return True
+
+
+# Digest of the (normalized) scanResult of a testssl.sh result, the same for
+# rescans that found the same things (the scan timestamps are outside of it)
+def scan_result_digest(testssl_result):
+    scan_result = json.dumps(testssl_result.get('scanResult'),sort_keys=True,separators=(',',':'))
+    return hashlib.sha256(scan_result.encode('utf-8')).hexdigest()
+
+# Same as scan_result_digest() but of the raw testssl.sh JSON result bytes,
+# w/out re-encoding the result: testssl.sh writes the "scanResult" after the
+# Invocation/startTime etc and before the "scanTime". None if the bytes do not
+# look like that. (these digests differ from scan_result_digest()'s for the same result)
+def raw_scan_result_digest(raw):
+    start = raw.find(b'"scanResult"')
+    if start < 0 or raw.find(b'"scanResult"',start + 1) >= 0:
+        return None
+    end = raw.rfind(b'"scanTime"')
+    if end < start:
+        end = len(raw)
+    return 'raw:' + hashlib.sha256(memoryview(raw)[start:end]).hexdigest()
+
+
+# Builds the finding index for a testssl.sh result, once per result
+# file. For each scanResult entry (same order) and each of its sections
+# that is a list of findings (protocols, ciphers, vulnerabilities,
+# serverDefaults...) it maps:
+#
+#  - by_id:       base finding id (i.e. 'cert_notAfter' for 'cert_notAfter <cert#1>') -> [findings]
+#  - by_severity: severity -> [findings]
+#
+# The findings themselves are shared by reference w/ the testssl.sh result
+def build_finding_index(testssl_result):
+    finding_index = []
+    for scan_result in testssl_result.get('scanResult',[]):
+        sections = {}
+        if isinstance(scan_result,dict):
+            for section, findings in scan_result.items():
+                if not isinstance(findings,list):
+                    continue
+                by_id = {}
+                by_severity = {}
+                for finding in findings:
+                    if not isinstance(finding,dict):
+                        continue
+                    if isinstance(finding.get('id'),str):
+                        by_id.setdefault(finding['id'].split(' ')[0],[]).append(finding)
+                    if 'severity' in finding:
+                        by_severity.setdefault(finding['severity'],[]).append(finding)
+                sections[section] = {'by_id':by_id,'by_severity':by_severity}
+        finding_index.append(sections)
+    return finding_index
+
+
+# The current time, timezone aware (UTC). TestsslResultProcessors
+# read the clock via their `clock` so tests can inject another
+def utc_now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+# testssl.sh's cert_notBefore/cert_notAfter finding format, i.e.
+# '2019-01-22 06:14', w/ optional seconds and UTC offset
+TESTSSL_CERT_DATE_RE = re.compile(r"^\s*(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})(?::(\d{2}))?\s*(Z|UTC|GMT|[+-]\d{2}:?\d{2})?\s*$")
+
+# Parses a cert date string (i.e. the cert_notAfter finding) into a timezone
+# aware datetime, dates w/out a UTC offset are UTC. testssl.sh's own format
+# is parsed directly, anything else falls back to dateutil's (slow) parser.
+# The same dates recur across results, so parsed dates are LRU cached
+@functools.lru_cache(maxsize=4096)
+def parse_cert_date(cert_date_str):
+    match = TESTSSL_CERT_DATE_RE.match(cert_date_str)
+    if match is not None:
+        year, month, day, hour, minute, second, offset = match.groups()
+        tz = datetime.timezone.utc
+        if offset is not None and offset[0] in '+-':
+            offset_minutes = int(offset[1:3]) * 60 + int(offset[-2:])
+            tz = datetime.timezone(datetime.timedelta(minutes=offset_minutes if offset[0] == '+' else -offset_minutes))
+        return datetime.datetime(int(year),int(month),int(day),int(hour),int(minute),int(second or 0),tzinfo=tz)
+
+    parsed = dateparser.parse(cert_date_str)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+# ObjectPath's parser keeps its tokenizer state in module globals
+# so parsing must be serialized. Parsed ASTs are kept here
+# (objectpath expression -> AST) so each expression is parsed once
+compiled_objectpath_exprs = {}
+compiled_objectpath_exprs_lock = threading.RLock()
+
+def compile_objectpath(objectpath_query):
+    ast = compiled_objectpath_exprs.get(objectpath_query)
+    if ast is None:
+        with compiled_objectpath_exprs_lock:
+            ast = compiled_objectpath_exprs.get(objectpath_query)
+            if ast is None:
+                ast = objectpath_parse(objectpath_query)
+                compiled_objectpath_exprs[objectpath_query] = ast
+    return ast
+
+
+# ObjectPath Tree that resolves expressions through
+# our compiled_objectpath_exprs rather than re-parsing them
+class CompiledTree(Tree):
+
+    def compile(self, expr):
+        return compile_objectpath(expr)
+
+
+# Tracks the total time spent compiling HandlerConfigPlans
+# vs the time spent executing them against result files
+class PlanTimings():
+
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.compile_count = 0
+        self.compile_seconds = 0.0
+        self.execute_count = 0
+        self.execute_seconds = 0.0
+
+    def add_compile(self, seconds):
+        with self.lock:
+            self.compile_count += 1
+            self.compile_seconds += seconds
+
+    def add_execute(self, seconds):
+        with self.lock:
+            self.execute_count += 1
+            self.execute_seconds += seconds
+
+    def __str__(self):
+        return "compiled %d plans in %.3fs, executed %d plans in %.3fs" % \
+            (self.compile_count,self.compile_seconds,self.execute_count,self.execute_seconds)
+
+plan_timings = PlanTimings()
+
+
+# Metrics served by the /metrics resource (see handler_metrics.py)
+phase_seconds = handler_metrics.registry.histogram('testssl_handler_phase_seconds',
+                    "Seconds spent in each phase of processing a result file",['phase'])
+result_files_total = handler_metrics.registry.counter('testssl_handler_result_files_total',
+                    "Result file events handled by outcome",['status'])
+triggers_fired_total = handler_metrics.registry.counter('testssl_handler_triggers_fired_total',
+                    "Triggers fired by config and trigger tag",['config','tag'])
+triggers_suppressed_total = handler_metrics.registry.counter('testssl_handler_triggers_suppressed_total',
+                    "Fired triggers whose reactors were not invoked per their fire_on by config and trigger tag",['config','tag'])
+evaluation_errors_total = handler_metrics.registry.counter('testssl_handler_evaluation_errors_total',
+                    "Errors evaluating result files by config",['config'])
+reactor_seconds = handler_metrics.registry.histogram('testssl_handler_reactor_seconds',
+                    "Seconds spent in reactor handleTriggers() by config and reactor",['config','reactor'])
+reactor_errors_total = handler_metrics.registry.counter('testssl_handler_reactor_errors_total',
+                    "Errors raised by reactor handleTriggers() by config and reactor",['config','reactor'])
+evaluation_cache_total = handler_metrics.registry.counter('testssl_handler_evaluation_cache_total',
+                    "EvaluationCache lookups by result (hit or miss)",['result'])
+objectpath_query_cache_total = handler_metrics.registry.counter('testssl_handler_objectpath_query_cache_total',
+                    "ObjectPathContext query result cache lookups by result (hit or miss)",['result'])
+trigger_evaluations_total = handler_metrics.registry.counter('testssl_handler_trigger_evaluations_total',
+                    "Trigger objectpath evaluations by result (evaluated, or shared w/ an equivalent trigger of another config)",['result'])
+last_result_processed = handler_metrics.registry.gauge('testssl_handler_last_result_processed_timestamp_seconds',
+                    "Unix time the last result file was processed")
+
+
+# Invokes the reactor's handleTriggers() recording its latency/errors
+def handle_triggers(plan, reactor_name, reactor, triggers, objectpath_ctx):
+    logging.debug("Invoking reactor: " + reactor_name + " for " + str(len(triggers)) + " fired triggers")
+    try:
+        with reactor_seconds.time((plan.config_filename,reactor_name)):
+            reactor.handleTriggers(triggers,objectpath_ctx)
+    except Exception as e:
+        reactor_errors_total.inc((plan.config_filename,reactor_name))
+        raise e
+
+
+# Counts the triggers fired for a config
+def count_triggers_fired(config_filename, triggers_fired):
+    for t in triggers_fired:
+        triggers_fired_total.inc((config_filename,t['tag']))
+
+
+# A result handler yaml config compiled once when it is loaded:
+# its ObjectPath expressions are parsed, its path_properties_grok
+# regex is built and any reactor jinja2 templates are precompiled
+# so that processResultFile only has to execute it
+class HandlerConfigPlan():
+
+    def __init__(self, config_filename, config):
+        start = time.time()
+
+        self.config_filename = config_filename
+        self.config = config
+        self.target_keys = config['evaluation_doc_config']['target_keys']
+
+        # the finding_index is only placed in the evaluation_doc if given a key
+        # (it holds every finding twice, doubling what `$..` expressions match)
+        self.finding_index_key = self.target_keys.get('finding_index')
+
+        # one compiled Grok for all result file paths
+        self.grok = None
+        if 'path_properties_grok' in config and config['path_properties_grok'] is not None:
+            custom_groks = config['custom_groks'] if config.get('custom_groks') is not None else {}
+            self.grok = Grok(config['path_properties_grok'],custom_patterns=custom_groks)
+
+        self.cert_expires_objectpath = config['cert_expires_objectpath']
+        self.cert_expires_objectpath_ast = compile_objectpath(self.cert_expires_objectpath)
+        objectpath_fastpath.compile_fastpath(self.cert_expires_objectpath,self.cert_expires_objectpath_ast)
+
+        # list of trigger dicts, in config order, w/ their parsed ASTs
+        self.triggers = []
+        for trigger_name, trigger in config['trigger_on'].items():
+            fire_on = trigger.get('fire_on','always')
+            if fire_on not in FIRE_ON:
+                raise ValueError("trigger_on." + trigger_name + ".fire_on must be one of " + str(FIRE_ON) + " not: " + str(fire_on))
+            self.triggers.append({
+                                    'tag':trigger_name,
+                                    'title':trigger['title'],
+                                    'reactors':trigger['reactors'],
+                                    'objectpath':trigger['objectpath'],
+                                    'objectpath_ast':compile_objectpath(trigger['objectpath']),
+                                    'fire_on':fire_on,
+                                    'every_n_hours':float(trigger.get('every_n_hours',24))
+                                 })
+            objectpath_fastpath.compile_fastpath(trigger['objectpath'],self.triggers[-1]['objectpath_ast'])
+
+        # the triggers whose fire_on is tracked per subject in a TriggerStateStore
+        self.stateful_triggers = [t for t in self.triggers if t['fire_on'] != 'always']
+        self.stateful_trigger_tags = set(t['tag'] for t in self.stateful_triggers)
+        self.state_subject_objectpath = config.get('state_subject_objectpath',"$." + self.target_keys.get('result_metadata','result_metadata') + ".fqdn")
+        compile_objectpath(self.state_subject_objectpath)
+
+        # warm the shared reactor jinja2 template cache
+        # reactor_name -> [its template sources]
+        reactor_engines = config['reactor_engines'] if config.get('reactor_engines') is not None else {}
+
+        # a reactor holding its alerts for coalesce_seconds reports success before
+        # sending them, so fire_on would record a trigger as reacted to even if they are lost
+        for trigger in self.stateful_triggers:
+            for reactor_name in trigger['reactors']:
+                if float((reactor_engines.get(reactor_name) or {}).get('coalesce_seconds',0)) > 0:
+                    raise ValueError("trigger_on." + trigger['tag'] + ".fire_on: " + trigger['fire_on'] + " can not be used w/ reactor_engines." + reactor_name + ".coalesce_seconds")
+        self.reactor_templates = {}
+        for reactor_name, reactor_config in reactor_engines.items():
+            for value in reactor_config.values():
+                if reactor_templates.is_template(value):
+                    reactor_templates.get_template(value)
+                    self.reactor_templates.setdefault(reactor_name,[]).append(value)
+
+        # the top level evaluation_doc keys the reactor templates reference
+        self.reactor_template_variables = set()
+        for template_sources in self.reactor_templates.values():
+            for template_source in template_sources:
+                self.reactor_template_variables.update(reactor_templates.referenced_variables(template_source))
+
+        # evaluate each scanResult entry as its own scope? the scope
+        # (per IP) keys of each scope's evaluation_doc, see evaluateResultFile()
+        self.scan_result_fanout = bool(config.get('scan_result_fanout',False))
+        self.scope_keys = {'scan_result':self.target_keys.get('scan_result','scan_result'),
+                           'scan_result_index':self.target_keys.get('scan_result_index','scan_result_index'),
+                           'scan_result_findings':self.target_keys.get('scan_result_findings','scan_result_findings')}
+
+        # the scanResult sections our expressions and reactor
+        # templates reference (None = can't tell, all of them)
+        self.scan_result_sections = scan_result_sections_referenced_by(
+            [self.cert_expires_objectpath] + [t['objectpath'] for t in self.triggers] + list(config_strings(reactor_engines)),
+            (self.scope_keys['scan_result'],self.scope_keys['scan_result_findings']) if self.scan_result_fanout else ())
+
+        # which expressions only depend on the scanResult (so their results can
+        # be reused via an EvaluationCache) and a digest of everything they depend
+        # on besides the scanResult, see TestsslResultProcessor.evaluateResultFile()
+        result_key = self.target_keys['testssl_result_json']
+        scan_result_keys = (self.target_keys.get('finding_index','finding_index'),) + tuple(self.scope_keys.values())
+        self.cert_expires_cacheable = objectpath_depends_only_on_scan_result(self.cert_expires_objectpath,result_key,scan_result_keys)
+        for trigger in self.triggers:
+            trigger['cacheable'] = objectpath_depends_only_on_scan_result(trigger['objectpath'],result_key,scan_result_keys)
+        self.evaluation_cacheable = self.cert_expires_cacheable or any(t['cacheable'] for t in self.triggers)
+        self.evaluation_digest = hashlib.sha256(json.dumps([self.cert_expires_objectpath,
+                                                            {t['tag']:t['objectpath'] for t in self.triggers},
+                                                            self.target_keys,
+                                                            self.scan_result_fanout],sort_keys=True).encode('utf-8')).hexdigest()
+
+        # the key each trigger's results are shared under, per result file, w/
+        # the triggers (of any config) whose objectpath parses to the same AST and
+        # is evaluated against an equivalent evaluation_doc: the same scanResult
+        # keys if it only depends on the scanResult, else the same everything
+        # the evaluation_doc is built from. See TestsslResultProcessor.evaluateTriggers()
+        scan_result_doc_digest = json.dumps([result_key,scan_result_keys,self.scan_result_fanout])
+        evaluation_doc_digest = hashlib.sha256(json.dumps([self.target_keys,
+                                                           config.get('path_properties_grok'),
+                                                           config.get('custom_groks'),
+                                                           self.cert_expires_objectpath,
+                                                           self.scan_result_fanout],sort_keys=True,default=str).encode('utf-8')).hexdigest()
+        for trigger in self.triggers:
+            trigger['shared_key'] = (scan_result_doc_digest if trigger['cacheable'] else evaluation_doc_digest) + ":" + repr(trigger['objectpath_ast'])
+        self.cert_expires_shared_key = "cert_expires_in_days:" + (scan_result_doc_digest if self.cert_expires_cacheable else evaluation_doc_digest) + \
+                                       ":" + repr(self.cert_expires_objectpath_ast)
+
+        self.compile_seconds = time.time() - start
+        plan_timings.add_compile(self.compile_seconds)
+
+
+# Returns (the number of triggers across all of the config_snapshot's
+# plans, the number of distinct trigger evaluations they need per result
+# file (scope) once equivalent ones are shared, see HandlerConfigPlan)
+def trigger_evaluation_plan(config_snapshot):
+    triggers = [trigger for plan in config_snapshot.plans.values() for trigger in plan.triggers]
+    return (len(triggers),len(set(trigger['shared_key'] for trigger in triggers)))
+
+
+# ObjectPath expression engines:
+#  - objectpath: everything is evaluated by ObjectPath's interpreter
+#  - fastpath:   common expression shapes are evaluated natively on the
+#                evaluation_doc dicts (see objectpath_fastpath.py),
+#                falling back to ObjectPath for everything else
+#  - verify:     evaluates via both and logs any result that differs
+#                (returns the ObjectPath result)
+OBJECTPATH_ENGINES = ['objectpath','fastpath','verify']
+
+
+# Copies the (JSON like) result of an ObjectPathContext query so a
+# caller mutating it can't alter the ObjectPathContext's cached result
+def _copy_objectpath_result(value):
+    if isinstance(value,dict):
+        return {k:_copy_objectpath_result(v) for k, v in value.items()}
+    if isinstance(value,list):
+        return [_copy_objectpath_result(v) for v in value]
+    return value
+
+
+# Normalizes a raw Tree.execute() result for comparison, returns
+# (is_generator, value) where generators are drained into a list
+def _materialize_objectpath_result(qresult):
+    if qresult is None or isinstance(qresult,(str,bool,int,float,list,dict)):
+        return (False, qresult)
+    return (True, [r for r in qresult])
 
 
 class ObjectPathContext():
@@ -47,16 +692,82 @@ class ObjectPathContext():
     debug_objectpath_expr = False
     dump_evaldoc_on_error = False
 
-    def __init__(self, evaldoc, debug_objectpath_expressions, dump_evaldoc_on_error):
+    # one of OBJECTPATH_ENGINES
+    objectpath_engine = 'objectpath'
+
+    # the build_finding_index() of the testssl.sh result
+    finding_index = []
+
+    # the default scan_result_index of the finding*() lookups
+    # (the scope's scanResult entry when evaluating per scanResult)
+    scan_result_index = 0
+
+    # max results kept in the per evaluation_doc query result cache: the
+    # same queries are executed by the triggers and by the reactor templates
+    # (of several reactors/configs) rendered against the same doc
+    query_cache_size = 256
+
+    def __init__(self, evaldoc, debug_objectpath_expressions, dump_evaldoc_on_error, objectpath_engine='objectpath'):
         self.debug_objectpath_expr = debug_objectpath_expressions
         self.dump_evaldoc_on_error = dump_evaldoc_on_error
+        self.objectpath_engine = objectpath_engine
+
+        # (objectpath_query, force_return_index_on_multiple_results) -> result
+        self.query_cache = collections.OrderedDict()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+        # ObjectPath Trees are not safe to execute() concurrently and
+        # reactors on different dispatch threads may share this context
+        self.lock = threading.RLock()
         self.update(evaldoc)
 
     # update the context w/ the most recent
-    # evaluation_doc
+    # evaluation_doc. The Tree only holds a reference to the
+    # evaluation_doc so it is only rebuilt when given a different doc
     def update(self,evaldoc):
-        self.evaluation_doc = evaldoc
-        self.evaluation_doc_objectpath_tree = Tree(self.evaluation_doc)
+        with self.lock:
+            self.query_cache.clear()
+            if self.evaluation_doc_objectpath_tree is not None and evaldoc is self.evaluation_doc:
+                return
+            self.evaluation_doc = evaldoc
+            self.evaluation_doc_objectpath_tree = CompiledTree(self.evaluation_doc)
+
+    # Layers derived top level fields (i.e. cert_expires_in_days)
+    # onto the evaluation_doc in place, the shared testssl.sh result
+    # it references is left untouched and the Tree is not rebuilt
+    def set_fields(self,fields):
+        with self.lock:
+            self.query_cache.clear()
+            self.evaluation_doc.update(fields)
+
+    # O(1) lookup (via the finding_index) of all findings in
+    # scanResult[scan_result_index].section whose base id is finding_id
+    def findings(self,finding_id,section='serverDefaults',scan_result_index=None):
+        if scan_result_index is None:
+            scan_result_index = self.scan_result_index
+        try:
+            return self.finding_index[int(scan_result_index)][section]['by_id'].get(finding_id,[])
+        except (IndexError,KeyError):
+            return []
+
+    # O(1) lookup (via the finding_index) of the 'finding' value
+    # of the 1st finding whose base id is finding_id, i.e. finding('cert_notAfter')
+    def finding(self,finding_id,section='serverDefaults',scan_result_index=None):
+        findings = self.findings(finding_id,section,scan_result_index)
+        if len(findings) > 0:
+            return findings[0].get('finding')
+        return None
+
+    # O(1) lookup (via the finding_index) of all findings
+    # in scanResult[scan_result_index].section w/ the given severity
+    def findings_by_severity(self,severity,section,scan_result_index=None):
+        if scan_result_index is None:
+            scan_result_index = self.scan_result_index
+        try:
+            return self.finding_index[int(scan_result_index)][section]['by_severity'].get(severity,[])
+        except (IndexError,KeyError):
+            return []
 
     # Uses ObjectPath to evaluate the given
     # objectpath_query against the current state of the
@@ -85,18 +796,73 @@ class ObjectPathContext():
     def exec_objectpath(self,objectpath_query):
         return self._exec_objectpath(objectpath_query,None)
 
+    # Executes the objectpath_query using the configured
+    # objectpath_engine and returns the raw (Tree.execute() style) result
+    def _execute(self,objectpath_query):
+        if self.objectpath_engine == 'objectpath':
+            return self.evaluation_doc_objectpath_tree.execute(objectpath_query)
+
+        fastpath = objectpath_fastpath.compile_fastpath(objectpath_query,compile_objectpath(objectpath_query))
+        if fastpath is None:
+            return self.evaluation_doc_objectpath_tree.execute(objectpath_query)
+
+        if self.objectpath_engine == 'fastpath':
+            # anything the fastpath can't handle (or errors on)
+            # is left to ObjectPath to evaluate (or raise on)
+            try:
+                return fastpath(self.evaluation_doc)
+            except Exception as e:
+                if self.debug_objectpath_expr:
+                    logging.debug("exec_objectpath: query: " + objectpath_query  + " fastpath fell back to ObjectPath: " + str(type(e)))
+                return self.evaluation_doc_objectpath_tree.execute(objectpath_query)
+
+        # verify
+        is_generator, qresult = _materialize_objectpath_result(self.evaluation_doc_objectpath_tree.execute(objectpath_query))
+        try:
+            fastpath_result = _materialize_objectpath_result(fastpath(self.evaluation_doc))
+        except Exception as e:
+            # a fallback to ObjectPath, not a difference
+            fastpath_result = (is_generator, qresult)
+
+        if fastpath_result != (is_generator, qresult):
+            logging.warn("exec_objectpath: query: " + objectpath_query + " fastpath result: " + str(fastpath_result) + " differs from ObjectPath result: " + str((is_generator, qresult)))
+
+        if is_generator:
+            return iter(qresult)
+        return qresult
+
     # Uses ObjectPath to evaluate the given
     # objectpath_query against the current state of the
     # `evaluation_doc_objectpath_tree`
     # Takes a force_return_index_on_multiple_results should multiple matches be found
     # to force the return on a specified element
+    # Results are cached per evaluation_doc (until the next update()/set_fields())
+    # and returned as copies, queries that raise are not cached
     def _exec_objectpath(self,objectpath_query,force_return_index_on_multiple_results):
+        key = (objectpath_query,None if force_return_index_on_multiple_results is None else str(force_return_index_on_multiple_results))
+        with self.lock:
+            if key in self.query_cache:
+                self.query_cache.move_to_end(key)
+                self.query_cache_hits += 1
+                objectpath_query_cache_total.inc(('hit',))
+                return _copy_objectpath_result(self.query_cache[key])
+
+            self.query_cache_misses += 1
+            objectpath_query_cache_total.inc(('miss',))
+            qresult = self._exec_objectpath_locked(objectpath_query,force_return_index_on_multiple_results)
+
+            self.query_cache[key] = qresult
+            if len(self.query_cache) > self.query_cache_size:
+                self.query_cache.popitem(last=False)
+            return _copy_objectpath_result(qresult)
+
+    def _exec_objectpath_locked(self,objectpath_query,force_return_index_on_multiple_results):
         if self.debug_objectpath_expr:
             logging.debug("exec_objectpath: query: " + objectpath_query)
 
         qresult = None
         try:
-            qresult = self.evaluation_doc_objectpath_tree.execute(objectpath_query)
+            qresult = self._execute(objectpath_query)
         except Exception as e:
             if self.debug_objectpath_expr:
                 logging.debug("exec_objectpath: query: " + objectpath_query  + " failure: " + str(sys.exc_info()[0]))
@@ -172,6 +938,83 @@ class ObjectPathContext():
 
 
 
+# The ObjectPathContext methods whose results are recorded by a
+# RecordingObjectPathContext and replayed by a RecordedObjectPathContext
+RECORDED_OBJECTPATH_METHODS = ('exec_objectpath','exec_objectpath_first_match','exec_objectpath_specific_match',
+                               'finding','findings','findings_by_severity')
+
+# Wraps an ObjectPathContext recording the (plain) results of
+# the RECORDED_OBJECTPATH_METHODS calls made through it
+class RecordingObjectPathContext():
+
+    def __init__(self, objectpath_ctx):
+        self.objectpath_ctx = objectpath_ctx
+        self.evaluation_doc = objectpath_ctx.evaluation_doc
+
+        # (method name,) + args -> result
+        self.recorded = {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        method = getattr(self.objectpath_ctx,name)
+        if name not in RECORDED_OBJECTPATH_METHODS:
+            return method
+
+        def record(*args):
+            result = method(*args)
+            if result is None or isinstance(result,(str,bool,int,float,list,dict)):
+                self.recorded[(name,) + args] = result
+            return result
+        return record
+
+
+# The evaluation_doc of a RecordedObjectPathContext: the fields sent back
+# by the worker, any other key is read from the re-loaded evaluation_doc
+class RecordedEvaluationDoc(dict):
+
+    def __init__(self, fields, load_evaluation_doc):
+        super(RecordedEvaluationDoc, self).__init__(fields)
+        self.load_evaluation_doc = load_evaluation_doc
+
+    def __missing__(self, key):
+        return self.load_evaluation_doc()[key]
+
+
+# Stands in for the ObjectPathContext of an evaluation done in a process pool
+# worker (see evaluate_result_file_in_worker) replaying the results the worker
+# recorded rendering the reactors' templates. Anything else is answered by the
+# real ObjectPathContext, which load_objectpath_ctx() re-builds (once) on demand
+class RecordedObjectPathContext():
+
+    def __init__(self, fields, scan_result_index, recorded, load_objectpath_ctx):
+        self.scan_result_index = scan_result_index
+        self.recorded = recorded
+        self.load_objectpath_ctx = load_objectpath_ctx
+        self.loaded_objectpath_ctx = None
+        self.lock = threading.Lock()
+        self.evaluation_doc = RecordedEvaluationDoc(fields,lambda: self.loaded().evaluation_doc)
+
+    def loaded(self):
+        with self.lock:
+            if self.loaded_objectpath_ctx is None:
+                self.loaded_objectpath_ctx = self.load_objectpath_ctx()
+            return self.loaded_objectpath_ctx
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name not in RECORDED_OBJECTPATH_METHODS:
+            return getattr(self.loaded(),name)
+
+        def replay(*args):
+            key = (name,) + args
+            if key in self.recorded:
+                return _copy_objectpath_result(self.recorded[key])
+            return getattr(self.loaded(),name)(*args)
+        return replay
+
+
 class TestsslResultProcessor(object):
 
     # for controlling access to job_name_2_metrics_db
@@ -188,6 +1031,27 @@ class TestsslResultProcessor(object):
     dump_evaldoc_on_error = False
     debug_dump_evaldoc = False
 
+    # one of OBJECTPATH_ENGINES
+    objectpath_engine = 'objectpath'
+
+    # one of JSON_LOADERS
+    json_loader = 'full'
+
+    # if set, a ReactorDispatcher that reactors are queued to
+    # otherwise they are invoked inline on the evaluating thread
+    reactor_dispatcher = None
+
+    # if set, an EvaluationCache of the scanResult dependent
+    # evaluations of previously seen results
+    evaluation_cache = None
+
+    # if set, the TriggerStateStore applying the triggers' fire_on
+    # otherwise the reactors of every fired trigger are invoked
+    trigger_state_store = None
+
+    # returns the current (timezone aware) time cert_expires_in_days is relative to
+    clock = staticmethod(utc_now)
+
     def dumpEvalDoc(self,evaluation_doc):
         if self.dump_evaldoc_on_error:
             try:
@@ -198,193 +1062,1458 @@ class TestsslResultProcessor(object):
             except Exception as etwo:
                 logging.exception("Unexpected error attempting dump_evaldoc_on_error")
 
-    # Will process the testssl_json_result_file_path file
-    def processResultFile(self,testssl_json_result_file_path,input_dir):
+    # Will process the given TestsslResultFile (as handed off by the
+    # TestsslResultFileMonitor) or, if passed a plain path, load it first.
+    # against the configs of the config_snapshot (default the current one)
+    # If given, on_reacted() is called once all the reactors invoked for
+    # it have been handled (which may be after this returns, see ReactorDispatcher)
+    # If given a list of `errors`, a description of each failed evaluation
+    # and (once handled) each fired trigger whose reactors failed is appended to it
+    # Returns a dict of config_filename -> [tags of the triggers fired]
+    def processResultFile(self,testssl_result_file,input_dir,config_snapshot=None,on_reacted=None,errors=None):
+        if config_snapshot is None:
+            config_snapshot = current_config_snapshot()
+
+        testssl_result_file = self.loadResultFile(testssl_result_file,config_snapshot)
+        if testssl_result_file is None:
+            if on_reacted is not None:
+                on_reacted()
+            return
+
+        pending_reactions = PendingReactions(on_reacted)
+        if errors is not None:
+            pending_reactions.on_complete(lambda: errors.extend("reactors of %s:%s failed" % failed for failed in sorted(pending_reactions.failed)))
 
-        logging.info("Received event for create of new testssl.sh JSON result file: '%s'", testssl_json_result_file_path)
+        # config_filename -> [tags of the triggers fired]
+        triggers_fired_summary = {}
 
-        # open the file
-        testssl_result = None
+        try:
+            for plan, objectpath_ctx, triggers_fired in self.evaluateResultFile(testssl_result_file,input_dir,config_snapshot,errors):
+                triggers_fired_summary.setdefault(plan.config_filename,[]).extend([t['tag'] for t in triggers_fired])
+                count_triggers_fired(plan.config_filename,triggers_fired)
 
-        # get absolute path & filename optionally
-        testssl_json_result_abs_file_path = os.path.abspath(testssl_json_result_file_path)
-        testssl_json_result_filename = os.path.basename(testssl_json_result_file_path)
+                # Triggers were fired
+                # lets process their reactors
+                try:
+                    triggers_to_react = self.applyFireOn(plan,triggers_fired,objectpath_ctx,pending_reactions=pending_reactions)
+                    if len(triggers_to_react) > 0:
+                        self.invokeReactors(plan,triggers_to_react,objectpath_ctx,pending_reactions)
+                    elif len(triggers_fired) > 0:
+                        logging.info("Triggers fired for: " + testssl_result_file.path + " are unchanged, per their fire_on not invoking their reactors")
+                    else:
+                        logging.info("No triggers fired for: " + testssl_result_file.path)
+                except Exception as e:
+                    if errors is not None:
+                        errors.append("reacting using %s: %s" % (plan.config_filename,e))
+                    logging.exception("Unexpected error processing: " + testssl_result_file.path + " using: " + plan.config_filename + " err:" + str(sys.exc_info()[0]))
+                    self.dumpEvalDoc(objectpath_ctx.evaluation_doc)
+        except Exception as e:
+            pending_reactions.abandon()
+            raise e
+
+        pending_reactions.seal()
+        return triggers_fired_summary
 
-        # init eval doc
-        evaluation_doc = None
+    # Returns the loaded TestsslResultFile for the given TestsslResultFile
+    # or path, or None if there is nothing in it to evaluate
+    def loadResultFile(self,testssl_result_file,config_snapshot=None):
 
-        # Open the JSON file
+        testssl_json_result_file_path = testssl_result_file
+        if isinstance(testssl_result_file,TestsslResultFile):
+            testssl_json_result_file_path = testssl_result_file.path
+
+        logging.info("Received event for create of new testssl.sh JSON result file: '%s'", testssl_json_result_file_path)
+
+        # Open the JSON file (only if the monitor did not already parse it)
         try:
-            with open(testssl_json_result_file_path, 'r') as f:
-                testssl_result = json.load(f)
+            if not isinstance(testssl_result_file,TestsslResultFile) or testssl_result_file.testssl_result is None:
+                testssl_result_file = load_testssl_result_file(testssl_json_result_file_path,self.json_loader,config_snapshot)
+                if testssl_result_file is None:
+                    logging.info("Result JSON changed while being read, skipping: '%s'", testssl_json_result_file_path)
+                    return None
 
-                # no scan result
-                if 'scanResult' not in testssl_result or len(testssl_result['scanResult']) == 0:
-                    logging.info("Result JSON contained empty 'scanResult', skipping: '%s'", testssl_json_result_file_path)
-                    return
+            testssl_result = testssl_result_file.testssl_result
+
+            # no scan result
+            if testssl_result is None or 'scanResult' not in testssl_result or len(testssl_result['scanResult']) == 0:
+                logging.info("Result JSON contained empty 'scanResult', skipping: '%s'", testssl_json_result_file_path)
+                return None
 
         except Exception as e:
             logging.exception("Unexpected error in open(): "+testssl_json_result_file_path + " error:" +str(sys.exc_info()[0]))
             raise e
 
         logging.info("testssl.sh JSON result file loaded OK: '%s'" % testssl_json_result_file_path)
+        return testssl_result_file
+
+    # Evaluates the loaded TestsslResultFile against all of the result handler
+    # configs of the config_snapshot (default the current one), returns a list of
+    # (HandlerConfigPlan, ObjectPathContext, [triggers_fired]) for each config it
+    # was successfully evaluated against. If given a list of `errors`, each config
+    # (scope) it failed to be evaluated against is described in it
+    def evaluateResultFile(self,testssl_result_file,input_dir,config_snapshot=None,errors=None):
+        if config_snapshot is None:
+            config_snapshot = current_config_snapshot()
+
+        # index the findings once for all configs
+        with phase_seconds.time(('finding_index',)):
+            finding_index = build_finding_index(testssl_result_file.testssl_result)
+
+        # digest the scanResult once for all configs
+        scan_result_cache_digest = None
+        if self.evaluation_cache is not None:
+            scan_result_cache_digest = testssl_result_file.scan_result_sha256
+            if scan_result_cache_digest is None:
+                with phase_seconds.time(('scan_result_digest',)):
+                    scan_result_cache_digest = scan_result_digest(testssl_result_file.testssl_result)
+
+        evaluations = []
+
+        # trigger results shared across configs: scan_result_index -> {trigger shared_key -> results}
+        shared_results = collections.defaultdict(dict)
 
         # for each of our result handler configs
         # lets process the JSON result file through it
-        try:
-            for config_filename, config in result_handler_configs.items():
+        for config_filename, plan in config_snapshot.plans.items():
 
-                logging.info("Evaluating %s against config '%s' ..." % (testssl_json_result_file_path,config_filename))
+            logging.info("Evaluating %s against config '%s' ..." % (testssl_result_file.path,config_filename))
 
-                try:
-                    # create uberdoc for evaluations
-                    evaluation_doc = {
-                                config['evaluation_doc_config']['target_keys']['testssl_result_json']: testssl_result,
-                                config['evaluation_doc_config']['target_keys']['testssl_result_parent_dir_path']:os.path.dirname(testssl_json_result_file_path).replace(input_dir+"/",""),
-                                config['evaluation_doc_config']['target_keys']['testssl_result_parent_dir_abs_path']:os.path.dirname(testssl_json_result_abs_file_path),
-                                config['evaluation_doc_config']['target_keys']['testssl_result_file_abs_path']:testssl_json_result_abs_file_path,
-                                config['evaluation_doc_config']['target_keys']['testssl_result_filename']:testssl_json_result_filename
-                                }
-
-                    # apply any properties found in the path_properties_grok
-                    if 'path_properties_grok' in config and config['path_properties_grok'] is not None:
-                        grok = Grok(config['path_properties_grok'],custom_patterns=config['custom_groks'])
-                        matches = grok.match(testssl_json_result_file_path)
-
-                        # matches?
-                        if matches is not None:
-                            if 'ignored' in matches:
-                                del matches['ignored']
-                        else:
-                            logging.warn("path_properties_grok: matched nothing! grok:" + config['path_properties_grok'] + " against path: " + testssl_json_result_file_path)
-                            matches = {}
-
-                        result_metadata = {
-                                          config['evaluation_doc_config']['target_keys']['result_metadata']:matches
-                                          }
-                        evaluation_doc.update(result_metadata)
-
-
-
-                    # Create our Tree to do ObjectPath evals
-                    # against our evaluation_doc
-                    objectpath_ctx = ObjectPathContext(evaluation_doc,self.debug_objectpath_expr,self.dump_evaldoc_on_error)
-
-                    # for debugging
-                    if self.debug_dump_evaldoc:
-                        logging.warn("debug_dump_evaldoc: dumping evalution_doc pre cert_expires_objectpath evaluation")
-                        self.dumpEvalDoc(evaluation_doc)
-
-                    # Lets grab the cert expires to calc number of days till expiration
-                    # Note we force grab the first match...
-                    cert_expires_at_str = objectpath_ctx.exec_objectpath_first_match(config['cert_expires_objectpath'])
-                    cert_expires_at = dateparser.parse(cert_expires_at_str)
-                    expires_in_days = cert_expires_at - datetime.datetime.utcnow()
-                    evaluation_doc.update({
-                                    config['evaluation_doc_config']['target_keys']['cert_expires_in_days']:expires_in_days.days
-                                   })
-
-
-                    # Rebuild our Tree to do ObjectPath evals
-                    # against our evaluation_doc to sure the Tree is up to date
-                    objectpath_ctx.update(evaluation_doc)
-
-                    # for debugging, dump again as we updated it
-                    if self.debug_dump_evaldoc:
-                        logging.warn("debug_dump_evaldoc: dumping evalution_doc pre Trigger evaluations")
-                        self.dumpEvalDoc(evaluation_doc)
-
-                    # lets process all triggers
-                    triggers_fired = []
-                    for trigger_name in config['trigger_on']:
-                        trigger = config['trigger_on'][trigger_name]
-                        objectpath_result = objectpath_ctx.exec_objectpath(trigger['objectpath'])
-                        results = []
-
-                        if objectpath_result is not None:
-
-                            # if a primitive....
-                            if isinstance(objectpath_result,(str,int,float,bool)):
-
-                                # if a boolean we only include if True....
-                                if isinstance(objectpath_result,(bool)):
-                                    if objectpath_result is False:
-                                        continue
-
-                                results.append(objectpath_result)
-
-                            # if a list ...
-                            elif isinstance(objectpath_result,(list)):
-                                results = objectpath_result
-
-                            # some other object, throw in a list
-                            else:
-                                results.append(objectpath_result)
-
-                            # ok we got at least 1 result back
-                            # from the objectpath expression
-                            if len(results) > 0:
-                                triggers_fired.append({
-                                                        'tag':trigger_name,
-                                                        'title':trigger['title'],
-                                                        'reactors':trigger['reactors'],
-                                                        'objectpath':trigger['objectpath'],
-                                                        'results':results,
-                                                        'config_filename':config_filename,
-                                                        'testssl_json_result_abs_file_path':testssl_json_result_abs_file_path,
-                                                        'testssl_json_result_filename':testssl_json_result_filename,
-                                                        'evaluation_doc':evaluation_doc
-                                                      })
-
-                    # Triggers were fired
-                    # lets process their reactors
-                    if len(triggers_fired) > 0:
-
-                        # build a map of reactors -> triggers
-                        reactor_triggers = {}
-                        for t in triggers_fired:
-
-                            # each trigger can have N reactors
-                            for reactor_name in t['reactors']:
-                                if reactor_name not in reactor_triggers:
-                                    reactor_triggers[reactor_name] = []
-                                reactor_triggers[reactor_name].append(t)
-
-
-                        # for each reactor to invoke...
-                        for reactor_name,triggers in reactor_triggers.items():
-
-                            # handle misconfig
-                            if reactor_name not in config['reactor_engines']:
-                                logging.error("Configured reactor_engine '%s' is not configured?... skipping" % (reactor_name))
-                                continue
-
-                            # create the reactor
-                            reactor = None
-                            reactor_config = config['reactor_engines'][reactor_name]
-                            class_name = reactor_config['class_name']
-                            try:
-                                reactor_class = getattr(importlib.import_module('reactors.' + class_name.lower()), class_name)
-                                reactor = reactor_class(reactor_config)
-                            except Exception as e:
-                                logging.exception("Error loading reactor class: " + class_name + ". Failed to find 'reactors/"+class_name.lower() +".py' with class '"+class_name+"' declared within it")
-                                self.dumpEvalDoc(evaluation_doc)
-                                raise e
-
-                            # react to the fired triggers
-                            logging.debug("Invoking reactor: " + reactor_name + " for " + str(len(triggers)) + " fired triggers")
-                            reactor.handleTriggers(triggers,objectpath_ctx)
+            # the plan is compiled at config load, we only execute it
+            plan_execute_start = time.time()
+            evaluation_doc = None
+
+            try:
+                evaluation_doc = self.buildEvaluationDoc(plan,testssl_result_file,input_dir,finding_index)
+
+                # the scope memos of a previous evaluation of the same scanResult
+                # against this plan, or new ones to record this evaluation in
+                cache_key = None
+                scope_memos = None
+                if scan_result_cache_digest is not None and plan.evaluation_cacheable:
+                    cache_key = plan.evaluation_digest + ":" + scan_result_cache_digest
+                    scope_memos = self.evaluation_cache.get(cache_key)
+                    if scope_memos is not None:
+                        logging.debug("EvaluationCache hit for: " + testssl_result_file.path + " using: " + config_filename)
+                        cache_key = None
                     else:
-                        logging.info("No triggers fired for: " + testssl_json_result_file_path)
+                        scope_memos = [{} for i in range(len(testssl_result_file.testssl_result['scanResult']) if plan.scan_result_fanout else 1)]
 
+                if plan.scan_result_fanout:
+                    scope_evaluations = self.evaluateScanResults(plan,evaluation_doc,testssl_result_file,finding_index,scope_memos,shared_results,errors)
+                    evaluations.extend(scope_evaluations)
+                    if len(scope_evaluations) != len(testssl_result_file.testssl_result['scanResult']):
+                        cache_key = None
+                else:
+                    scope_memo = scope_memos[0] if scope_memos is not None else None
+                    objectpath_ctx = self.evaluateCertExpiration(plan,evaluation_doc,finding_index,0,scope_memo,shared_results[0])
+                    triggers_fired = self.evaluateTriggers(plan,objectpath_ctx,testssl_result_file,scope_memo,shared_results[0])
+                    evaluations.append((plan,objectpath_ctx,triggers_fired))
+
+                if cache_key is not None:
+                    self.evaluation_cache.put(cache_key,scope_memos)
+
+            except Exception as e:
+                evaluation_errors_total.inc((config_filename,))
+                if errors is not None:
+                    errors.append("evaluating using %s: %s" % (config_filename,e))
+                logging.exception("Unexpected error processing: " + testssl_result_file.path + " using: " + config_filename + " err:" + str(sys.exc_info()[0]))
+                self.dumpEvalDoc(evaluation_doc)
+
+            finally:
+                plan_timings.add_execute(time.time() - plan_execute_start)
+
+        logging.debug("HandlerConfigPlan timings (config snapshot v%d): %s" % (config_snapshot.version,plan_timings))
+
+        return evaluations
+
+    # create uberdoc for evaluations, note the (large) testssl_result
+    # is shared by reference by every config's evaluation_doc
+    def buildEvaluationDoc(self,plan,testssl_result_file,input_dir,finding_index):
+        with phase_seconds.time(('evaluation_doc',)):
+            return self._buildEvaluationDoc(plan,testssl_result_file,input_dir,finding_index)
+
+    def _buildEvaluationDoc(self,plan,testssl_result_file,input_dir,finding_index):
+        target_keys = plan.target_keys
+
+        testssl_json_result_file_path = testssl_result_file.path
+        testssl_json_result_abs_file_path = os.path.abspath(testssl_json_result_file_path)
+
+        evaluation_doc = {
+                    target_keys['testssl_result_json']: testssl_result_file.testssl_result,
+                    target_keys['testssl_result_parent_dir_path']:os.path.dirname(testssl_json_result_file_path).replace(input_dir+"/",""),
+                    target_keys['testssl_result_parent_dir_abs_path']:os.path.dirname(testssl_json_result_abs_file_path),
+                    target_keys['testssl_result_file_abs_path']:testssl_json_result_abs_file_path,
+                    target_keys['testssl_result_filename']:os.path.basename(testssl_json_result_file_path)
+                    }
+
+        if plan.finding_index_key is not None:
+            evaluation_doc[plan.finding_index_key] = finding_index
+
+        # apply any properties found in the path_properties_grok
+        if plan.grok is not None:
+            matches = plan.grok.match(testssl_json_result_file_path)
+
+            # matches?
+            if matches is not None:
+                if 'ignored' in matches:
+                    del matches['ignored']
+            else:
+                logging.warn("path_properties_grok: matched nothing! grok:" + plan.config['path_properties_grok'] + " against path: " + testssl_json_result_file_path)
+                matches = {}
+
+            result_metadata = {
+                              target_keys['result_metadata']:matches
+                              }
+            evaluation_doc.update(result_metadata)
+
+        return evaluation_doc
+
+    # Creates a scope evaluation_doc for scanResult[scan_result_index]: a
+    # shallow copy of the evaluation_doc (sharing the testssl.sh result,
+    # finding_index etc by reference) w/ the scanResult entry and its findings
+    def buildScopeEvaluationDoc(self,plan,evaluation_doc,testssl_result,finding_index,scan_result_index):
+        scope_evaluation_doc = dict(evaluation_doc)
+        scope_evaluation_doc[plan.scope_keys['scan_result']] = testssl_result['scanResult'][scan_result_index]
+        scope_evaluation_doc[plan.scope_keys['scan_result_index']] = scan_result_index
+        scope_evaluation_doc[plan.scope_keys['scan_result_findings']] = finding_index[scan_result_index]
+        return scope_evaluation_doc
+
+    # scan_result_fanout: evaluates every scanResult entry (i.e. each IP of
+    # a multi address target) as its own scope w/ its own cert_expires_in_days
+    # returns a list of (HandlerConfigPlan, ObjectPathContext, [triggers_fired]), one per
+    # scope successfully evaluated. scope_memos, if given, has a memo per scope (see EvaluationCache)
+    # and shared_results, if given, the results shared across configs per scope (see evaluateTriggers)
+    # If given a list of `errors`, each scope that failed to evaluate is described in it
+    def evaluateScanResults(self,plan,evaluation_doc,testssl_result_file,finding_index,scope_memos=None,shared_results=None,errors=None):
+        evaluations = []
+        for scan_result_index in range(len(testssl_result_file.testssl_result['scanResult'])):
+            scope_evaluation_doc = self.buildScopeEvaluationDoc(plan,evaluation_doc,testssl_result_file.testssl_result,finding_index,scan_result_index)
+            scope_memo = scope_memos[scan_result_index] if scope_memos is not None else None
+            scope_shared_results = shared_results[scan_result_index] if shared_results is not None else None
+            try:
+                objectpath_ctx = self.evaluateCertExpiration(plan,scope_evaluation_doc,finding_index,scan_result_index,scope_memo,scope_shared_results)
+                triggers_fired = self.evaluateTriggers(plan,objectpath_ctx,testssl_result_file,scope_memo,scope_shared_results)
+                for t in triggers_fired:
+                    t['scan_result_index'] = scan_result_index
+                evaluations.append((plan,objectpath_ctx,triggers_fired))
+
+            # one bad scanResult entry does not prevent evaluating the others
+            except Exception as e:
+                evaluation_errors_total.inc((plan.config_filename,))
+                if errors is not None:
+                    errors.append("evaluating scanResult[%d] using %s: %s" % (scan_result_index,plan.config_filename,e))
+                logging.exception("Unexpected error processing: " + testssl_result_file.path + " scanResult[" + str(scan_result_index) + "] using: " + plan.config_filename + " err:" + str(sys.exc_info()[0]))
+                self.dumpEvalDoc(scope_evaluation_doc)
+
+        return evaluations
+
+    # Create our Tree to do ObjectPath evals against our evaluation_doc
+    def createObjectPathContext(self,evaluation_doc,finding_index,scan_result_index=0):
+        with phase_seconds.time(('tree_build',)):
+            objectpath_ctx = ObjectPathContext(evaluation_doc,self.debug_objectpath_expr,self.dump_evaldoc_on_error,self.objectpath_engine)
+        objectpath_ctx.finding_index = finding_index
+        objectpath_ctx.scan_result_index = scan_result_index
+        return objectpath_ctx
+
+    # Creates the ObjectPathContext for the evaluation_doc and layers the
+    # cert_expires_in_days onto it, returns the ObjectPathContext. If given a
+    # scope_memo (see EvaluationCache) the cert expiration date is taken from
+    # it, or recorded in it, the days till then are always recalculated. If
+    # given shared_results (see evaluateTriggers) the cert_expires_in_days is
+    # only calculated once per result file (scope) for all equivalent configs
+    def evaluateCertExpiration(self,plan,evaluation_doc,finding_index,scan_result_index=0,scope_memo=None,shared_results=None):
+        objectpath_ctx = self.createObjectPathContext(evaluation_doc,finding_index,scan_result_index)
+
+        # for debugging
+        if self.debug_dump_evaldoc:
+            logging.warn("debug_dump_evaldoc: dumping evalution_doc pre cert_expires_objectpath evaluation")
+            self.dumpEvalDoc(evaluation_doc)
+
+        # Lets grab the cert expires to calc number of days till expiration
+        # Note we force grab the first match...
+        with phase_seconds.time(('cert_expires',)):
+            if shared_results is not None and plan.cert_expires_shared_key in shared_results:
+                cert_expires_at_str, expires_in_days = shared_results[plan.cert_expires_shared_key]
+            else:
+                if scope_memo is not None and 'cert_expires_at' in scope_memo:
+                    cert_expires_at_str = scope_memo['cert_expires_at']
+                else:
+                    cert_expires_at_str = objectpath_ctx.exec_objectpath_first_match(plan.cert_expires_objectpath)
+                expires_in_days = (parse_cert_date(cert_expires_at_str) - self.clock()).days
+                if shared_results is not None:
+                    shared_results[plan.cert_expires_shared_key] = (cert_expires_at_str,expires_in_days)
+            if scope_memo is not None and plan.cert_expires_cacheable:
+                scope_memo['cert_expires_at'] = cert_expires_at_str
+
+        # layered onto the evaluation_doc w/out rebuilding the Tree
+        objectpath_ctx.set_fields({
+                        plan.target_keys['cert_expires_in_days']:expires_in_days
+                       })
+
+        # for debugging, dump again as we updated it
+        if self.debug_dump_evaldoc:
+            logging.warn("debug_dump_evaldoc: dumping evalution_doc pre Trigger evaluations")
+            self.dumpEvalDoc(evaluation_doc)
+
+        return objectpath_ctx
+
+    # Evaluates all of the plan's triggers against the objectpath_ctx
+    # returns the list of trigger_result objects for those that fired. If
+    # given a scope_memo (see EvaluationCache) the results of the triggers
+    # that only depend on the scanResult are taken from it, or recorded in it.
+    # If given shared_results (trigger shared_key -> results, for this result
+    # file/scope) a trigger equivalent to one already evaluated for another
+    # config is not evaluated again, its results are copied
+    def evaluateTriggers(self,plan,objectpath_ctx,testssl_result_file,scope_memo=None,shared_results=None):
+        with phase_seconds.time(('trigger_eval',)):
+            return self._evaluateTriggers(plan,objectpath_ctx,testssl_result_file,scope_memo,shared_results)
+
+    def _evaluateTriggers(self,plan,objectpath_ctx,testssl_result_file,scope_memo,shared_results):
+        testssl_json_result_abs_file_path = os.path.abspath(testssl_result_file.path)
+        testssl_json_result_filename = os.path.basename(testssl_result_file.path)
+
+        memo_results = scope_memo.setdefault('triggers',{}) if scope_memo is not None else None
+
+        # lets process all triggers
+        triggers_fired = []
+        for trigger in plan.triggers:
+            trigger_name = trigger['tag']
+            if memo_results is not None and trigger_name in memo_results:
+                results = memo_results[trigger_name]
+            elif shared_results is not None and trigger['shared_key'] in shared_results:
+                results = list(shared_results[trigger['shared_key']])
+                trigger_evaluations_total.inc(('shared',))
+            else:
+                results = self.evaluateTrigger(trigger,objectpath_ctx)
+                trigger_evaluations_total.inc(('evaluated',))
+                if memo_results is not None and trigger['cacheable']:
+                    memo_results[trigger_name] = results
+            if shared_results is not None:
+                shared_results.setdefault(trigger['shared_key'],results)
+
+            # ok we got at least 1 result back
+            # from the objectpath expression
+            if len(results) > 0:
+                triggers_fired.append({
+                                        'tag':trigger_name,
+                                        'title':trigger['title'],
+                                        'reactors':trigger['reactors'],
+                                        'objectpath':trigger['objectpath'],
+                                        'results':results,
+                                        'config_filename':plan.config_filename,
+                                        'testssl_json_result_abs_file_path':testssl_json_result_abs_file_path,
+                                        'testssl_json_result_filename':testssl_json_result_filename,
+                                        'evaluation_doc':objectpath_ctx.evaluation_doc
+                                      })
+
+        return triggers_fired
+
+    # Evaluates the trigger's objectpath, returns the list of its results
+    # (empty if it did not fire)
+    def evaluateTrigger(self,trigger,objectpath_ctx):
+        objectpath_result = objectpath_ctx.exec_objectpath(trigger['objectpath'])
+        results = []
+
+        if objectpath_result is not None:
+
+            # if a primitive....
+            if isinstance(objectpath_result,(str,int,float,bool)):
+
+                # if a boolean we only include if True....
+                if isinstance(objectpath_result,(bool)):
+                    if objectpath_result is False:
+                        return results
+
+                results.append(objectpath_result)
+
+            # if a list ...
+            elif isinstance(objectpath_result,(list)):
+                results = objectpath_result
+
+            # some other object, throw in a list
+            else:
+                results.append(objectpath_result)
+
+        return results
+
+    # Invokes the reactors for the evaluation summaries returned from
+    # a process pool evaluation worker (see evaluate_result_file_in_worker)
+    # evaluated against the config_snapshot (default the current one). The
+    # reactors get RecordedObjectPathContexts, the result file is only re-loaded
+    # if they need more than the worker recorded. If given, on_reacted() is
+    # called once all the reactors invoked have been handled
+    def invokeReactorsForSummaries(self,testssl_result_file,evaluation_summaries,on_reacted=None,config_snapshot=None):
+        pending_reactions = PendingReactions(on_reacted)
+        try:
+            self._invokeReactorsForSummaries(testssl_result_file,evaluation_summaries,pending_reactions,config_snapshot)
+        except Exception as e:
+            pending_reactions.abandon()
+            raise e
+        pending_reactions.seal()
+
+    def _invokeReactorsForSummaries(self,testssl_result_file,evaluation_summaries,pending_reactions,config_snapshot):
+        if config_snapshot is None:
+            config_snapshot = current_config_snapshot()
+
+        # (re)loaded once for all of the evaluation summaries, if at all
+        reloaded = []
+        reload_lock = threading.Lock()
+        def reload_result_file():
+            with reload_lock:
+                if len(reloaded) == 0:
+                    loaded = load_testssl_result_file(testssl_result_file.path,self.json_loader)
+                    if loaded is None:
+                        raise IOError("Result JSON changed while being re-loaded for its reactors: " + testssl_result_file.path)
+                    if loaded.sha256 != testssl_result_file.sha256:
+                        logging.warn("Result JSON changed since it was evaluated, reacting to it anyways: '%s'", testssl_result_file.path)
+                    logging.debug("Re-loaded %s for reactors needing more than was recorded in the evaluation worker" % testssl_result_file.path)
+                    reloaded.append((loaded,build_finding_index(loaded.testssl_result)))
+                return reloaded[0]
+
+        for evaluation_summary in evaluation_summaries:
+            config_filename = evaluation_summary['config_filename']
+            plan = config_snapshot.plans.get(config_filename)
+            if plan is None:
+                logging.warn("Config '%s' was removed since %s was evaluated against it, skipping its reactors" % (config_filename,testssl_result_file.path))
+                continue
+
+            # those w/ no fired triggers only record their stateful triggers' state
+            if len(evaluation_summary['triggers_fired']) == 0:
+                try:
+                    self.applyFireOn(plan,[],subject=evaluation_summary.get('state_subject'))
                 except Exception as e:
-                    logging.exception("Unexpected error processing: " + testssl_json_result_file_path + " using: " + config_filename + " err:" + str(sys.exc_info()[0]))
-                    self.dumpEvalDoc(evaluation_doc)
+                    logging.exception("Unexpected error recording trigger state of: " + testssl_result_file.path + " using: " + config_filename)
+                continue
+
+            scan_result_index = evaluation_summary.get('scan_result_index')
+            objectpath_ctx = RecordedObjectPathContext(evaluation_summary['derived_fields'],
+                                                       scan_result_index if scan_result_index is not None else 0,
+                                                       evaluation_summary['objectpath_results'],
+                                                       functools.partial(self.reloadObjectPathContext,plan,evaluation_summary,reload_result_file))
+
+            triggers_fired = []
+            for t in evaluation_summary['triggers_fired']:
+                trigger_fired = dict(t)
+                trigger_fired['evaluation_doc'] = objectpath_ctx.evaluation_doc
+                triggers_fired.append(trigger_fired)
+
+            count_triggers_fired(config_filename,triggers_fired)
+            try:
+                triggers_to_react = self.applyFireOn(plan,triggers_fired,objectpath_ctx,evaluation_summary.get('state_subject'),pending_reactions)
+                if len(triggers_to_react) > 0:
+                    self.invokeReactors(plan,triggers_to_react,objectpath_ctx,pending_reactions)
+            except Exception as e:
+                logging.exception("Unexpected error processing: " + testssl_result_file.path + " using: " + config_filename + " err:" + str(sys.exc_info()[0]))
+                self.dumpEvalDoc(dict(objectpath_ctx.evaluation_doc))
+
+    # Re-builds the ObjectPathContext of an evaluation summary from the
+    # (re-loaded) result file, see RecordedObjectPathContext
+    def reloadObjectPathContext(self,plan,evaluation_summary,reload_result_file):
+        loaded, finding_index = reload_result_file()
+
+        # reassemble the evaluation_doc from its derived fields
+        evaluation_doc = dict(evaluation_summary['derived_fields'])
+        evaluation_doc[plan.target_keys['testssl_result_json']] = loaded.testssl_result
+        if plan.finding_index_key is not None:
+            evaluation_doc[plan.finding_index_key] = finding_index
+        scan_result_index = evaluation_summary.get('scan_result_index')
+        if scan_result_index is not None:
+            evaluation_doc = self.buildScopeEvaluationDoc(plan,evaluation_doc,loaded.testssl_result,finding_index,scan_result_index)
+        return self.createObjectPathContext(evaluation_doc,finding_index,scan_result_index if scan_result_index is not None else 0)
+
+    # Renders the reactor templates of the fired triggers (discarding the output)
+    # against the objectpath_ctx, returns the results of the ObjectPath queries and
+    # finding lookups they made, see RecordingObjectPathContext
+    def recordReactorQueries(self,plan,objectpath_ctx,triggers_fired):
+        recorder = RecordingObjectPathContext(objectpath_ctx)
+        for reactor_name in set(r for t in triggers_fired for r in t['reactors']):
+            contexts = [objectpath_ctx.evaluation_doc] + [t for t in triggers_fired if reactor_name in t['reactors']]
+            for template_source in plan.reactor_templates.get(reactor_name,[]):
+                for context in contexts:
+                    try:
+                        reactor_templates.render(template_source,context,recorder)
+                    except Exception as e:
+                        logging.debug("Error recording the queries of a template of reactor: " + reactor_name + " of config: " + plan.config_filename + " err:" + str(sys.exc_info()[0]))
+        return recorder.recorded
+
+    # The subject (i.e. fqdn) the plan's stateful triggers' state is kept
+    # for, per its state_subject_objectpath, or None if that matched nothing
+    def triggerStateSubject(self,plan,objectpath_ctx):
+        subject = objectpath_ctx.exec_objectpath_first_match(plan.state_subject_objectpath)
+        if subject is None:
+            return None
+        subject = str(subject)
+        if plan.scan_result_fanout:
+            subject += "[" + str(objectpath_ctx.scan_result_index) + "]"
+        return subject
+
+    # Records the evaluation of the plan's stateful triggers (see FIRE_ON) for
+    # the subject (by default that of the objectpath_ctx) in the trigger_state_store
+    # returns the triggers_fired whose reactors should be invoked. That they were
+    # reacted to is only recorded once their reactors (counted in the pending_reactions)
+    # succeeded, so those that failed are reacted to again on the next evaluation
+    def applyFireOn(self,plan,triggers_fired,objectpath_ctx=None,subject=None,pending_reactions=None):
+        if len(plan.stateful_triggers) == 0 or self.trigger_state_store is None:
+            return triggers_fired
+
+        if subject is None and objectpath_ctx is not None:
+            subject = self.triggerStateSubject(plan,objectpath_ctx)
+        if subject is None:
+            logging.warn("state_subject_objectpath: " + plan.state_subject_objectpath + " matched nothing, ignoring fire_on for: " + plan.config_filename)
+            return triggers_fired
+
+        now = time.time()
+        fired_results = {t['tag']:t['results'] for t in triggers_fired if t['tag'] in plan.stateful_trigger_tags}
+        react = self.trigger_state_store.transition(subject,plan.config_filename,plan.stateful_triggers,fired_results,now)
+
+        if len(react) > 0:
+            reacted_results = {tag:fired_results[tag] for tag in react}
+            def on_reacted():
+                succeeded = {tag:results for tag, results in reacted_results.items()
+                             if pending_reactions is None or (plan.config_filename,tag) not in pending_reactions.failed}
+                if len(succeeded) > 0:
+                    self.trigger_state_store.reacted(subject,plan.config_filename,succeeded,now)
+            if pending_reactions is not None:
+                pending_reactions.on_complete(on_reacted)
+            else:
+                on_reacted()
+
+        triggers_to_react = []
+        for t in triggers_fired:
+            if t['tag'] in fired_results and t['tag'] not in react:
+                logging.debug("Trigger " + t['tag'] + " fired for " + subject + " w/ unchanged results, not invoking its reactors")
+                triggers_suppressed_total.inc((plan.config_filename,t['tag']))
+                continue
+            triggers_to_react.append(t)
+
+        return triggers_to_react
+
+    # Invokes the reactors configured for the fired triggers, if we have
+    # a reactor_dispatcher they are queued to it rather than invoked inline
+    # If given the PendingReactions of the result file, each invocation is counted in it
+    def invokeReactors(self,plan,triggers_fired,objectpath_ctx,pending_reactions=None):
+        with phase_seconds.time(('reactors',)):
+            self._invokeReactors(plan,triggers_fired,objectpath_ctx,pending_reactions)
+
+    def _invokeReactors(self,plan,triggers_fired,objectpath_ctx,pending_reactions=None):
+        if pending_reactions is None:
+            pending_reactions = PendingReactions()
+            try:
+                self._invokeReactors(plan,triggers_fired,objectpath_ctx,pending_reactions)
+            finally:
+                pending_reactions.seal()
+            return
+
+        config = plan.config
+
+        # the plan's own reactors, held until they handled the triggers
+        pending_reactions.lease(plan)
+
+        # build a map of reactors -> triggers
+        reactor_triggers = {}
+        for t in triggers_fired:
 
+            # each trigger can have N reactors
+            for reactor_name in t['reactors']:
+                if reactor_name not in reactor_triggers:
+                    reactor_triggers[reactor_name] = []
+                reactor_triggers[reactor_name].append(t)
+
+
+        # for each reactor to invoke...
+        for reactor_name,triggers in reactor_triggers.items():
+
+            # handle misconfig
+            if reactor_name not in config['reactor_engines']:
+                logging.error("Configured reactor_engine '%s' is not configured?... skipping" % (reactor_name))
+                continue
+
+            on_done = pending_reactions.dispatched(plan,triggers)
+
+            # the reactor instance (created when the config was loaded)
+            # and, if invoked inline, its reaction to the fired triggers. One
+            # reactor failing does not prevent invoking the others (as queued)
+            failed = True
+            try:
+                reactor = reactor_registry.get(plan,reactor_name)
+
+                if self.reactor_dispatcher is not None:
+                    self.reactor_dispatcher.dispatch(plan,reactor_name,reactor,triggers,objectpath_ctx,on_done)
+                    on_done = None
+                    continue
+
+                handle_triggers(plan,reactor_name,reactor,triggers,objectpath_ctx)
+                failed = False
+            except Exception as e:
+                logging.exception("Unexpected error in reactor: " + plan.config_filename + ":" + reactor_name + " err:" + str(sys.exc_info()[0]))
+                self.dumpEvalDoc(objectpath_ctx.evaluation_doc)
+            finally:
+                if on_done is not None:
+                    on_done(failed)
+
+
+
+# The reactors created for one HandlerConfigPlan, see ReactorRegistry
+class PlanReactors():
+
+    def __init__(self, reactors=None, retired=False):
+        # reactor_name -> reactor
+        self.reactors = reactors if reactors is not None else {}
+
+        # evaluations against the plan that may still invoke them
+        self.leases = 0
+
+        # set once the plan's config was reloaded or removed
+        self.retired = retired
+
+
+# Resolves and instantiates each of a config's reactor_engines once, when the
+# config is (re)loaded, rather than per result file; so reactors can hold
+# connection pools, compiled templates etc for their lifetime. Reactors may
+# optionally define start() (called once created) and close() (called when
+# their config is reloaded or removed, or on shutdown). Each reactor is invoked
+# by one dispatch thread unless its config opts into more w/ 'dispatch_threads'
+# (or --reactor-threads is raised) in which case its handleTriggers() must be thread safe
+#
+# Reactors are kept per HandlerConfigPlan (i.e. per config snapshot) so an
+# evaluation against a plan only ever invokes that plan's reactors. Evaluations
+# acquire() the plan's reactors until their dispatched triggers were handled
+# (see PendingReactions) and the reactors of a reloaded/removed config's plan
+# are only closed once the last of those has release()'d them
+class ReactorRegistry():
+
+    # set in --batch worker processes, given to the reactors that declare
+    # a `batch` attribute (i.e. so they skip long lived background work)
+    batch = False
+
+    def __init__(self):
+        # HandlerConfigPlan -> PlanReactors
+        self.plans = {}
+
+        # config_filename -> the last register()'d HandlerConfigPlan
+        self.current = {}
+
+        self.lock = threading.RLock()
+
+    def create_reactor(self, reactor_name, reactor_config):
+        class_name = reactor_config['class_name']
+        try:
+            reactor_class = getattr(importlib.import_module('reactors.' + class_name.lower()), class_name)
         except Exception as e:
-            logging.exception("Unexpected error processing: " + testssl_json_result_file_path + " " + str(sys.exc_info()[0]))
-            self.dumpEvalDoc(evaluation_doc)
+            logging.exception("Error loading reactor class: " + class_name + ". Failed to find 'reactors/"+class_name.lower() +".py' with class '"+class_name+"' declared within it")
+            raise e
 
+        reactor = reactor_class(reactor_config)
+        if self.batch and hasattr(reactor,'batch'):
+            reactor.batch = True
+        if hasattr(reactor,'start'):
+            reactor.start()
+        logging.debug("Created reactor: " + reactor_name + " (" + class_name + ")")
+        return reactor
+
+    def close_reactors(self, config_filename, reactors):
+        for reactor_name, reactor in reactors.items():
+            if hasattr(reactor,'close'):
+                try:
+                    reactor.close()
+                except Exception as e:
+                    logging.exception("Error closing reactor: " + reactor_name + " of config: " + config_filename)
+
+    # Creates the reactors for the plan's config (unless given them) and
+    # retires those of its previous plan. Reactors that fail to be created
+    # are retried on use
+    def register(self, plan, reactors=None):
+        if reactors is None:
+            reactors = {}
+            for reactor_name, reactor_config in plan.config.get('reactor_engines',{}).items():
+                try:
+                    reactors[reactor_name] = self.create_reactor(reactor_name,reactor_config)
+                except Exception as e:
+                    logging.exception("Error creating reactor: " + reactor_name + " of config: " + plan.config_filename)
+
+        with self.lock:
+            previous = self.current.get(plan.config_filename)
+            self.current[plan.config_filename] = plan
+            self.plans[plan] = PlanReactors(reactors)
+
+        # any triggers already dispatched to the previous
+        # reactors are still handled by them before they are closed
+        if previous is not None and previous is not plan:
+            self.retire(previous)
+
+        logging.info("Created %d reactors for result handler config %s" % (len(reactors),plan.config_filename))
+
+    # Retires the reactors of a removed config
+    def invalidate(self, config_filename):
+        with self.lock:
+            previous = self.current.pop(config_filename,None)
+        if previous is not None:
+            self.retire(previous)
+
+    # Retires all reactors (those still acquire()'d are closed once released)
+    def close(self):
+        with self.lock:
+            self.current.clear()
+            plans = list(self.plans.keys())
+        for plan in plans:
+            self.retire(plan)
+
+    # Marks the plan's reactors as retired closing
+    # them right away if no evaluation holds them
+    def retire(self, plan):
+        with self.lock:
+            plan_reactors = self.plans.get(plan)
+            if plan_reactors is None:
+                return
+            plan_reactors.retired = True
+            if plan_reactors.leases > 0:
+                return
+            del self.plans[plan]
+        self.close_reactors(plan.config_filename,plan_reactors.reactors)
+
+    # Leases the plan's reactors for an evaluation against it, if they were
+    # already closed (the plan's config was reloaded meanwhile) it gets its own
+    # which are closed once release()'d
+    def acquire(self, plan):
+        with self.lock:
+            plan_reactors = self.plans.get(plan)
+            if plan_reactors is None:
+                plan_reactors = PlanReactors(retired=self.current.get(plan.config_filename) is not plan)
+                self.plans[plan] = plan_reactors
+            plan_reactors.leases += 1
+
+    def release(self, plan):
+        with self.lock:
+            plan_reactors = self.plans.get(plan)
+            if plan_reactors is None:
+                return
+            plan_reactors.leases -= 1
+            if not plan_reactors.retired or plan_reactors.leases > 0:
+                return
+            del self.plans[plan]
+        self.close_reactors(plan.config_filename,plan_reactors.reactors)
+
+    # Returns the reactor instance for the (acquire()'d) plan's reactor_name
+    # creating it if it was not (successfully) created on register()
+    def get(self, plan, reactor_name):
+        with self.lock:
+            plan_reactors = self.plans.get(plan)
+            if plan_reactors is None:
+                raise ValueError("Reactors of result handler config " + plan.config_filename + " were not acquired")
+
+            reactor = plan_reactors.reactors.get(reactor_name)
+            if reactor is None:
+                reactor = self.create_reactor(reactor_name,plan.config['reactor_engines'][reactor_name])
+                plan_reactors.reactors[reactor_name] = reactor
+
+            return reactor
+
+# the one ReactorRegistry
+reactor_registry = ReactorRegistry()
+
+
+# Per reactor engine dispatch stats, exposed via ReactorDispatcher.metrics()
+class ReactorQueueMetrics():
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.blocked = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.handle_seconds_total = 0.0
+        self.handle_seconds_max = 0.0
+
+    def on_dispatched(self, queue_depth, blocked):
+        with self.lock:
+            self.dispatched += 1
+            if blocked:
+                self.blocked += 1
+            self.max_queue_depth = max(self.max_queue_depth,queue_depth)
+
+    def on_handled(self, wait_seconds, handle_seconds, failed):
+        with self.lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max,wait_seconds)
+            self.handle_seconds_total += handle_seconds
+            self.handle_seconds_max = max(self.handle_seconds_max,handle_seconds)
+
+    def to_dict(self, queue_depth):
+        with self.lock:
+            handled = self.completed + self.failed
+            return {'queue_depth':queue_depth,
+                    'max_queue_depth':self.max_queue_depth,
+                    'dispatched':self.dispatched,
+                    'completed':self.completed,
+                    'failed':self.failed,
+                    'blocked':self.blocked,
+                    'wait_seconds_avg':(self.wait_seconds_total / handled) if handled else 0.0,
+                    'wait_seconds_max':self.wait_seconds_max,
+                    'handle_seconds_avg':(self.handle_seconds_total / handled) if handled else 0.0,
+                    'handle_seconds_max':self.handle_seconds_max}
+
+
+# A bounded queue + worker threads for one reactor engine
+class ReactorQueue():
+
+    def __init__(self, name, queue_size, threads):
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.metrics = ReactorQueueMetrics()
+        self.workers = []
+        for i in range(threads):
+            worker = threading.Thread(target=self.run,name="reactor-" + name + "-" + str(i),daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    # Enqueues the work, blocking the caller (backpressure)
+    # when this reactor engine's queue is full
+    def put(self, work):
+        blocked = False
+        try:
+            self.queue.put_nowait((time.time(),work))
+        except queue.Full:
+            blocked = True
+            logging.warn("Reactor queue '%s' is full (%d), blocking until it drains" % (self.name,self.queue.maxsize))
+            self.queue.put((time.time(),work))
+        self.metrics.on_dispatched(self.queue.qsize(),blocked)
+
+    def run(self):
+        while True:
+            enqueued_at, work = self.queue.get()
+            started_at = time.time()
+            failed = False
+            try:
+                work()
+            except Exception as e:
+                failed = True
+                logging.exception("Unexpected error in reactor: " + self.name + " err:" + str(sys.exc_info()[0]))
+            finally:
+                self.metrics.on_handled(started_at - enqueued_at,time.time() - started_at,failed)
+                self.queue.task_done()
+
+
+# Runs reactors off of the evaluation threads, each reactor engine
+# (per config) gets its own bounded queue and worker threads so the
+# latency of one downstream sink (slack, nfs...) does not hold up
+# evaluation nor the other reactor engines. Reactor engines can override
+# the defaults w/ 'dispatch_queue_size' and 'dispatch_threads' in their config
+# By default each reactor engine gets one thread, so its handleTriggers() calls
+# are serialized, more threads must be opted into as they need it to be thread safe
+class ReactorDispatcher():
+
+    def __init__(self, queue_size=100, threads=1, dump_evaldoc=None):
+        self.queue_size = queue_size
+        self.threads = threads
+        self.dump_evaldoc = dump_evaldoc
+        self.queues = {}
+        self.lock = threading.Lock()
+
+    def get_queue(self, config_filename, reactor_name, reactor_config):
+        name = config_filename + ":" + reactor_name
+        reactor_queue = self.queues.get(name)
+        if reactor_queue is None:
+            with self.lock:
+                reactor_queue = self.queues.get(name)
+                if reactor_queue is None:
+                    reactor_queue = ReactorQueue(name,
+                                                 int(reactor_config.get('dispatch_queue_size',self.queue_size)),
+                                                 int(reactor_config.get('dispatch_threads',self.threads)))
+                    self.queues[name] = reactor_queue
+        return reactor_queue
+
+    # Queues the triggers to the reactor, if given on_done(failed)
+    # is called once the reactor has handled them (or failed to)
+    def dispatch(self, plan, reactor_name, reactor, triggers, objectpath_ctx, on_done=None):
+        reactor_config = plan.config['reactor_engines'][reactor_name]
+
+        def work():
+            failed = True
+            try:
+                handle_triggers(plan,reactor_name,reactor,triggers,objectpath_ctx)
+                failed = False
+            except Exception as e:
+                if self.dump_evaldoc is not None:
+                    self.dump_evaldoc(objectpath_ctx.evaluation_doc)
+                raise e
+            finally:
+                if on_done is not None:
+                    on_done(failed)
+
+        self.get_queue(plan.config_filename,reactor_name,reactor_config).put(work)
+
+    # Blocks until everything queued so far has been reacted to
+    def join(self):
+        for reactor_queue in list(self.queues.values()):
+            reactor_queue.queue.join()
+
+    # {config_filename:reactor_name -> ReactorQueueMetrics.to_dict()}
+    def metrics(self):
+        return {name:q.metrics.to_dict(q.queue.qsize()) for name, q in list(self.queues.items())}
+
+    def log_metrics(self):
+        for name, m in sorted(self.metrics().items()):
+            logging.info("Reactor queue '%s': depth=%d max_depth=%d dispatched=%d completed=%d failed=%d blocked=%d "
+                         "wait_avg=%.3fs wait_max=%.3fs handle_avg=%.3fs handle_max=%.3fs" %
+                         (name,m['queue_depth'],m['max_queue_depth'],m['dispatched'],m['completed'],m['failed'],m['blocked'],
+                          m['wait_seconds_avg'],m['wait_seconds_max'],m['handle_seconds_avg'],m['handle_seconds_max']))
+
+
+# Tracks the reactor invocations for one result file (which may be queued
+# to a ReactorDispatcher), once seal()'d and all of them have been handled
+# (or failed) the on_complete callbacks are called, from whichever thread
+# handled the last one. `failed` holds the (config_filename,tag) of the
+# fired triggers whose reactors (any of) failed. The reactors of the plans
+# lease()'d are held (see ReactorRegistry.acquire()) until then
+class PendingReactions():
+
+    def __init__(self, on_complete=None):
+        self.lock = threading.Lock()
+        self.callbacks = [on_complete] if on_complete is not None else []
+        self.failed = set()
+        self.leased = []
+
+        # released by seal()
+        self.pending = 1
+
+    def on_complete(self, callback):
+        self.callbacks.append(callback)
+
+    # Holds the plan's reactors until complete
+    def lease(self, plan):
+        with self.lock:
+            if any(leased is plan for leased in self.leased):
+                return
+            self.leased.append(plan)
+        reactor_registry.acquire(plan)
+
+    # Counts one more reactor invocation of the plan's triggers
+    # returns the on_done(failed) to call once it was handled
+    def dispatched(self, plan, triggers):
+        with self.lock:
+            self.pending += 1
+
+        def on_done(failed):
+            self.handled(plan,triggers,failed)
+        return on_done
+
+    def handled(self, plan, triggers, failed):
+        if failed:
+            with self.lock:
+                self.failed.update((plan.config_filename,t['tag']) for t in triggers)
+        self.release()
+
+    # No more reactor invocations will be dispatched
+    def seal(self):
+        self.release()
+
+    # As seal() but the on_complete callbacks are not called
+    # (i.e. the result file failed to be processed)
+    def abandon(self):
+        with self.lock:
+            self.callbacks = []
+        self.release()
+
+    def release(self):
+        with self.lock:
+            self.pending -= 1
+            if self.pending > 0:
+                return
+
+        for callback in self.callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.exception("Unexpected error completing reactions: " + str(sys.exc_info()[0]))
+
+        for plan in self.leased:
+            reactor_registry.release(plan)
+
+
+# Optional durable record of the result files that have been processed
+# keyed on path + size + mtime + content sha256, so that restarts and
+# re-emitted events do not re-evaluate (and re-alert on) the same files
+class ProcessedResultLedger():
+
+    def __init__(self, ledger_path):
+        self.ledger_path = ledger_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(ledger_path,check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS processed_results ("
+                                "path TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+                                "sha256 TEXT NOT NULL, processed_at REAL NOT NULL, "
+                                "PRIMARY KEY (path,size,mtime,sha256))")
+        self.connection.commit()
+
+    def contains(self, testssl_result_file):
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM processed_results WHERE path=? AND size=? AND mtime=? AND sha256=?",
+                                          (testssl_result_file.path,testssl_result_file.size,
+                                           testssl_result_file.mtime,testssl_result_file.sha256)).fetchone()
+            return row is not None
+
+    def record(self, testssl_result_file):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO processed_results VALUES (?,?,?,?,?)",
+                                    (testssl_result_file.path,testssl_result_file.size,
+                                     testssl_result_file.mtime,testssl_result_file.sha256,time.time()))
+            self.connection.commit()
+
+
+# Thread safe, O(1), tracking of the result file paths that have been
+# processed. The most recent `max_paths` are kept in memory (LRU) and
+# if a ProcessedResultLedger is given it is consulted for anything else
+class ProcessedResultPaths():
+
+    def __init__(self, max_paths=10000, ledger=None):
+        self.max_paths = max_paths
+        self.ledger = ledger
+        self.lock = threading.Lock()
+        self.paths = collections.OrderedDict()
+
+    def __contains__(self, path):
+        with self.lock:
+            return path in self.paths
+
+    # Atomically claims the path for processing (in memory only), returns
+    # False if it was already processed (or is being processed)
+    def claim_path(self, path):
+        with self.lock:
+            if path in self.paths:
+                self.paths.move_to_end(path)
+                return False
+
+            self.paths[path] = True
+            while len(self.paths) > self.max_paths:
+                self.paths.popitem(last=False)
+
+        return True
+
+    # Releases a claim_path() for a path that turned out
+    # to not be ready for processing after all
+    def release(self, path):
+        with self.lock:
+            self.paths.pop(path,None)
+
+    # Atomically claims the TestsslResultFile for processing, returns
+    # False if it was already processed (or is being processed)
+    def claim(self, testssl_result_file):
+        if not self.claim_path(testssl_result_file.path):
+            return False
+
+        if self.ledger is not None and self.ledger.contains(testssl_result_file):
+            logging.info("Skipping already processed (per ledger) testssl.sh JSON result: %s", testssl_result_file.path)
+            return False
+
+        return True
+
+    # Records the TestsslResultFile as having been processed in the ledger
+    def processed(self, testssl_result_file):
+        if self.ledger is not None:
+            self.ledger.record(testssl_result_file)
+
+
+# Content addressed cache of the date/file independent parts of evaluating
+# a result file against a HandlerConfigPlan, keyed on the plan's evaluation_digest
+# and the scan_result_digest() of the result. Rescans that found the same
+# things reuse the cert expiration date and the results of the triggers that
+# only depend on the scanResult, everything else (cert_expires_in_days, triggers
+# on it or the path derived fields) is still evaluated every time.
+#
+# Values are lists (one per scope, see HandlerConfigPlan.scan_result_fanout) of
+# {'cert_expires_at':str, 'triggers':{tag:[results]}} stored as JSON, so every
+# get() returns a private copy. The most recently used `max_entries` are kept
+# in memory, entries older than `ttl_seconds` are misses and if `persist_path`
+# is given they are also stored in SQLite there to survive restarts and to be
+# shared w/ evaluation worker processes
+class EvaluationCache():
+
+    def __init__(self, max_entries=10000, ttl_seconds=604800, persist_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.lock = threading.Lock()
+
+        # key -> (stored_at, JSON value)
+        self.entries = collections.OrderedDict()
+
+        self.connection = None
+        if persist_path is not None:
+            self.connection = sqlite3.connect(persist_path,check_same_thread=False,timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS evaluation_cache ("
+                                    "key TEXT NOT NULL PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)")
+            self.connection.execute("DELETE FROM evaluation_cache WHERE stored_at < ?",(time.time() - ttl_seconds,))
+            self.connection.commit()
+
+    # Returns a copy of the value stored under key, or None
+    def get(self, key):
+        expired_before = time.time() - self.ttl_seconds
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] >= expired_before:
+                    self.entries.move_to_end(key)
+                else:
+                    del self.entries[key]
+                    entry = None
+
+            if entry is None and self.connection is not None:
+                row = self.connection.execute("SELECT stored_at, value FROM evaluation_cache WHERE key=? AND stored_at >= ?",
+                                              (key,expired_before)).fetchone()
+                if row is not None:
+                    entry = (row[0],row[1])
+                    self._remember(key,entry)
+
+        if entry is None:
+            evaluation_cache_total.inc(('miss',))
+            return None
+
+        evaluation_cache_total.inc(('hit',))
+        return json.loads(entry[1])
+
+    def put(self, key, value):
+        try:
+            entry = (time.time(),json.dumps(value,separators=(',',':')))
+        except (TypeError,ValueError) as e:
+            logging.debug("EvaluationCache: not caching unserializable evaluation for: " + key)
+            return
+
+        with self.lock:
+            self._remember(key,entry)
+            if self.connection is not None:
+                self.connection.execute("INSERT OR REPLACE INTO evaluation_cache VALUES (?,?,?)",(key,entry[0],entry[1]))
+                self.connection.commit()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+# The EvaluationCache(**settings) for the --evaluation-cache-* args
+# or None if disabled (size 0)
+def evaluation_cache_settings(evaluation_cache_size, evaluation_cache_ttl_seconds, evaluation_cache_path):
+    if (isinstance(evaluation_cache_size,str)):
+        evaluation_cache_size = int(evaluation_cache_size)
+    if (isinstance(evaluation_cache_ttl_seconds,str)):
+        evaluation_cache_ttl_seconds = int(evaluation_cache_ttl_seconds)
+    if evaluation_cache_size is None or evaluation_cache_size <= 0:
+        return None
+    return {'max_entries':evaluation_cache_size,
+            'ttl_seconds':evaluation_cache_ttl_seconds,
+            'persist_path':evaluation_cache_path}
+
+
+# Trigger `fire_on` options, when the reactors of a fired trigger are invoked:
+#  - always:        every time it fires (the default)
+#  - change:        only when it fires for a subject (i.e. fqdn) that it did not
+#                   fire for on the last evaluation, or fires w/ different results
+#  - every_n_hours: as `change`, plus every `every_n_hours` while it keeps firing
+# the state of the `change` and `every_n_hours` triggers is kept in a TriggerStateStore
+FIRE_ON = ['always','change','every_n_hours']
+
+# digest of the results of a fired trigger
+def trigger_results_digest(results):
+    return hashlib.sha256(json.dumps(results,sort_keys=True,default=str).encode('utf-8')).hexdigest()
+
+
+# SQLite (WAL) store of the last evaluation of each (subject, config_filename,
+# trigger tag) of the triggers w/ a `fire_on` other than 'always'. Every lookup
+# is by primary key so it stays cheap w/ 100k+ subjects. ':memory:' keeps the
+# state for the life of the process only
+class TriggerStateStore():
+
+    def __init__(self, store_path=':memory:'):
+        self.store_path = store_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(store_path,check_same_thread=False,timeout=30,isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS trigger_state ("
+                                "subject TEXT NOT NULL, config_filename TEXT NOT NULL, tag TEXT NOT NULL, "
+                                "fired INTEGER NOT NULL, results_sha256 TEXT, evaluated_at REAL NOT NULL, reacted_at REAL, "
+                                "PRIMARY KEY (subject,config_filename,tag)) WITHOUT ROWID")
+
+    # Records the latest evaluation of the given (stateful) triggers for the
+    # subject where fired_results is {tag:results} of those that fired. Returns
+    # the set of tags whose reactors should be invoked per their `fire_on`, their
+    # state is left as it was until their reactors succeed, see reacted()
+    def transition(self, subject, config_filename, triggers, fired_results, now=None):
+        if now is None:
+            now = time.time()
+
+        react = set()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for trigger in triggers:
+                    tag = trigger['tag']
+                    row = self.connection.execute("SELECT fired, results_sha256, reacted_at FROM trigger_state "
+                                                  "WHERE subject=? AND config_filename=? AND tag=?",
+                                                  (subject,config_filename,tag)).fetchone()
+                    fired = 1 if tag in fired_results else 0
+                    reacted_at = row[2] if row is not None else None
+
+                    results_sha256 = None
+                    if tag in fired_results:
+                        results_sha256 = trigger_results_digest(fired_results[tag])
+                        changed = row is None or not row[0] or row[1] != results_sha256
+                        due = (trigger['fire_on'] == 'every_n_hours' and
+                               (reacted_at is None or (now - reacted_at) >= trigger['every_n_hours'] * 3600))
+                        if changed or due:
+                            react.add(tag)
+                            fired, results_sha256 = (row[0],row[1]) if row is not None else (0,None)
+
+                    self.connection.execute("INSERT OR REPLACE INTO trigger_state VALUES (?,?,?,?,?,?,?)",
+                                            (subject,config_filename,tag,fired,results_sha256,now,reacted_at))
+                self.connection.execute("COMMIT")
+            except Exception as e:
+                self.connection.execute("ROLLBACK")
+                raise e
+
+        return react
+
+    # Records that the reactors of the triggers in reacted_results ({tag:results}
+    # as given to the transition() at `now` that returned them) succeeded. Unless
+    # the subject was evaluated again since, they are now unchanged per `fire_on`
+    def reacted(self, subject, config_filename, reacted_results, now):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for tag, results in reacted_results.items():
+                    self.connection.execute("UPDATE trigger_state SET fired=1, results_sha256=?, reacted_at=? "
+                                            "WHERE subject=? AND config_filename=? AND tag=? AND evaluated_at<=?",
+                                            (trigger_results_digest(results),now,subject,config_filename,tag,now))
+                self.connection.execute("COMMIT")
+            except Exception as e:
+                self.connection.execute("ROLLBACK")
+                raise e
+
+
+# State of a process pool evaluation worker process
+# see evaluate_result_file_in_worker()
+evaluation_worker_configs_version = None
+evaluation_worker_processor = None
+evaluation_worker_ledger = None
+
+# The logging.basicConfig() kwargs of the main process, passed
+# along to the (not forked) evaluation worker processes
+worker_logging_settings = None
+
+# The context evaluation worker processes are started w/: via a forkserver (or spawned)
+# never forked from the (by then multi threaded) main process, where a lock held by
+# another thread (i.e. logging's) at the time of the fork would deadlock the worker
+def evaluation_worker_mp_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+# Runs in a process pool evaluation worker process: loads & evaluates
+# the result file against the configs (recompiling them only if they
+# changed since the last call) but does NOT invoke any reactors. The
+# configs are only sent (not None) once the worker returned the status
+# 'configs', i.e. it has yet to compile that configs_version. Returns
+# (status, TestsslResultFile w/out its testssl_result, [evaluation summaries])
+# where each evaluation summary is a dict of 'config_filename', the
+# 'derived_fields' of its evaluation_doc, the 'triggers_fired' (w/out evaluation_doc),
+# the 'objectpath_results' their reactors' templates need (see recordReactorQueries())
+# and the 'state_subject' of its stateful triggers (see applyFireOn())
+def evaluate_result_file_in_worker(testssl_json_result_file_path, input_dir, configs_version, configs, processor_settings, processed_ledger, evaluation_cache_settings=None, logging_settings=None):
+    global evaluation_worker_configs_version, evaluation_worker_processor, evaluation_worker_ledger
+
+    if evaluation_worker_processor is None and logging_settings is not None:
+        logging.basicConfig(filemode='a',**logging_settings)
+        logging.Formatter.converter = time.gmtime
+
+    if evaluation_worker_configs_version != configs_version:
+        if configs is None:
+            return ('configs',None,[])
+        start = time.time()
+        replace_config_snapshot(configs_version,{config_filename:HandlerConfigPlan(config_filename,config) for config_filename, config in configs.items()})
+        evaluation_worker_configs_version = configs_version
+        logging.info("Evaluation worker %d compiled configs version %d in %.3fs" % (os.getpid(),configs_version,time.time() - start))
+    config_snapshot = current_config_snapshot()
+
+    if evaluation_worker_processor is None:
+        evaluation_worker_processor = TestsslResultProcessor()
+    for setting, value in processor_settings.items():
+        setattr(evaluation_worker_processor,setting,value)
+    if evaluation_cache_settings is not None and evaluation_worker_processor.evaluation_cache is None:
+        evaluation_worker_processor.evaluation_cache = EvaluationCache(**evaluation_cache_settings)
+
+    if processed_ledger is not None and evaluation_worker_ledger is None:
+        evaluation_worker_ledger = ProcessedResultLedger(processed_ledger)
+
+    try:
+        testssl_result_file = load_testssl_result_file(testssl_json_result_file_path,evaluation_worker_processor.json_loader,config_snapshot)
+        if testssl_result_file is None:
+            return ('changed',None,[])
+    except json.decoder.JSONDecodeError as e:
+        return ('incomplete',None,[])
+
+    metadata = testssl_result_file._replace(testssl_result=None)
+
+    if evaluation_worker_ledger is not None and evaluation_worker_ledger.contains(testssl_result_file):
+        return ('skipped',metadata,[])
+
+    testssl_result_file = evaluation_worker_processor.loadResultFile(testssl_result_file,config_snapshot)
+    if testssl_result_file is None:
+        return ('processed',metadata,[])
+
+    evaluation_summaries = []
+    for plan, objectpath_ctx, triggers_fired in evaluation_worker_processor.evaluateResultFile(testssl_result_file,input_dir,config_snapshot):
+        # (the stateful triggers' state is recorded even if none fired)
+        if len(triggers_fired) == 0 and len(plan.stateful_triggers) == 0:
+            logging.info("No triggers fired for: " + testssl_json_result_file_path)
+            continue
+
+        # (unless the reactor templates reference them directly)
+        large_keys = (plan.target_keys['testssl_result_json'],plan.finding_index_key)
+        if plan.scan_result_fanout:
+            large_keys += (plan.scope_keys['scan_result'],plan.scope_keys['scan_result_index'],plan.scope_keys['scan_result_findings'])
+        evaluation_summaries.append({
+            'config_filename':plan.config_filename,
+            'scan_result_index':objectpath_ctx.scan_result_index if plan.scan_result_fanout else None,
+            'derived_fields':{k:v for k,v in objectpath_ctx.evaluation_doc.items() if k not in large_keys or k in plan.reactor_template_variables},
+            'objectpath_results':evaluation_worker_processor.recordReactorQueries(plan,objectpath_ctx,triggers_fired) if len(triggers_fired) > 0 else {},
+            'state_subject':evaluation_worker_processor.triggerStateSubject(plan,objectpath_ctx) if len(plan.stateful_triggers) > 0 else None,
+            'triggers_fired':[{k:v for k,v in t.items() if k != 'evaluation_doc'} for t in triggers_fired]
+        })
+
+    return ('processed',metadata,evaluation_summaries)
+
+
+# Evaluates result files in a pool of worker processes (escaping the GIL)
+# each of which keeps its compiled configs resident. Only the fired trigger
+# summaries come back, reactors are invoked here in the parent process
+class ProcessEvaluationEngine():
+
+    def __init__(self, processes, testssl_result_processor, processed_ledger=None, evaluation_cache_settings=None):
+        self.processes = processes
+        self.testssl_result_processor = testssl_result_processor
+        self.processed_ledger = processed_ledger
+        self.evaluation_cache_settings = evaluation_cache_settings
+        try:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes,mp_context=evaluation_worker_mp_context())
+        except TypeError:
+            # python < 3.7 takes no mp_context, all the workers are
+            # forked on the first submit so do that now, before our threads start
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+            self.executor.submit(os.getpid).result()
+
+        # (ConfigSnapshot, {config_filename:raw config}) last sent to the workers
+        self.configs = (None,{})
+        self.configs_lock = threading.Lock()
+
+    def current_configs(self):
+        config_snapshot = current_config_snapshot()
+        with self.configs_lock:
+            if self.configs[0] is not config_snapshot:
+                self.configs = (config_snapshot,
+                                {config_filename:plan.config for config_filename, plan in config_snapshot.plans.items()})
+            return self.configs
+
+    # Evaluates the result file in a worker (blocking the calling thread until
+    # it is done), see evaluate_result_file_in_worker(). The configs are only
+    # sent to the workers that have yet to compile the current config snapshot.
+    # Returns its (status, TestsslResultFile, [evaluation summaries], ConfigSnapshot)
+    def evaluate(self, testssl_json_result_file_path, input_dir):
+        config_snapshot, configs = self.current_configs()
+        processor_settings = {'debug_objectpath_expr':self.testssl_result_processor.debug_objectpath_expr,
+                              'dump_evaldoc_on_error':self.testssl_result_processor.dump_evaldoc_on_error,
+                              'debug_dump_evaldoc':self.testssl_result_processor.debug_dump_evaldoc,
+                              'objectpath_engine':self.testssl_result_processor.objectpath_engine,
+                              'json_loader':self.testssl_result_processor.json_loader}
+
+        status, testssl_result_file, evaluation_summaries = self.submit(testssl_json_result_file_path,input_dir,config_snapshot.version,None,processor_settings)
+        if status == 'configs':
+            status, testssl_result_file, evaluation_summaries = self.submit(testssl_json_result_file_path,input_dir,config_snapshot.version,configs,processor_settings)
+        return (status,testssl_result_file,evaluation_summaries,config_snapshot)
+
+    def submit(self, testssl_json_result_file_path, input_dir, configs_version, configs, processor_settings):
+        future = self.executor.submit(evaluate_result_file_in_worker,
+                                      testssl_json_result_file_path,input_dir,
+                                      configs_version,configs,processor_settings,
+                                      self.processed_ledger,self.evaluation_cache_settings,
+                                      worker_logging_settings)
+        return future.result()
+
+
+# Debounces file events w/out blocking the caller (i.e. the watchdog
+# observer thread). Each schedule()'d path gets a deadline `settle_seconds`
+# out, repeated events for the same path just push its deadline out again
+# (collapsing into one entry) and once a path has been quiescent until its
+# deadline it is handed to `on_settled(path)` from the scheduler's own thread
+class SettleScheduler():
+
+    def __init__(self, settle_seconds, on_settled):
+        self.settle_seconds = settle_seconds
+        self.on_settled = on_settled
+
+        # heap of (deadline, path), entries whose deadline no
+        # longer matches pending[path] are stale and skipped
+        self.heap = []
+
+        # path -> current deadline
+        self.pending = {}
+
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run,name="SettleScheduler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, path):
+        deadline = time.monotonic() + self.settle_seconds
+        with self.condition:
+            self.pending[path] = deadline
+            heapq.heappush(self.heap,(deadline,path))
+            self.condition.notify()
+
+    def pending_count(self):
+        with self.condition:
+            return len(self.pending)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                settled = []
+                while len(settled) == 0:
+                    if len(self.heap) == 0:
+                        self.condition.wait()
+                        continue
+
+                    deadline, path = self.heap[0]
+                    now = time.monotonic()
+                    if deadline > now:
+                        self.condition.wait(deadline - now)
+                        continue
+
+                    # pop everything that is due
+                    while len(self.heap) > 0 and self.heap[0][0] <= now:
+                        deadline, path = heapq.heappop(self.heap)
+                        if self.pending.get(path) == deadline:
+                            del self.pending[path]
+                            settled.append(path)
+
+            for path in settled:
+                try:
+                    self.on_settled(path)
+                except Exception as e:
+                    logging.exception("SettleScheduler: unexpected error handing off settled path: " + path)
 
 
 class TestsslResultFileMonitor(FileSystemEventHandler):
@@ -401,18 +2530,31 @@ class TestsslResultFileMonitor(FileSystemEventHandler):
     # input_dir_sleep_seconds
     input_dir_sleep_seconds = 0
 
+    # debounces events until files are quiescent for input_dir_sleep_seconds
+    settle_scheduler = None
+
+    # if set, a ProcessEvaluationEngine to evaluate result files w/
+    # otherwise they are evaluated on our thread pool
+    process_evaluation_engine = None
+
     # the actual input_dir that we are monitoring
     input_dir = None
 
     # Regex Filter to match relevent paths in events received
     input_filename_filter = 'testssloutput.+.json'
 
+    # set once close()'d
+    closed = False
+
+    def __init__(self):
+        super(TestsslResultFileMonitor, self).__init__()
+
+        # to keep track of event.src_paths we have processed
+        self.processed_result_paths = ProcessedResultPaths()
+
     def set_threads(self, t):
         self.threads = t
 
-    # to keep track of event.src_paths we have processed
-    processed_result_paths = collections.deque(maxlen=400)
-
     # route to on_modified
     def on_created(self,event):
         super(TestsslResultFileMonitor, self).on_created(event)
@@ -422,58 +2564,129 @@ class TestsslResultFileMonitor(FileSystemEventHandler):
     def on_modified(self, event):
         super(TestsslResultFileMonitor, self).on_modified(event)
 
+        # the input_dir mostly holds other files, reject
+        # their events before doing anything else
+        if event.is_directory:
+            return
+        if self.input_filename_filter is not None and not compile_input_filename_filter(self.input_filename_filter).match(event.src_path):
+            return
+
         if not self.executor:
             self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.threads)
 
-        if event.is_directory:
-            return
+        if not self.settle_scheduler:
+            self.settle_scheduler = SettleScheduler(self.input_dir_sleep_seconds,self.on_settled)
 
         # Check if already processed
         if event.src_path in self.processed_result_paths:
             return
 
-        # compile our filter
-        input_filename_re_filter = None
-        if self.input_filename_filter is not None:
-            input_filename_re_filter = re.compile(self.input_filename_filter,re.I)
+        # give write time to close.... w/out blocking the
+        # observer thread, repeat events for the path collapse
+        self.settle_scheduler.schedule(event.src_path)
 
-        if input_filename_re_filter.match(event.src_path):
+    # invoked by the SettleScheduler once a path has had no
+    # events for input_dir_sleep_seconds, hands it to the pool
+    def on_settled(self, src_path):
+        if self.closed:
+            return
+        self.executor.submit(self.process_settled_path,src_path)
 
-            # give write time to close....
-            time.sleep(self.input_dir_sleep_seconds)
+    # Stops handing off settled paths and waits for those in
+    # flight to be evaluated (and their reactors dispatched)
+    def close(self):
+        self.closed = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
 
-            # file needs data...
-            if (os.stat(event.src_path).st_size == 0):
-                return
+    def process_settled_path(self, src_path):
 
-            # Attempt to decode the JSON file
-            # if OK then we know its done writing
-            try:
-                with open(event.src_path, 'r') as f:
-                    testssl_result = json.load(f)
-                    if testssl_result is None:
-                        return
-
-            except json.decoder.JSONDecodeError as e:
-                # we just ignore these, it means the file
-                # is not done being written
+        # Cheap probe to see if the file looks done
+        # being written before we bother decoding it
+        try:
+            if not testssl_result_file_looks_complete(src_path):
                 return
+        except Exception as e:
+            logging.exception("Unexpected error in open(): "+src_path + " error:" +str(sys.exc_info()[0]))
+            return
 
-            except Exception as e:
-                logging.exception("Unexpected error in open(): "+event.src_path + " error:" +str(sys.exc_info()[0]))
-                return
+        if self.process_evaluation_engine is not None:
+            self.process_settled_path_in_worker(src_path)
+            return
+
+        # loaded and evaluated against the same configs
+        config_snapshot = current_config_snapshot()
 
-            # Check if already processed
-            if event.src_path in self.processed_result_paths:
+        # Decode the JSON file exactly once, if OK then we know
+        # its done writing and we hand the parsed result off
+        try:
+            testssl_result_file = load_testssl_result_file(src_path,self.testssl_result_processor.json_loader,config_snapshot)
+            if testssl_result_file is None or testssl_result_file.testssl_result is None:
+                result_files_total.inc(('changed',))
                 return
 
-            logging.info("Responding to parsable testssl.sh JSON result: %s", event.src_path)
+        except json.decoder.JSONDecodeError as e:
+            # we just ignore these, it means the file
+            # is not done being written
+            result_files_total.inc(('incomplete',))
+            return
+
+        except Exception as e:
+            result_files_total.inc(('error',))
+            logging.exception("Unexpected error in open(): "+src_path + " error:" +str(sys.exc_info()[0]))
+            return
+
+        # Check if already processed, if not claim it
+        if not self.processed_result_paths.claim(testssl_result_file):
+            result_files_total.inc(('skipped',))
+            return
+
+        logging.info("Responding to parsable testssl.sh JSON result: %s", src_path)
+
+        # evaluate (we are already running on the pool) and durably mark
+        # it as processed once its reactors are done w/ it
+        self.testssl_result_processor.processResultFile(testssl_result_file,self.input_dir,config_snapshot,
+                                                        functools.partial(self.processed_result_paths.processed,testssl_result_file))
+        result_files_total.inc(('processed',))
+        last_result_processed.set(time.time())
 
-            # mark it as processed
-            self.processed_result_paths.append(event.src_path)
+    # Has the process_evaluation_engine load and evaluate the
+    # result file, we only invoke the reactors for any fired triggers
+    def process_settled_path_in_worker(self, src_path):
 
-            # submit for evaluation
-            self.executor.submit(self.testssl_result_processor.processResultFile,event.src_path,self.input_dir)
+        # Check if already processed, if not claim it
+        if not self.processed_result_paths.claim_path(src_path):
+            return
+
+        try:
+            with phase_seconds.time(('worker_evaluate',)):
+                status, testssl_result_file, evaluation_summaries, config_snapshot = self.process_evaluation_engine.evaluate(src_path,self.input_dir)
+        except Exception as e:
+            result_files_total.inc(('error',))
+            logging.exception("Unexpected error evaluating in worker: "+src_path + " error:" +str(sys.exc_info()[0]))
+            self.processed_result_paths.release(src_path)
+            return
+
+        result_files_total.inc((status,))
+
+        # not done being written, we will get another event
+        if status in ('incomplete','changed'):
+            self.processed_result_paths.release(src_path)
+            return
+
+        if status == 'skipped':
+            logging.info("Skipping already processed (per ledger) testssl.sh JSON result: %s", src_path)
+            return
+
+        logging.info("Evaluated parsable testssl.sh JSON result: %s in worker, %d configs fired triggers" % (src_path,len(evaluation_summaries)))
+
+        # and durably mark it as processed once its reactors are done w/ it
+        on_reacted = functools.partial(self.processed_result_paths.processed,testssl_result_file)
+        if len(evaluation_summaries) > 0:
+            self.testssl_result_processor.invokeReactorsForSummaries(testssl_result_file,evaluation_summaries,on_reacted,config_snapshot)
+        else:
+            on_reacted()
+        last_result_processed.set(time.time())
 
 
 
@@ -482,8 +2695,12 @@ class HandlerConfigFileMonitor(FileSystemEventHandler):
     # our Pool
     executor = None
 
-    # Filter to match relevent paths in events received
-    filename_filter = '.json'
+    # Extensions of the config files in events received
+    # (i.e. not the temp files editors write and rename over them)
+    config_extensions = ('.yaml','.yml')
+
+    def is_config_path(self, path):
+        return os.path.splitext(path)[1].lower() in self.config_extensions
 
     def on_created(self, event):
         super(HandlerConfigFileMonitor, self).on_created(event)
@@ -494,25 +2711,415 @@ class HandlerConfigFileMonitor(FileSystemEventHandler):
         if event.is_directory:
             return
 
-        if '.yaml' in event.src_path:
+        if self.is_config_path(event.src_path):
+            self.load_config(event.src_path)
 
-            logging.info("Responding to creation of result handler config file: %s", event.src_path)
+    def load_config(self, config_path):
+        logging.info("Responding to creation of result handler config file: %s", config_path)
 
-            # attempt to open the config
-            # and parse the yaml
+        reload_start = time.time()
+
+        # attempt to open the config
+        # and parse the yaml
+        try:
+            config = None
+            with open(config_path, 'r') as stream:
+                try:
+                    config = yaml.safe_load(stream)
+                except yaml.YAMLError as exc:
+                    logging.exception(config_path + ": Unexpected error in yaml.safe_load("+config_path+") " + str(sys.exc_info()[0]))
+        except Exception as e:
+            logging.exception(config_path + ": Unexpected error:" + str(sys.exc_info()[0]))
+            return
+
+        yaml_seconds = time.time() - reload_start
+
+        # our config name is the filename
+        config_filename = os.path.basename(config_path)
+
+        # editors/copies emit several events per save, nothing to do if unchanged
+        existing_plan = current_config_snapshot().plans.get(config_filename)
+        if existing_plan is not None and existing_plan.config == config:
+            logging.debug("Result handler config %s is unchanged, not reloading" % config_filename)
+            return
+
+        # compile it into a plan once, here, rather than per result file
+        # (evaluations in progress keep using the snapshot they started with)
+        try:
+            plan = HandlerConfigPlan(config_filename,config)
+            logging.debug("Compiled result handler config %s in %.3fs (%s)" % (config_filename,plan.compile_seconds,plan_timings))
+        except Exception as e:
+            logging.exception(config_path + ": Unexpected error compiling result handler config: " + str(sys.exc_info()[0]))
+            return
+
+        # create its reactors before the new plan is visible to evaluations
+        # retiring the previous ones (closed once the evaluations against
+        # the previous plan are done w/ them)
+        reactors_start = time.time()
+        reactor_registry.register(plan)
+        reactors_seconds = time.time() - reactors_start
+
+        config_snapshot = update_config_snapshot(config_filename,plan)
+        logging.info("Loaded result handler config %s into config snapshot v%d (%d configs) in %.3fs: yaml %.3fs, compile %.3fs, reactors %.3fs" % \
+            (config_filename,config_snapshot.version,len(config_snapshot.plans),time.time() - reload_start,yaml_seconds,plan.compile_seconds,reactors_seconds))
+        logging.info("Config snapshot v%d: %d triggers take %d distinct evaluations per result file" % ((config_snapshot.version,) + trigger_evaluation_plan(config_snapshot)))
+
+    # an edited config is simply reloaded
+    def on_modified(self, event):
+        if event.is_directory or not self.is_config_path(event.src_path):
+            return
+        self.on_created(event)
+
+    # editors, sed -i and k8s ConfigMap updates write a temp
+    # file and rename it over the config (or rename a config away)
+    def on_moved(self, event):
+        super(HandlerConfigFileMonitor, self).on_moved(event)
+
+        if event.is_directory:
+            return
+
+        if self.is_config_path(event.src_path) and os.path.basename(event.src_path) != os.path.basename(event.dest_path):
+            self.remove_config(event.src_path)
+
+        if self.is_config_path(event.dest_path):
+            self.load_config(event.dest_path)
+
+    def on_deleted(self, event):
+        super(HandlerConfigFileMonitor, self).on_deleted(event)
+
+        if event.is_directory or not self.is_config_path(event.src_path):
+            return
+
+        self.remove_config(event.src_path)
+
+    def remove_config(self, config_path):
+        config_filename = os.path.basename(config_path)
+        config_snapshot = update_config_snapshot(config_filename,None)
+        if config_snapshot is not None:
+            logging.info("Removed result handler config %s, config snapshot now v%d (%d configs)" % (config_filename,config_snapshot.version,len(config_snapshot.plans)))
+
+        reactor_registry.invalidate(config_filename)
+
+
+# The compiled --input-filename-filter, compiled once per filter
+@functools.lru_cache(maxsize=16)
+def compile_input_filename_filter(input_filename_filter):
+    return re.compile(input_filename_filter,re.I)
+
+
+# How --input-dir is watched, see init_watching()
+INPUT_DIR_WATCHERS = ['watchdog','polling']
+
+
+# An alternative to the watchdog Observer (i.e. where inotify does not
+# scale or is unavailable, like NFS) that polls input_dir every poll_seconds
+# and dispatches FileCreated/FileModifiedEvents for the matching files to the
+# event_handler. Rather than stat'ing the whole tree each poll it keeps an
+# index of every directory's mtime, its subdirectories and its matching files:
+# a directory is only re-listed when its mtime changed (entries were added,
+# removed or renamed), otherwise only its matching files are re-stat'ed (as
+# they may still be being written), so directories known to hold no matches
+# cost a single stat per poll. Has the Observer's start/stop/join/is_alive
+class PollingResultFileScanner(threading.Thread):
+
+    # directories modified this recently are re-listed on the next poll
+    # too, as further changes w/in their mtime's granularity go unnoticed
+    racy_mtime_seconds = 2
+
+    def __init__(self, event_handler, input_dir, input_filename_re_filter, poll_seconds=10, dispatch_existing=False):
+        super(PollingResultFileScanner, self).__init__(name="PollingResultFileScanner")
+        self.daemon = True
+        self.event_handler = event_handler
+        self.input_dir = input_dir
+        self.input_filename_re_filter = input_filename_re_filter
+        self.poll_seconds = poll_seconds
+        self.dispatch_existing = dispatch_existing
+
+        # dir path -> (mtime_ns or None, [subdir paths], {matching file path -> (mtime_ns, size)})
+        self.index = {}
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        # like the Observer, files already there are only
+        # indexed, not dispatched, unless dispatch_existing
+        self.poll(self.dispatch_existing)
+        while not self.stopped.wait(self.poll_seconds):
             try:
-                config = None
-                with open(event.src_path, 'r') as stream:
-                    try:
-                        config = yaml.load(stream)
-                    except yaml.YAMLError as exc:
-                        logging.exception(event.src_path + ": Unexpected error in yaml.load("+event.src_path+") " + str(sys.exc_info()[0]))
+                self.poll()
             except Exception as e:
-                logging.exception(event.src_path + ": Unexpected error:" + str(sys.exc_info()[0]))
+                logging.exception("PollingResultFileScanner: unexpected error polling: " + self.input_dir)
+
+    # Walks the index, re-listing changed directories, returns the number of events dispatched
+    def poll(self, dispatch=True):
+        start = time.time()
+        dirs_polled = 0
+        dirs_listed = 0
+        events = []
+
+        seen = set()
+        dirs_to_poll = [self.input_dir]
+        while len(dirs_to_poll) > 0:
+            dir_path = dirs_to_poll.pop()
+            seen.add(dir_path)
+            dirs_polled += 1
+            try:
+                dir_mtime = os.stat(dir_path).st_mtime_ns
+            except OSError as e:
+                continue
+
+            indexed = self.index.get(dir_path)
+            if indexed is None or indexed[0] != dir_mtime:
+                indexed = self.list_dir(dir_path,dir_mtime,indexed,events,start)
+                dirs_listed += 1
+            else:
+                self.stat_files(indexed[2],events)
+            dirs_to_poll.extend(indexed[1])
+
+        # forget removed directories
+        for dir_path in [d for d in self.index if d not in seen]:
+            del self.index[dir_path]
+
+        if dispatch:
+            for event in events:
+                self.event_handler.dispatch(event)
+
+        logging.debug("PollingResultFileScanner: polled %d dirs (%d listed) under %s in %.3fs, %d events" %
+                      (dirs_polled,dirs_listed,self.input_dir,time.time() - start,len(events) if dispatch else 0))
+        return len(events) if dispatch else 0
+
+    # (Re)lists a new or changed directory into the index
+    def list_dir(self, dir_path, dir_mtime, indexed, events, now):
+        previous_files = indexed[2] if indexed is not None else {}
+        subdirs = []
+        files = {}
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif self.input_filename_re_filter.match(entry.path) and entry.is_file():
+                        try:
+                            stat = entry.stat()
+                        except OSError as e:
+                            continue
+                        files[entry.path] = (stat.st_mtime_ns,stat.st_size)
+                        previous = previous_files.get(entry.path)
+                        if previous is None:
+                            events.append(FileCreatedEvent(entry.path))
+                        elif previous != files[entry.path]:
+                            events.append(FileModifiedEvent(entry.path))
+        except OSError as e:
+            logging.exception("PollingResultFileScanner: unexpected error listing: " + dir_path)
+
+        if now - (dir_mtime / 1e9) < self.racy_mtime_seconds:
+            dir_mtime = None
+        self.index[dir_path] = (dir_mtime,subdirs,files)
+        return self.index[dir_path]
+
+    # Re-stats the matching files of an unchanged directory
+    def stat_files(self, files, events):
+        for path, previous in list(files.items()):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                del files[path]
+                continue
+            if (stat.st_mtime_ns,stat.st_size) != previous:
+                files[path] = (stat.st_mtime_ns,stat.st_size)
+                events.append(FileModifiedEvent(path))
+
+
+# Recursively walks input_dir (via os.scandir) yielding the
+# paths of all files matching the compiled input_filename_re_filter
+def find_result_files(input_dir, input_filename_re_filter):
+    dirs_to_scan = [input_dir]
+    while len(dirs_to_scan) > 0:
+        dir_path = dirs_to_scan.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs_to_scan.append(entry.path)
+                    elif input_filename_re_filter.match(entry.path) and entry.is_file():
+                        yield entry.path
+        except OSError as e:
+            logging.exception("Unexpected error scanning: " + dir_path)
+
+
+# load any pre existing configs in config_dir
+# through the given HandlerConfigFileMonitor
+def load_existing_configs(config_dir, result_handler_config_monitor):
+    for f in os.listdir(config_dir):
+        result_handler_config_monitor.on_created(FileCreatedEvent(config_dir + "/" + os.path.basename(f)))
+
+
+# The TestsslResultProcessor and optional ledger of
+# a batch worker process, see init_batch_worker()
+batch_worker_processor = None
+batch_worker_ledger = None
+
+# Initializer of each batch worker process, the configs
+# are loaded and compiled once per worker process. Its reactors
+# are closed (flushing i.e. coalesced slack alerts) as it exits
+def init_batch_worker(config_dir, debug_objectpath_expr, dump_evaldoc_on_error, debug_dump_evaldoc, objectpath_engine, processed_ledger, json_loader='full', evaluation_cache_settings=None, trigger_state_db=None):
+    global batch_worker_processor, batch_worker_ledger
+
+    reactor_registry.batch = True
+    load_existing_configs(config_dir,HandlerConfigFileMonitor())
+    multiprocessing.util.Finalize(None,reactor_registry.close,exitpriority=10)
+
+    batch_worker_processor = TestsslResultProcessor()
+    batch_worker_processor.debug_objectpath_expr = debug_objectpath_expr
+    batch_worker_processor.dump_evaldoc_on_error = dump_evaldoc_on_error
+    batch_worker_processor.debug_dump_evaldoc = debug_dump_evaldoc
+    batch_worker_processor.objectpath_engine = objectpath_engine
+    batch_worker_processor.json_loader = json_loader
+    if evaluation_cache_settings is not None:
+        batch_worker_processor.evaluation_cache = EvaluationCache(**evaluation_cache_settings)
+    if trigger_state_db is not None:
+        batch_worker_processor.trigger_state_store = TriggerStateStore(trigger_state_db)
+
+    if processed_ledger is not None:
+        batch_worker_ledger = ProcessedResultLedger(processed_ledger)
+
+# Processes one result file in a batch worker process
+# returns (path, status, triggers_fired_summary), a file whose
+# evaluation or reactors failed (for any config) is 'errored' and
+# not recorded in the ledger, so the next batch retries it
+def batch_process_result_file(testssl_json_result_file_path, input_dir):
+    try:
+        config_snapshot = current_config_snapshot()
+        if len(config_snapshot.plans) == 0:
+            logging.error("No result handler configs loaded, not processing: " + testssl_json_result_file_path)
+            return (testssl_json_result_file_path,'failed',{})
+
+        testssl_result_file = load_testssl_result_file(testssl_json_result_file_path,batch_worker_processor.json_loader,config_snapshot)
+        if testssl_result_file is None:
+            return (testssl_json_result_file_path,'changed',{})
+
+        if batch_worker_ledger is not None and batch_worker_ledger.contains(testssl_result_file):
+            return (testssl_json_result_file_path,'skipped',{})
+
+        errors = []
+        triggers_fired_summary = batch_worker_processor.processResultFile(testssl_result_file,input_dir,config_snapshot,errors=errors)
+        if triggers_fired_summary is None:
+            triggers_fired_summary = {}
+
+        if len(errors) > 0:
+            logging.error("Batch processing %s had %d errors: %s" % (testssl_json_result_file_path,len(errors),"; ".join(errors)))
+            return (testssl_json_result_file_path,'errored',triggers_fired_summary)
+
+        if batch_worker_ledger is not None:
+            batch_worker_ledger.record(testssl_result_file)
+
+        return (testssl_json_result_file_path,'processed',triggers_fired_summary)
+
+    except Exception as e:
+        logging.exception("Unexpected error batch processing: " + testssl_json_result_file_path)
+        return (testssl_json_result_file_path,'failed',{})
+
+
+# Processes all result files already in input_dir (matching the
+# input_filename_filter) across a pool of `processes` worker processes
+# and logs a summary, returns the number of files that failed or errored
+def run_batch(input_dir,
+              config_dir,
+              processes,
+              debug_objectpath_expr,
+              input_filename_filter,
+              dump_evaldoc_on_error,
+              debug_dump_evaldoc,
+              objectpath_engine='objectpath',
+              processed_ledger=None,
+              json_loader='full',
+              evaluation_cache_size=0,
+              evaluation_cache_ttl_seconds=604800,
+              evaluation_cache_path=None,
+              trigger_state_db=None):
+
+    if (isinstance(processes,str)):
+        processes = int(processes)
+
+    cache_settings = evaluation_cache_settings(evaluation_cache_size,evaluation_cache_ttl_seconds,evaluation_cache_path)
+
+    input_filename_re_filter = re.compile(input_filename_filter,re.I)
+
+    start = time.time()
+    result_file_paths = list(find_result_files(input_dir,input_filename_re_filter))
+    logging.info("Batch processing %d testssl.sh result JSON files found in %s w/ %d processes..." % (len(result_file_paths),input_dir,processes))
+
+    # make sure we have a ledger schema before the workers start
+    if processed_ledger is not None:
+        ProcessedResultLedger(processed_ledger)
+    if cache_settings is not None and evaluation_cache_path is not None:
+        EvaluationCache(**cache_settings)
+    if trigger_state_db is not None:
+        TriggerStateStore(trigger_state_db)
+    else:
+        logging.info("Batch mode w/out --trigger-state-db: the triggers' fire_on is ignored, reactors are invoked for every fired trigger")
+
+    statuses = collections.Counter()
+    triggers_fired = collections.Counter()
+
+    pool = Pool(processes,init_batch_worker,(config_dir,debug_objectpath_expr,dump_evaldoc_on_error,debug_dump_evaldoc,objectpath_engine,processed_ledger,json_loader,cache_settings,trigger_state_db))
+    try:
+        chunksize = max(1,min(32,int(len(result_file_paths) / (processes * 4))))
+        args = [(path,input_dir) for path in result_file_paths]
+        for path, status, triggers_fired_summary in pool.starmap(batch_process_result_file,args,chunksize):
+            statuses[status] += 1
+            for config_filename, tags in triggers_fired_summary.items():
+                for tag in tags:
+                    triggers_fired[config_filename + ":" + tag] += 1
+    finally:
+        # (the workers close their reactors as they exit)
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start
+    logging.info("Batch summary: %d files in %.2fs (%.1f files/sec) processed=%d skipped=%d changed=%d errored=%d failed=%d" %
+                 (len(result_file_paths),elapsed,(len(result_file_paths) / elapsed) if elapsed > 0 else 0,
+                  statuses['processed'],statuses['skipped'],statuses['changed'],statuses['errored'],statuses['failed']))
+    for trigger, count in sorted(triggers_fired.items()):
+        logging.info("Batch summary: trigger %s fired for %d files" % (trigger,count))
+
+    return statuses['failed'] + statuses['errored']
+
+
+# Serves the handler_metrics registry in the Prometheus text format
+class MetricsResource(Resource):
 
-            # our config name is the filename
-            config_filename = os.path.basename(event.src_path)
-            result_handler_configs[config_filename] = config
+    isLeaf = True
+
+    def render_GET(self, request):
+        request.setHeader(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')
+        return handler_metrics.registry.render().encode('utf-8')
+
+
+# Serves the outcome of each named health check, 503 if any fails
+class HealthzResource(Resource):
+
+    isLeaf = True
+
+    def __init__(self, checks):
+        super().__init__()
+        self.checks = checks
+
+    def render_GET(self, request):
+        results = {}
+        for name, check in self.checks.items():
+            try:
+                results[name] = bool(check())
+            except Exception as e:
+                logging.exception("Unexpected error in health check: " + name)
+                results[name] = False
+
+        healthy = all(results.values())
+        request.setResponseCode(200 if healthy else 503)
+        request.setHeader(b'content-type', b'application/json')
+        return json.dumps({'status': 'ok' if healthy else 'failing', 'checks': results}).encode('utf-8')
 
 
 def init_watching(input_dir,
@@ -524,7 +3131,23 @@ def init_watching(input_dir,
                   dump_evaldoc_on_error,
                   debug_dump_evaldoc,
                   httpserver_port,
-                  httpserver_root_dir):
+                  httpserver_root_dir,
+                  objectpath_engine='objectpath',
+                  processed_paths_max=10000,
+                  processed_ledger=None,
+                  scan_existing=False,
+                  evaluation_engine='thread',
+                  evaluation_processes=None,
+                  reactor_queue_size=100,
+                  reactor_threads=1,
+                  reactor_metrics_log_seconds=300,
+                  json_loader='full',
+                  evaluation_cache_size=0,
+                  evaluation_cache_ttl_seconds=604800,
+                  evaluation_cache_path=None,
+                  trigger_state_db=None,
+                  input_dir_watcher='watchdog',
+                  input_dir_poll_seconds=10):
 
     # mthreaded...
     if (isinstance(input_dir_watchdog_threads,str)):
@@ -542,11 +3165,35 @@ def init_watching(input_dir,
         input_dir_sleep_seconds = int(input_dir_sleep_seconds)
     event_handler.input_dir_sleep_seconds = input_dir_sleep_seconds
 
+    # track what we have processed, optionally durably
+    if (isinstance(processed_paths_max,str)):
+        processed_paths_max = int(processed_paths_max)
+    ledger = None
+    if processed_ledger is not None:
+        logging.info("Recording processed testssl.sh result files in ledger: %s" % processed_ledger)
+        ledger = ProcessedResultLedger(processed_ledger)
+    event_handler.processed_result_paths = ProcessedResultPaths(processed_paths_max,ledger)
+
     # Create a TestsslProcessor to consume the testssl_cmds files
     event_handler.testssl_result_processor = TestsslResultProcessor()
     event_handler.testssl_result_processor.debug_objectpath_expr = debug_objectpath_expr
     event_handler.testssl_result_processor.dump_evaldoc_on_error = dump_evaldoc_on_error
     event_handler.testssl_result_processor.debug_dump_evaldoc = debug_dump_evaldoc
+    event_handler.testssl_result_processor.objectpath_engine = objectpath_engine
+    event_handler.testssl_result_processor.json_loader = json_loader
+    if json_loader == 'streaming' and ijson is None:
+        logging.warn("--json-loader streaming: ijson is not installed, result files will be fully parsed then pruned")
+
+    # reuse the evaluations of previously seen scanResults?
+    cache_settings = evaluation_cache_settings(evaluation_cache_size,evaluation_cache_ttl_seconds,evaluation_cache_path)
+    if cache_settings is not None:
+        logging.info("Caching up to %d scanResult evaluations for %ds (persisted to: %s)" %
+                     (cache_settings['max_entries'],cache_settings['ttl_seconds'],evaluation_cache_path))
+        event_handler.testssl_result_processor.evaluation_cache = EvaluationCache(**cache_settings)
+
+    # the state of the triggers w/ a fire_on (only in memory unless given a path)
+    logging.info("Keeping the state of triggers w/ a fire_on in: %s" % (trigger_state_db if trigger_state_db is not None else "memory"))
+    event_handler.testssl_result_processor.trigger_state_store = TriggerStateStore(trigger_state_db if trigger_state_db is not None else ':memory:')
 
     # give the processor the total number of threads to use
     # for processing testssl.sh cmds concurrently
@@ -554,6 +3201,28 @@ def init_watching(input_dir,
         input_dir_watchdog_threads = int(input_dir_watchdog_threads)
     event_handler.testssl_result_processor.threads = input_dir_watchdog_threads
 
+    # reactors run on their own queues/threads, off of the evaluation threads
+    if (isinstance(reactor_queue_size,str)):
+        reactor_queue_size = int(reactor_queue_size)
+    if (isinstance(reactor_threads,str)):
+        reactor_threads = int(reactor_threads)
+    if (isinstance(reactor_metrics_log_seconds,str)):
+        reactor_metrics_log_seconds = int(reactor_metrics_log_seconds)
+    reactor_dispatcher = ReactorDispatcher(reactor_queue_size,reactor_threads,event_handler.testssl_result_processor.dumpEvalDoc)
+    event_handler.testssl_result_processor.reactor_dispatcher = reactor_dispatcher
+
+    # evaluate in a process pool?
+    if evaluation_engine == 'process':
+        if (isinstance(evaluation_processes,str)):
+            evaluation_processes = int(evaluation_processes)
+        if evaluation_processes is None:
+            evaluation_processes = os.cpu_count()
+        logging.info("Evaluating testssl.sh result JSON files in %d worker processes" % evaluation_processes)
+        event_handler.process_evaluation_engine = ProcessEvaluationEngine(evaluation_processes,
+                                                                          event_handler.testssl_result_processor,
+                                                                          processed_ledger,
+                                                                          cache_settings)
+
 
     # schedule our config_dir file watchdog
     observer1 = Observer()
@@ -569,17 +3238,52 @@ def init_watching(input_dir,
         config_dir_path_to_startup_scan = os.getcwd() + "/" + config_dir_path_to_startup_scan.replace("./","")
 
     # load any pre existing configs
-    for f in os.listdir(config_dir):
-        result_handler_config_monitor.on_created(FileCreatedEvent(config_dir + "/" + os.path.basename(f)))
+    load_existing_configs(config_dir,result_handler_config_monitor)
 
     # schedule our testssl.sh json result file watchdog
-    observer2 = Observer()
-    observer2.schedule(event_handler, input_dir, recursive=True)
-    observer2.start()
-    logging.getLogger("watchdog.observers.inotify_buffer").setLevel("INFO")
-
-    logging.info("Monitoring for new testssl.sh result JSON files at: %s ",input_dir)
-
+    # or, where inotify does not scale, our polling scanner
+    input_filename_re_filter = compile_input_filename_filter(input_filename_filter)
+    if input_dir_watcher == 'polling':
+        if (isinstance(input_dir_poll_seconds,str)):
+            input_dir_poll_seconds = float(input_dir_poll_seconds)
+        observer2 = PollingResultFileScanner(event_handler,input_dir,input_filename_re_filter,input_dir_poll_seconds,scan_existing)
+        observer2.start()
+        logging.info("Polling for new testssl.sh result JSON files at: %s every %ss" % (input_dir,input_dir_poll_seconds))
+    else:
+        observer2 = Observer()
+        observer2.schedule(event_handler, input_dir, recursive=True)
+        observer2.start()
+        logging.getLogger("watchdog.observers.inotify_buffer").setLevel("INFO")
+
+        logging.info("Monitoring for new testssl.sh result JSON files at: %s ",input_dir)
+
+    # optionally feed any result files already there
+    # through the same path as new ones (dedupe included)
+    # (the polling scanner dispatches them on its first poll)
+    if scan_existing and input_dir_watcher != 'polling':
+        existing = 0
+        for path in find_result_files(input_dir,input_filename_re_filter):
+            event_handler.on_created(FileCreatedEvent(path))
+            existing += 1
+        logging.info("Scheduled %d pre-existing testssl.sh result JSON files found at: %s" % (existing,input_dir))
+
+
+    # gauges sampled when /metrics is rendered
+    handler_metrics.registry.gauge('testssl_handler_settle_pending',
+        "Result files waiting for --input-dir-sleep-seconds w/out modification",
+        function=lambda: {(): event_handler.settle_scheduler.pending_count() if event_handler.settle_scheduler else 0})
+    handler_metrics.registry.gauge('testssl_handler_reactor_queue_depth',
+        "Fired trigger batches queued per reactor engine",['reactor'],
+        function=lambda: {(name,):m['queue_depth'] for name, m in reactor_dispatcher.metrics().items()})
+    handler_metrics.registry.gauge('testssl_handler_evaluation_cache_entries',
+        "scanResult evaluations in the EvaluationCache (in memory)",
+        function=lambda: {(): len(event_handler.testssl_result_processor.evaluation_cache) if event_handler.testssl_result_processor.evaluation_cache is not None else 0})
+    handler_metrics.registry.gauge('testssl_handler_configs_loaded',
+        "Result handler config YAML files loaded",
+        function=lambda: {(): len(current_config_snapshot().plans)})
+    handler_metrics.registry.gauge('testssl_handler_config_snapshot_version',
+        "Version of the current result handler config snapshot",
+        function=lambda: {(): current_config_snapshot().version})
 
     # port...
     if (isinstance(httpserver_port,str)):
@@ -590,6 +3294,11 @@ def init_watching(input_dir,
     if httpserver_port is not None and isinstance(httpserver_port,int):
         logging.info("Starting HTTP server listening on: %d and serving up: %s" % (httpserver_port,httpserver_root_dir))
         resource = File(httpserver_root_dir)
+        resource.putChild(b'metrics', MetricsResource())
+        resource.putChild(b'healthz', HealthzResource({
+            'config_observer_alive': observer1.is_alive,
+            'result_observer_alive': observer2.is_alive,
+            'configs_loaded': lambda: len(current_config_snapshot().plans) > 0}))
         factory = Site(resource)
         endpoint = endpoints.TCP4ServerEndpoint(reactor, httpserver_port)
         endpoint.listen(factory)
@@ -598,14 +3307,24 @@ def init_watching(input_dir,
         httpdthread.start()
 
     try:
+        last_metrics_logged = time.time()
         while True:
             time.sleep(30)
+            if reactor_metrics_log_seconds > 0 and (time.time() - last_metrics_logged) >= reactor_metrics_log_seconds:
+                reactor_dispatcher.log_metrics()
+                last_metrics_logged = time.time()
     except KeyboardInterrupt:
         observer1.stop()
         observer2.stop()
     observer1.join()
     observer2.join()
 
+    # let the reactors handle everything dispatched
+    # so far (their threads are daemons) before closing them
+    event_handler.close()
+    reactor_dispatcher.join()
+    reactor_registry.close()
+
 
 
 
@@ -620,21 +3339,56 @@ if __name__ == '__main__':
     parser.add_argument('-l', '--log-file', dest='log_file', default=None, help="Path to log file, default None, STDOUT")
     parser.add_argument('-x', '--log-level', dest='log_level', default="DEBUG", help="log level, default DEBUG ")
     parser.add_argument('-w', '--input-dir-watchdog-threads', dest='input_dir_watchdog_threads', default=10, help="max threads for watchdog input-dir file processing, default 10")
-    parser.add_argument('-s', '--input-dir-sleep-seconds', dest='input_dir_sleep_seconds', default=5, help="When a new *.json file is detected in --input-dir, how many seconds to wait before processing to allow testssl.sh to finish writing. Default 5")
+    parser.add_argument('-s', '--input-dir-sleep-seconds', dest='input_dir_sleep_seconds', default=5, help="When a new *.json file is detected in --input-dir, how many seconds it must go w/out further modification events before processing to allow testssl.sh to finish writing. Default 5")
+    parser.add_argument('-m', '--processed-paths-max', dest='processed_paths_max', default=10000, help="max number of processed --input-dir result file paths remembered in memory to avoid re-processing them, default 10000")
+    parser.add_argument('-L', '--processed-ledger', dest='processed_ledger', default=None, help="Default None, if a file path is specified, a SQLite ledger of processed result files (path + size + mtime + content hash) is kept there so restarts and re-emitted events do not re-evaluate files already handled")
+    parser.add_argument('-b', '--batch', action='store_true', help="Flag to run in batch mode: rather than watching --input-dir, process all matching result files already in it across --input-dir-watchdog-threads worker processes, log a summary and exit")
+    parser.add_argument('-S', '--scan-existing', action='store_true', help="Flag to also process all matching result files already in --input-dir at startup when watching")
+    parser.add_argument('-P', '--evaluation-engine', dest='evaluation_engine', default="thread", choices=['thread','process'], help="Default 'thread'. 'thread' loads, evaluates and reacts to result files on the --input-dir-watchdog-threads pool. 'process' loads and evaluates them in a pool of --evaluation-processes worker processes (escaping the GIL) and only invokes the reactors for fired triggers on the thread pool")
+    parser.add_argument('-n', '--evaluation-processes', dest='evaluation_processes', default=None, help="number of worker processes for --evaluation-engine process, default the number of CPUs")
+    parser.add_argument('-q', '--reactor-queue-size', dest='reactor_queue_size', default=100, help="max fired trigger batches queued per reactor engine before evaluation blocks (backpressure), default 100. Reactor engines can override w/ 'dispatch_queue_size'")
+    parser.add_argument('-t', '--reactor-threads', dest='reactor_threads', default=1, help="threads per reactor engine invoking reactors off of the evaluation threads, default 1. More than 1 requires thread safe reactors, prefer opting in per reactor engine w/ 'dispatch_threads' in its config")
+    parser.add_argument('-M', '--reactor-metrics-log-seconds', dest='reactor_metrics_log_seconds', default=300, help="log per reactor engine queue depth/wait time metrics every N seconds, 0 to disable, default 300")
+    parser.add_argument('-J', '--json-loader', dest='json_loader', default="full", choices=JSON_LOADERS, help="Default 'full'. 'streaming' incrementally parses result files (requires ijson, otherwise they are parsed then pruned) keeping only the scanResult sections referenced by the loaded configs' objectpaths and reactor templates")
+    parser.add_argument('-c', '--evaluation-cache-size', dest='evaluation_cache_size', default=0, help="max number of (config, scanResult content) evaluations to cache in memory so rescans that found the same things skip re-evaluating the triggers that only depend on the scanResult (cert_expires_in_days etc are always recalculated), default 0 (disabled)")
+    parser.add_argument('-T', '--evaluation-cache-ttl-seconds', dest='evaluation_cache_ttl_seconds', default=604800, help="seconds a cached evaluation may be reused for, default 604800 (7 days)")
+    parser.add_argument('-C', '--evaluation-cache-path', dest='evaluation_cache_path', default=None, help="Default None, if a file path is specified the --evaluation-cache-size cache is also persisted to a SQLite DB there to survive restarts and be shared w/ worker processes")
+    parser.add_argument('-k', '--trigger-state-db', dest='trigger_state_db', default=None, help="Default None (in memory, batch mode: disabled), if a file path is specified the last evaluation of every trigger w/ a 'fire_on' other than 'always' (per subject i.e. fqdn) is kept in a SQLite DB there so that their reactors are only invoked when what they fired on changes, across restarts")
+    parser.add_argument('-W', '--input-dir-watcher', dest='input_dir_watcher', default="watchdog", choices=INPUT_DIR_WATCHERS, help="Default 'watchdog'. 'watchdog' watches --input-dir via inotify (or the platform's equivalent). 'polling' polls it every --input-dir-poll-seconds, only re-listing directories whose mtime changed, for trees too large for inotify watches or filesystems w/out inotify (i.e. NFS)")
+    parser.add_argument('-O', '--input-dir-poll-seconds', dest='input_dir_poll_seconds', default=10, help="seconds between polls of --input-dir w/ --input-dir-watcher polling, default 10")
     parser.add_argument('-d', '--debug-object-path-expr', dest='debug_objectpath_expr', default=False, help="Default False. When True, adds more details on ObjectPath expression parsing to logs")
     parser.add_argument('-D', '--debug-dump-evaldoc', action='store_true', help="Flag to enable dumping the 'evaluation_doc' to STDOUT after it is constructed for evaluations (WARNING: this is large & json pretty printed)")
     parser.add_argument('-E', '--dump-evaldoc-on-error', action='store_true', help="Flag to enable dumping the 'evaluation_doc' to STDOUT (json pretty printed) on any error (WARNING: this is large & json pretty printed)")
+    parser.add_argument('-e', '--objectpath-engine', dest='objectpath_engine', default="objectpath", choices=OBJECTPATH_ENGINES, help="Default 'objectpath'. 'fastpath' natively evaluates common ObjectPath expression shapes (comparisons, severity filters, split(@.id,' ')[0] lookups) and falls back to ObjectPath for everything else. 'verify' evaluates via both and logs any differences")
     parser.add_argument('-p', '--httpserver-port', dest='httpserver_port', default=None, help="Default None, if a numeric port is specified, this will startup a simple twisted http server who's document root is the --httpserver-root-dir")
     parser.add_argument('-r', '--httpserver-root-dir', dest='httpserver_root_dir', default=None, help="Default None, if specified the embedded http server will serve up content from this directory, has no effect if --httpserver-port is not specified")
 
 
     args = parser.parse_args()
 
-    logging.basicConfig(level=logging.getLevelName(args.log_level),
-                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                        filename=args.log_file,filemode='w')
+    worker_logging_settings = {'level':logging.getLevelName(args.log_level),
+                               'format':'%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                               'filename':args.log_file}
+    logging.basicConfig(filemode='w',**worker_logging_settings)
     logging.Formatter.converter = time.gmtime
 
+    if args.batch:
+        failed = run_batch(args.input_dir,
+                           args.config_dir,
+                           args.input_dir_watchdog_threads,
+                           args.debug_objectpath_expr,
+                           args.input_filename_filter,
+                           args.dump_evaldoc_on_error,
+                           args.debug_dump_evaldoc,
+                           args.objectpath_engine,
+                           args.processed_ledger,
+                           args.json_loader,
+                           args.evaluation_cache_size,
+                           args.evaluation_cache_ttl_seconds,
+                           args.evaluation_cache_path,
+                           args.trigger_state_db)
+        sys.exit(1 if failed > 0 else 0)
+
     init_watching(args.input_dir,
                   args.config_dir,
                   args.input_dir_watchdog_threads,
@@ -644,4 +3398,20 @@ if __name__ == '__main__':
                   args.dump_evaldoc_on_error,
                   args.debug_dump_evaldoc,
                   args.httpserver_port,
-                  args.httpserver_root_dir)
+                  args.httpserver_root_dir,
+                  args.objectpath_engine,
+                  args.processed_paths_max,
+                  args.processed_ledger,
+                  args.scan_existing,
+                  args.evaluation_engine,
+                  args.evaluation_processes,
+                  args.reactor_queue_size,
+                  args.reactor_threads,
+                  args.reactor_metrics_log_seconds,
+                  args.json_loader,
+                  args.evaluation_cache_size,
+                  args.evaluation_cache_ttl_seconds,
+                  args.evaluation_cache_path,
+                  args.trigger_state_db,
+                  args.input_dir_watcher,
+                  args.input_dir_poll_seconds)